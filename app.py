@@ -14,10 +14,13 @@ import random
 
 from config import CyberConfig
 from core.renderer import ConfigurableCyberCore
+from service import WorkerWarmup, get_render_service
 from ui.tabs.single import create_single_tab
 from ui.tabs.batch import create_batch_tab
 from ui.tabs.config import create_config_tab
 from ui.tabs.preview import create_preview_tab
+from ui.tabs.animation import create_animation_tab
+from ui.tabs.video import create_video_tab
 from ui.utils import load_config, save_config, preview_config
 
 # 创建必要的目录
@@ -84,6 +87,14 @@ def create_interface():
             with gr.TabItem("📁 批量处理"):
                 create_batch_tab(config_state, font_path_state)
 
+            # 循环动画标签页
+            with gr.TabItem("🎞️ 循环动画"):
+                create_animation_tab(config_state, font_path_state)
+
+            # 视频处理标签页
+            with gr.TabItem("🎬 视频处理"):
+                create_video_tab(config_state, font_path_state)
+
             # 配置管理标签页
             with gr.TabItem("⚙️ 配置管理"):
                 create_config_tab(config_state)
@@ -96,7 +107,7 @@ def create_interface():
         ---
         ### 📝 使用说明
         - 在配置管理中可以调整所有参数
-        - 支持单张处理和批量处理
+        - 支持单张处理、批量处理、循环动画和视频处理
         - 可以保存/加载配置模板
         - 随机种子确保结果可重现
         """)
@@ -107,7 +118,14 @@ def create_interface():
 # 创建 demo 实例
 demo = create_interface()
 
+def start_render_service():
+    """启动渲染服务并预热全部工作进程；每个工作进程处理 200 个任务后替换，限制内存增长"""
+    return get_render_service(warmup=WorkerWarmup(font_path=DEFAULT_FONT), max_tasks_per_child=200)
+
+
 if __name__ == "__main__":
+    start_render_service()
+
     demo.launch(
         server_name="0.0.0.0",
         server_port=7860,
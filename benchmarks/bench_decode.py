@@ -0,0 +1,81 @@
+# benchmarks/bench_decode.py
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""全尺寸解码 vs 缩小解码：解码耗时与预览渲染总耗时
+
+    python benchmarks/bench_decode.py --size 6000x4000 --targets 600,1200,2000 --repeat 5
+
+JPEG 的缩小解码在 DCT 阶段完成（1/2、1/4、1/8），PNG 等格式解码后再缩小，仅作对照。
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import cv2
+import numpy as np
+
+from config import CyberConfig
+from core.renderer import ConfigurableCyberCore
+from core.utils import load_image
+
+
+def make_input(tmp_dir, width, height, ext):
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 255, (height // 8, width // 8, 3), dtype=np.uint8)
+    img = cv2.resize(cv2.GaussianBlur(img, (0, 0), 2), (width, height), interpolation=cv2.INTER_CUBIC)
+    path = os.path.join(tmp_dir, f"in{ext}")
+    cv2.imwrite(path, img)
+    return path
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="6000x4000")
+    parser.add_argument("--targets", default="600,1200,2000")
+    parser.add_argument("--formats", default=".jpg,.png")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--render", action="store_true", help="同时测量预览渲染总耗时（较慢）")
+    parser.add_argument("--font", default=None)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split('x'))
+    targets = [None] + [int(t) for t in args.targets.split(',') if t.strip()]
+    cfg = CyberConfig()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for ext in args.formats.split(','):
+            path = make_input(tmp_dir, width, height, ext)
+            print(f"{ext} {width}x{height} ({os.path.getsize(path) / 1e6:.1f} MB)")
+            header = f"{'目标长边':<10}{'倍数':>6}{'解码尺寸':>14}{'解码(ms)':>12}"
+            print(header + (f"{'渲染(s)':>10}" if args.render else ""))
+
+            for target in targets:
+                elapsed, (img, factor) = best_of(lambda: load_image(path, target), args.repeat)
+                line = (f"{target or '全尺寸':<10}{factor:>6}{f'{img.shape[1]}x{img.shape[0]}':>14}"
+                        f"{elapsed * 1000:>12.1f}")
+                if args.render:
+                    core = ConfigurableCyberCore(path, args.font, cfg, 42, preview_size=target)
+                    core.render()
+                    line += f"{core.stats['decode_time'] + core.stats['processing_time']:>10.2f}"
+                print(line)
+            print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# benchmarks/bench_import.py
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""导入耗时：python -X importtime 下各入口模块的冷启动开销
+
+    python benchmarks/bench_import.py --repeat 5 --target-ms 10
+
+每个模块在独立子进程中导入，取多次中的最小值（首次运行写入 .pyc，相当于预热）。
+"项目自身"为 core/data/config/service/ui 下各模块 self 耗时之和（不含 numpy/cv2/PIL 等
+第三方库）。对 core.renderer 的项目自身耗时设目标值，超出时以非零状态退出；
+core、data、config 包本身不应加载 cv2。
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+PROJECT_PACKAGES = ('core', 'data', 'config', 'service', 'ui')
+MODULES = ('core', 'data', 'config', 'core.cache', 'core.layout', 'core.renderer', 'service.render_service')
+# 导入时不应拉起 OpenCV 的模块
+NO_CV2 = ('core', 'data', 'config', 'core.cache')
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def importtime(code):
+    """在新解释器中以 -X importtime 执行 code，返回 [(self_us, cumulative_us, 是否顶层, 模块名)]"""
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)  # 允许缓存 .pyc，测量的是常规启动而非重新编译
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    records = []
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m is not None:
+            records.append((int(m.group(1)), int(m.group(2)), len(m.group(3)) == 1, m.group(4)))
+    return records
+
+
+def measure(module, startup):
+    """在新解释器中导入 module
+
+    Args:
+        startup: 解释器启动时自带导入的模块名集合（不计入总耗时）
+
+    Returns:
+        (总耗时ms, 项目自身耗时ms, 是否加载了cv2)
+    """
+    total = project = 0
+    loaded_cv2 = False
+    for self_us, cumulative_us, top_level, name in importtime(f"import {module}"):
+        if top_level and name not in startup:
+            total += cumulative_us
+        if name.split('.')[0] in PROJECT_PACKAGES:
+            project += self_us
+        loaded_cv2 |= name == 'cv2'
+    return total / 1000, project / 1000, loaded_cv2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="每个模块重复次数（取最小值）")
+    parser.add_argument("--modules", default=",".join(MODULES), help="逗号分隔的模块列表")
+    parser.add_argument("--target-ms", type=float, default=10.0, help="core.renderer 项目自身耗时目标（毫秒）")
+    args = parser.parse_args()
+
+    print(f"{'模块':<26}{'总耗时(ms)':>12}{'项目自身(ms)':>14}{'cv2':>6}")
+    startup = {name for _, _, _, name in importtime("pass")}
+    failures = []
+    for module in args.modules.split(','):
+        runs = [measure(module, startup) for _ in range(args.repeat)]
+        total = min(r[0] for r in runs)
+        project = min(r[1] for r in runs)
+        loaded_cv2 = runs[0][2]
+        print(f"{module:<26}{total:>12.1f}{project:>14.1f}{'是' if loaded_cv2 else '否':>6}")
+
+        if module in NO_CV2 and loaded_cv2:
+            failures.append(f"{module} 导入时加载了 cv2")
+        if module == 'core.renderer' and project > args.target_ms:
+            failures.append(f"core.renderer 项目自身耗时 {project:.1f}ms 超出目标 {args.target_ms:.1f}ms")
+
+    for failure in failures:
+        print(f"未达标: {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"达标: core.renderer 项目自身耗时 ≤ {args.target_ms:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
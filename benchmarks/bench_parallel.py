@@ -0,0 +1,118 @@
+# benchmarks/bench_parallel.py
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""进程池 vs 线程池渲染对比：吞吐量与峰值内存
+
+    python benchmarks/bench_parallel.py --images 16 --size 1200x800 --workers 4
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import cv2
+import numpy as np
+
+from config import CyberConfig
+from core.effects import noise_cache
+from service.render_service import RenderService, JOB_DONE
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def _rss(pid):
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        return 0
+
+
+class MemorySampler(threading.Thread):
+    """定期采样本进程及子进程的总常驻内存 (Linux /proc)"""
+
+    def __init__(self, interval=0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            pids = [os.getpid()] + [p.pid for p in multiprocessing.active_children()]
+            self.peak = max(self.peak, sum(_rss(pid) for pid in pids))
+            time.sleep(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def make_inputs(tmp_dir, count, width, height):
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(count):
+        img = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+        img = cv2.GaussianBlur(img, (0, 0), 8)
+        cv2.circle(img, (width // 2, height // 2), min(width, height) // 4, (40, 160, 220), -1)
+        path = os.path.join(tmp_dir, f"in_{i}.png")
+        cv2.imwrite(path, img)
+        paths.append(path)
+    return paths
+
+
+def run_mode(mode, paths, out_dir, workers, stage_threads, font_path):
+    noise_cache.clear()
+    sampler = MemorySampler()
+    service = RenderService(max_workers=workers, max_queue=len(paths) + 1,
+                            per_user_limit=len(paths), mode=mode, stage_threads=stage_threads)
+
+    sampler.start()
+    start = time.perf_counter()
+    service.start()
+    job_ids = [service.submit(p, font_path, CyberConfig(), 42, os.path.join(out_dir, f"{mode}_{i}.png"))
+               for i, p in enumerate(paths)]
+    jobs = [service.wait(job_id) for job_id in job_ids]
+    elapsed = time.perf_counter() - start
+    service.stop()
+    sampler.stop()
+
+    failed = [j.error for j in jobs if j.status != JOB_DONE]
+    if failed:
+        raise RuntimeError(f"{mode} 模式渲染失败: {failed[0]}")
+    return elapsed, sampler.peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=8)
+    parser.add_argument("--size", default="1200x800")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--stage-threads", type=int, default=2)
+    parser.add_argument("--font", default=None)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split('x'))
+    megapixels = width * height * args.images / 1e6
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = make_inputs(tmp_dir, args.images, width, height)
+        print(f"{args.images} 张 {width}x{height}，{args.workers} 个工作者，"
+              f"每个工作者 {args.stage_threads} 个阶段线程")
+        print(f"{'模式':<10}{'耗时(s)':>10}{'张/秒':>10}{'MP/秒':>10}{'峰值内存(MB)':>16}")
+        for mode in ('process', 'thread'):
+            elapsed, peak = run_mode(mode, paths, tmp_dir, args.workers, args.stage_threads, args.font)
+            print(f"{mode:<10}{elapsed:>10.2f}{args.images / elapsed:>10.2f}"
+                  f"{megapixels / elapsed:>10.2f}{peak / 1024 / 1024:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
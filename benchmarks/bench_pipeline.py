@@ -0,0 +1,123 @@
+# benchmarks/bench_pipeline.py
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""批量处理：串行槽位（每个渲染槽位依次读入、渲染、写出） vs 三段流水线（预读 → 渲染 → 写出）
+
+    python benchmarks/bench_pipeline.py --images 16 --size 1200x800 --workers 2 --io-delay 0.05
+
+--io-delay 为每次读/写文件额外模拟的延迟（秒），近似网络存储。
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import cv2
+import numpy as np
+
+from config import CyberConfig
+from core.utils import write_bytes_atomic
+from service.pipeline import BatchPipeline
+from service.render_service import RenderService, JOB_DONE
+
+
+def make_inputs(tmp_dir, count, width, height):
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(count):
+        img = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+        img = cv2.GaussianBlur(img, (0, 0), 8)
+        path = os.path.join(tmp_dir, f"in_{i}.png")
+        cv2.imwrite(path, img)
+        paths.append(path)
+    return paths
+
+
+def make_stages(service, out_dir, font_path, io_delay, prefix):
+    cfg = CyberConfig()
+
+    def decode(item):
+        time.sleep(io_delay)
+        with open(item.source, 'rb') as f:
+            item.data['bytes'] = f.read()
+
+    def render(item):
+        job = service.wait(service.submit_bytes(item.data.pop('bytes'), font_path, cfg, item.index,
+                                                user_id='bench'))
+        _check(job)
+        item.data['out'] = job.result
+
+    def write(item):
+        time.sleep(io_delay)
+        write_bytes_atomic(os.path.join(out_dir, f"{prefix}_{item.index}.png"), item.data.pop('out'))
+
+    return decode, render, write
+
+
+def run_direct(service, paths, out_dir, font_path, io_delay):
+    """参考实现：每个渲染槽位依次 读入 → 渲染 → 写出，I/O 期间不渲染"""
+    decode, render, write = make_stages(service, out_dir, font_path, io_delay, 'direct')
+
+    def serial(item):
+        decode(item)
+        render(item)
+        write(item)
+
+    noop = lambda item: None
+    pipeline = BatchPipeline(noop, serial, noop, decode_workers=1, render_workers=service.max_workers,
+                             write_workers=1)
+    return _drain(pipeline, paths)
+
+
+def run_pipeline(service, paths, out_dir, font_path, io_delay):
+    stages = make_stages(service, out_dir, font_path, io_delay, 'pipe')
+    return _drain(BatchPipeline(*stages, render_workers=service.max_workers), paths)
+
+
+def _drain(pipeline, paths):
+    for item in pipeline.run(iter(paths)):
+        if item.error:
+            raise RuntimeError(item.error)
+    return pipeline
+
+
+def _check(job):
+    if job.status != JOB_DONE:
+        raise RuntimeError(job.error or job.status)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=16)
+    parser.add_argument("--size", default="1200x800")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--io-delay", type=float, default=0.05)
+    parser.add_argument("--font", default=None)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split('x'))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = make_inputs(tmp_dir, args.images, width, height)
+        service = RenderService(max_workers=args.workers, max_queue=args.images + 1,
+                                per_user_limit=args.workers).start()
+        try:
+            print(f"{args.images} 张 {width}x{height}，{args.workers} 个工作者，I/O 延迟 {args.io_delay}s")
+            print(f"{'方式':<10}{'耗时(s)':>10}{'张/秒':>10}  阶段利用率")
+
+            for name, fn in (("串行槽位", run_direct), ("三段流水线", run_pipeline)):
+                start = time.perf_counter()
+                pipeline = fn(service, paths, tmp_dir, args.font, args.io_delay)
+                elapsed = time.perf_counter() - start
+                print(f"{name:<10}{elapsed:>10.2f}{args.images / elapsed:>10.2f}  {pipeline.describe_utilization()}")
+        finally:
+            service.stop()
+
+
+if __name__ == "__main__":
+    main()
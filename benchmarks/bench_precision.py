@@ -0,0 +1,73 @@
+# benchmarks/bench_precision.py
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""float32 vs float64 计算精度：渲染耗时与输出像素差异
+
+    python benchmarks/bench_precision.py --image input/test.png --seeds 1,7,42
+
+未指定 --image 时使用 --size 尺寸的合成图片；自动化检查见 tests/test_precision.py。
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import cv2
+import numpy as np
+
+from config import CyberConfig
+from core.effects import noise_cache
+from core.renderer import ConfigurableCyberCore
+
+
+def make_input(width, height):
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 255, (height // 8, width // 8, 3), dtype=np.uint8)
+    img = cv2.resize(img, (width, height), interpolation=cv2.INTER_CUBIC)
+    cv2.circle(img, (width // 2, height // 2), min(width, height) // 4, (40, 160, 220), -1)
+    return img
+
+
+def render(img, font_path, precision, seed):
+    noise_cache.clear()
+    cfg = CyberConfig(precision=precision)
+    core = ConfigurableCyberCore(img, font_path, cfg, seed=seed)
+    start = time.perf_counter()
+    canvas = core.render()
+    return time.perf_counter() - start, canvas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", default=None)
+    parser.add_argument("--size", default="1200x800")
+    parser.add_argument("--seeds", default="1,7,42")
+    parser.add_argument("--font", default=None)
+    args = parser.parse_args()
+
+    if args.image:
+        img = cv2.imread(args.image)
+        if img is None:
+            raise FileNotFoundError(f"无法读取图片: {args.image}")
+    else:
+        img = make_input(*(int(v) for v in args.size.lower().split('x')))
+    seeds = [int(s) for s in args.seeds.split(',')]
+
+    print(f"{img.shape[1]}x{img.shape[0]}")
+    print(f"{'种子':<8}{'float64(ms)':>14}{'float32(ms)':>14}{'最大差异':>10}{'差异像素':>10}")
+    worst = 0
+    for seed in seeds:
+        t64, ref = render(img, args.font, 'float64', seed)
+        t32, out = render(img, args.font, 'float32', seed)
+        diff = np.abs(out.astype(np.int16) - ref.astype(np.int16))
+        worst = max(worst, int(diff.max()))
+        print(f"{seed:<8}{t64 * 1000:>14.1f}{t32 * 1000:>14.1f}{int(diff.max()):>10}{int((diff > 0).sum()):>10}")
+    print(f"所有种子最大差异: {worst} 个色阶")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# benchmarks/bench_records.py
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""框/连线/文字记录：dict 逐条存储 vs 结构化数组，每元素内存与连线规划耗时
+
+    python benchmarks/bench_records.py --count 10000 --boxes 100,1000,3000
+"""
+
+import argparse
+import math
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from config import CyberConfig
+from core.layout import BOX_DTYPE, CONNECTION_DTYPE, TEXT_DTYPE, RecordBuffer, plan_connections
+
+
+def traced_bytes(fn):
+    """fn() 构造的对象占用的Python堆内存"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    obj = fn()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del obj
+    return after - before
+
+
+def make_dicts(kind, n, rng):
+    if kind == 'box':
+        return [{'type': 'plain', 'x': rng.randint(0, 4000), 'y': rng.randint(0, 4000),
+                 'w': rng.randint(40, 600), 'h': rng.randint(40, 600)} for _ in range(n)]
+    if kind == 'connection':
+        return [{'x0': rng.randint(0, 4000), 'y0': rng.randint(0, 4000), 'x1': rng.randint(0, 4000),
+                 'y1': rng.randint(0, 4000), 'jitter': (rng.randint(0, 4000), rng.randint(0, 4000))}
+                for _ in range(n)]
+    return [{'x': rng.uniform(0, 4000), 'y': rng.uniform(0, 4000), 'text': i, 'font': 10,
+             'color': (255, 255, 255, 255), 'is_error': False} for i in range(n)]
+
+
+def make_records(kind, n):
+    dtype = {'box': BOX_DTYPE, 'connection': CONNECTION_DTYPE, 'text': TEXT_DTYPE}[kind]
+    buf = RecordBuffer(dtype)
+    buf.extend(np.zeros(n, dtype=dtype))
+    return buf.array()
+
+
+def loop_connections(rng, cfg, boxes, scale):
+    """逐对循环的参考实现"""
+    max_dist = cfg.box_line_max_distance * scale
+    amount = cfg.box_line_jitter_amount
+    centers = [(x + w // 2, y + h // 2) for _, x, y, w, h, _ in boxes.tolist()]
+    result = []
+    for i in range(len(centers)):
+        for j in range(i + 1, len(centers)):
+            (x0, y0), (x1, y1) = centers[i], centers[j]
+            dist = math.sqrt((x0 - x1) ** 2 + (y0 - y1) ** 2)
+            if dist >= max_dist or rng.random() >= cfg.box_line_connect_chance * (1 - dist / max_dist):
+                continue
+            if rng.random() < cfg.box_line_jitter_chance:
+                jx = (x0 + x1) // 2 + rng.randint(-amount, amount)
+                jy = (y0 + y1) // 2 + rng.randint(-amount, amount)
+                result.append((x0, y0, x1, y1, jx, jy, True))
+            else:
+                result.append((x0, y0, x1, y1, 0, 0, False))
+    return np.array(result, dtype=CONNECTION_DTYPE)
+
+
+def random_boxes(n, size, rng):
+    boxes = np.zeros(n, dtype=BOX_DTYPE)
+    boxes['w'] = rng.integers(40, 150, n)
+    boxes['h'] = (boxes['w'] * 0.75).astype(np.int32)
+    boxes['x'] = rng.integers(10, size - 160, n)
+    boxes['y'] = rng.integers(10, size - 160, n)
+    return boxes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=10000, help="内存测量的元素数")
+    parser.add_argument("--boxes", default="100,1000,3000", help="连线规划测试的框数量")
+    parser.add_argument("--size", type=int, default=4000, help="画布边长（像素）")
+    args = parser.parse_args()
+
+    print(f"每元素内存 ({args.count} 个元素)")
+    print(f"{'类型':<12}{'dict (B)':>12}{'结构化记录 (B)':>18}{'比例':>8}")
+    for kind in ('box', 'connection', 'text'):
+        dict_bytes = traced_bytes(lambda: make_dicts(kind, args.count, random.Random(0))) / args.count
+        record_bytes = make_records(kind, args.count).nbytes / args.count
+        print(f"{kind:<12}{dict_bytes:>12.1f}{record_bytes:>18.1f}{dict_bytes / record_bytes:>7.1f}x")
+
+    cfg = CyberConfig()
+    scale = args.size / 1200.0
+    print(f"\n连线规划 ({args.size}x{args.size}, 最大距离 {cfg.box_line_max_distance * scale:.0f}px)")
+    print(f"{'框数':>8}{'逐对循环(ms)':>16}{'向量化(ms)':>14}{'加速比':>10}{'连线数':>10}")
+    for n in (int(v) for v in args.boxes.split(',')):
+        boxes = random_boxes(n, args.size, np.random.default_rng(n))
+
+        start = time.perf_counter()
+        ref = loop_connections(random.Random(1), cfg, boxes, scale)
+        t_loop = time.perf_counter() - start
+
+        start = time.perf_counter()
+        conns = plan_connections(random.Random(1), cfg, boxes, scale)
+        t_vec = time.perf_counter() - start
+
+        if not np.array_equal(ref, conns):
+            raise RuntimeError(f"{n} 个框时向量化结果与参考实现不一致")
+        print(f"{n:>8}{t_loop * 1000:>16.1f}{t_vec * 1000:>14.1f}{t_loop / t_vec:>9.1f}x{len(conns):>10}")
+
+
+if __name__ == "__main__":
+    main()
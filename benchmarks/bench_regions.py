@@ -0,0 +1,112 @@
+# benchmarks/bench_regions.py
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""区域受限的特效：整幅复制/模糊/混合 vs 只处理改变区域，以及各阶段读写的字节数
+
+    python benchmarks/bench_regions.py --size 4000x3000 --repeat 3
+
+"整幅"为改动前的实现（网格叠加层复制整幅画布、景深对整幅图像模糊与混合），景深均使用 PIL 引擎。
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import cv2
+import numpy as np
+from PIL import Image, ImageEnhance, ImageFilter
+
+from config import CyberConfig
+from core.effects import apply_depth_of_field
+from core.layout import MESH_DOT, MESH_POLYLINE_AA, rasterize_mesh
+from core.renderer import ConfigurableCyberCore
+
+
+def make_input(width, height):
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 255, (height // 8, width // 8, 3), dtype=np.uint8)
+    img = cv2.resize(img, (width, height), interpolation=cv2.INTER_CUBIC)
+    cv2.circle(img, (width // 2, height // 2), min(width, height) // 4, (40, 160, 220), -1)
+    return img
+
+
+def mesh_full_frame(plan, canvas):
+    """整幅叠加层"""
+    overlay = canvas.copy()
+    radius = max(1, plan.style['mesh_dot_radius'])
+    for kind, start, count in plan.mesh.tolist():
+        pts = plan.mesh_points[start:start + count]
+        if kind == MESH_POLYLINE_AA:
+            cv2.polylines(overlay, [pts.reshape(-1, 1, 2)], False, plan.style['mesh_color'], 1, cv2.LINE_AA)
+        elif kind == MESH_DOT:
+            cv2.circle(overlay, tuple(pts[0].tolist()), radius, plan.style['mesh_dot_color'], -1)
+        else:
+            cv2.line(overlay, tuple(pts[0].tolist()), tuple(pts[1].tolist()), plan.style['mesh_color'], 1, cv2.LINE_AA)
+    cv2.addWeighted(overlay, 0.65, canvas, 0.35, 0, canvas)
+    return canvas
+
+
+def dof_full_frame(core, img_pil):
+    """整幅模糊与混合"""
+    cfg = core.cfg
+    w, h = img_pil.size
+    xs = np.arange(w, dtype=np.float32) - int(w * cfg.depth_focus_center[0])
+    ys = np.arange(h, dtype=np.float32) - int(h * cfg.depth_focus_center[1])
+    dist = np.sqrt(xs[np.newaxis, :] ** 2 + ys[:, np.newaxis] ** 2)
+    radius = min(w, h) * cfg.depth_focus_radius
+    fade = np.minimum(1.0, (dist - radius) / max(min(w, h) * cfg.depth_fade_start, 1e-6))
+    mask = Image.fromarray(np.where(dist > radius, 255 * fade, 0).astype(np.uint8))
+    blurred = img_pil.filter(ImageFilter.GaussianBlur(radius=cfg.depth_blur_amount))
+    darkened = ImageEnhance.Brightness(blurred).enhance(1.0 - cfg.depth_darken_amount * 0.3)
+    return Image.composite(darkened, img_pil, mask)
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="4000x3000")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--font", default=None)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split('x'))
+    img = make_input(width, height)
+    print(f"{width}x{height}")
+    print(f"{'阶段':<24}{'整幅(s)':>10}{'区域(s)':>10}")
+
+    core = ConfigurableCyberCore(img, args.font, CyberConfig(), seed=42)
+    plan = core.build_plan()
+    full = best_of(lambda: mesh_full_frame(plan, img.copy()), args.repeat)
+    region = best_of(lambda: rasterize_mesh(plan, img.copy()), args.repeat)
+    print(f"{'网格叠加':<24}{full:>10.3f}{region:>10.3f}")
+
+    img_pil = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+    for focus_radius in (0.2, 0.3, 0.45):
+        cfg = CyberConfig(depth_focus_radius=focus_radius, depth_engine='pil')
+        core = ConfigurableCyberCore(img, args.font, cfg, seed=42)
+        full = best_of(lambda: dof_full_frame(core, img_pil), args.repeat)
+        region = best_of(lambda: apply_depth_of_field(core, img_pil), args.repeat)
+        print(f"{f'景深（对焦半径 {focus_radius}）':<24}{full:>10.3f}{region:>10.3f}")
+
+    core = ConfigurableCyberCore(img, args.font, CyberConfig(), seed=42)
+    core.render()
+    frame_bytes = width * height
+    print("\n各阶段读写字节数（相对整幅 BGR 图像）")
+    for name, nbytes in core.stats['bytes_touched'].items():
+        print(f"  {name:<16}{nbytes / 1e6:>10.1f} MB{nbytes / (3 * frame_bytes):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# benchmarks/bench_stages.py
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""特效流水线：每个阶段各自转换 BGR ↔ PIL vs 按声明调度（表示复用、预计算与行带并行）
+
+    python benchmarks/bench_stages.py --size 4000x3000 --threads 4 --repeat 3
+
+"逐阶段转换"按重构前的固定顺序调用各阶段的 BGR 接口，每个 PIL 阶段前后各转换一次。
+每种方式先预热一次，噪声场命中缓存，计时只反映各阶段本身与表示转换。
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from config import CyberConfig
+from core.effects import (
+    apply_crt_effects, apply_depth_of_field, apply_perlin_noise, apply_rgb_noise, apply_scanline_noise
+)
+from core.layout import rasterize_boxes, rasterize_mesh, rasterize_text
+from core.renderer import ConfigurableCyberCore
+
+
+def make_input(width, height):
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 255, (height // 8, width // 8, 3), dtype=np.uint8)
+    img = cv2.resize(img, (width, height), interpolation=cv2.INTER_CUBIC)
+    cv2.circle(img, (width // 2, height // 2), min(width, height) // 3, (40, 160, 220), -1)
+    return img
+
+
+def render_per_stage(core):
+    """重构前的固定流程"""
+    plan = core.build_plan()
+    canvas = rasterize_mesh(plan, core.canvas)
+    canvas = rasterize_text(plan, canvas, core.font_path)
+    canvas = rasterize_boxes(plan, canvas, core.font_path)
+    img_pil = Image.fromarray(cv2.cvtColor(canvas, cv2.COLOR_BGR2RGB))
+    canvas = cv2.cvtColor(np.array(apply_depth_of_field(core, img_pil)), cv2.COLOR_RGB2BGR)
+    canvas = apply_crt_effects(core, canvas)
+    canvas = apply_perlin_noise(core, canvas)
+    canvas = apply_rgb_noise(core, canvas)
+    return apply_scanline_noise(core, canvas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="4000x3000")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--font", default=None)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split('x'))
+    img = make_input(width, height)
+    cfg = CyberConfig()
+    executor = ThreadPoolExecutor(args.threads, thread_name_prefix="bench-stage")
+
+    cases = (
+        ("逐阶段转换", None, render_per_stage),
+        ("流水线", None, lambda core: core.render()),
+        (f"流水线+{args.threads}线程", executor, lambda core: core.render()),
+    )
+
+    print(f"{width}x{height}，每种方式 {args.repeat} 次")
+    print(f"{'方式':<16}{'平均(s)':>10}{'转换次数':>10}  阶段耗时(s)")
+    for name, pool, fn in cases:
+        fn(ConfigurableCyberCore(img, args.font, cfg, seed=42, executor=pool))
+        times = []
+        for _ in range(args.repeat):
+            core = ConfigurableCyberCore(img, args.font, cfg, seed=42, executor=pool)
+            start = time.perf_counter()
+            fn(core)
+            times.append(time.perf_counter() - start)
+        stage_times = ", ".join(f"{k}={v:.2f}" for k, v in core.stats['stage_times'].items()) or "-"
+        conversions = core.stats['conversions'] if core.stats['stage_times'] else "-"
+        print(f"{name:<16}{np.mean(times):>10.2f}{conversions:>10}  {stage_times}")
+
+    executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# benchmarks/bench_warmup.py
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""冷启动 vs 预热工作进程池：启动耗时、首张结果延迟与吞吐量
+
+    python benchmarks/bench_warmup.py --images 8 --size 1200x800 --workers 2 --recycle 3
+
+"首张延迟"从提交第一个任务开始计时，不含服务启动；预热的代价计入"启动"。
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import cv2
+import numpy as np
+
+from config import CyberConfig
+from service.render_service import RenderService, JOB_DONE
+from service.worker import WorkerWarmup
+
+
+def make_inputs(tmp_dir, count, width, height):
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(count):
+        img = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+        img = cv2.GaussianBlur(img, (0, 0), 8)
+        path = os.path.join(tmp_dir, f"in_{i}.png")
+        cv2.imwrite(path, img)
+        paths.append(path)
+    return paths
+
+
+def run_variant(paths, out_dir, workers, font_path, warmup=None, max_tasks_per_child=None):
+    start = time.perf_counter()
+    service = RenderService(max_workers=workers, max_queue=len(paths) + 1, per_user_limit=len(paths),
+                            warmup=warmup, max_tasks_per_child=max_tasks_per_child).start()
+    startup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    job_ids = [service.submit(p, font_path, CyberConfig(), i, os.path.join(out_dir, f"out_{i}.png"))
+               for i, p in enumerate(paths)]
+    first = None
+    jobs = []
+    for job_id in job_ids:
+        jobs.append(service.wait(job_id))
+        if first is None:
+            first = time.perf_counter() - start
+    elapsed = time.perf_counter() - start
+    service.stop()
+
+    failed = [j.error for j in jobs if j.status != JOB_DONE]
+    if failed:
+        raise RuntimeError(f"渲染失败: {failed[0]}")
+    pids = {j.stats['worker_pid'] for j in jobs}
+    return startup, first, elapsed, len(pids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=8)
+    parser.add_argument("--size", default="1200x800")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--recycle", type=int, default=3, help="回收变体中每个工作进程的任务数上限")
+    parser.add_argument("--font", default=None)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split('x'))
+    warmup = WorkerWarmup(font_path=args.font, seeds=tuple(range(args.images)))
+    variants = [
+        ("冷启动", {}),
+        ("预热", {'warmup': warmup}),
+        (f"预热+回收{args.recycle}", {'warmup': warmup, 'max_tasks_per_child': args.recycle}),
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = make_inputs(tmp_dir, args.images, width, height)
+        print(f"{args.images} 张 {width}x{height}，{args.workers} 个工作进程")
+        print(f"{'变体':<14}{'启动(s)':>10}{'首张(s)':>10}{'总耗时(s)':>12}{'张/秒':>10}{'进程数':>8}")
+        for name, kwargs in variants:
+            startup, first, elapsed, processes = run_variant(paths, tmp_dir, args.workers, args.font, **kwargs)
+            print(f"{name:<14}{startup:>10.2f}{first:>10.2f}{elapsed:>12.2f}"
+                  f"{args.images / elapsed:>10.2f}{processes:>8}")
+
+
+if __name__ == "__main__":
+    main()
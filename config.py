@@ -2,9 +2,52 @@
 # !/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from dataclasses import dataclass, field
-from typing import Tuple, Dict, List, Any
+from dataclasses import dataclass, field, fields
+from itertools import accumulate
+import hashlib
+from types import MappingProxyType
+from typing import Tuple, Dict, List, Any, Mapping
 import json
+import math
+
+# 可选值
+PRECISIONS = ('float32', 'float64')
+DEPTH_ENGINES = ('pyramid', 'pil')  # 'pyramid' 为 OpenCV 多级模糊金字塔，'pil' 为 PIL 单一半径高斯模糊
+DEPTH_FOCUS_MODES = ('fixed', 'auto')  # 'fixed' 使用配置的对焦中心与半径，'auto' 由主体凸包推算
+
+COLOR_FIELDS = (
+    'color_warning', 'color_error_text', 'color_normal_text', 'color_border',
+    'color_line', 'color_float', 'mesh_color', 'box_line_color'
+)
+
+# 以 randint(下限, 上限) 使用的整数范围 -> 下限的最小值（None 表示不限）
+_INT_RANGE_FIELDS = {
+    'log_blocks_range': 0, 'log_lines_per_block': 0, 'fatal_error_count': 0,
+    'torn_offset_x': None, 'torn_offset_y': None, 'staircase_step': None,
+    'box_count': 0, 'box_size_range': 1, 'warp_shift_range': None,
+}
+
+# 概率，取值 [0, 1]
+_PROBABILITY_FIELDS = (
+    'line_connect_chance', 'nerve_mutation_chance', 'node_text_chance', 'title_erosion_rate', 'hud_line_chance',
+    'torn_trigger_chance', 'box_line_connect_chance', 'box_line_jitter_chance', 'invert_chance',
+    'warp_glitch_chance', 'depth_darken_amount'
+)
+
+# 非负数
+_NON_NEGATIVE_FIELDS = (
+    'mesh_complexity', 'hex_dump_areas', 'rgb_shift_max', 'scanline_darkness', 'box_border_thickness',
+    'box_line_max_distance', 'box_line_thickness', 'box_line_jitter_amount', 'box_float_precision',
+    'bios_title_bar_height', 'warp_intensity', 'noise_perlin_intensity', 'noise_rgb_r_intensity',
+    'noise_rgb_g_intensity', 'noise_rgb_b_intensity', 'noise_scanline_intensity', 'noise_scanline_frequency',
+    'noise_strength', 'depth_focus_radius', 'depth_blur_amount', 'depth_fade_start'
+)
+
+# 至少为1
+_POSITIVE_FIELDS = ('warp_segments', 'noise_perlin_scale', 'noise_perlin_octaves', 'depth_blur_levels')
+
+# 规范化序列化格式的版本，格式变化时递增，旧指纹随之失效
+FINGERPRINT_VERSION = 1
 
 
 def ensure_rgba(color) -> Tuple[int, int, int, int]:
@@ -29,6 +72,123 @@ def ensure_rgba(color) -> Tuple[int, int, int, int]:
     return (255, 255, 255, 255)  # 默认白色
 
 
+def _freeze(value):
+    """转换为不可变的等价值：list/tuple -> tuple，dict -> 只读映射"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _canonical(value):
+    """规范化的 JSON 值
+
+    元组与列表都转为列表；字典转为按原顺序的 [键, 值] 列表（权重字典的顺序决定累积权重，影响抽样结果，
+    顺序不同的配置渲染结果也不同）；整数值的浮点数转为整数（300 与 300.0 等价）。
+    """
+    if isinstance(value, Mapping):
+        return [[k, _canonical(v)] for k, v in value.items()]
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _compile_color(name, value):
+    """配置颜色 -> RGBA 整数元组"""
+    try:
+        color = ensure_rgba(value)
+    except ValueError:
+        raise ValueError(f"配置项 {name} 不是有效的颜色: {value!r}") from None
+    if len(color) == 3:
+        color = color + (255,)
+    if len(color) != 4 or not all(0 <= c <= 255 for c in color):
+        raise ValueError(f"配置项 {name} 必须是 0-255 的 RGB/RGBA 整数: {value!r}")
+    return color
+
+
+def _compile_weights(name, weights):
+    """权重字典 -> (名称元组, 累积权重元组)"""
+    if not isinstance(weights, dict) or not weights:
+        raise ValueError(f"配置项 {name} 必须是非空的 {{名称: 权重}} 字典: {weights!r}")
+    for key, weight in weights.items():
+        if not _is_number(weight) or weight < 0:
+            raise ValueError(f"配置项 {name}[{key!r}] 的权重必须是非负数: {weight!r}")
+    cumulative = tuple(accumulate(weights.values()))
+    if cumulative[-1] <= 0:
+        raise ValueError(f"配置项 {name} 的权重之和必须大于0")
+    return tuple(weights), cumulative
+
+
+@dataclass(frozen=True, eq=False)
+class CompiledConfig:
+    """CyberConfig.compile() 的结果：校验过的不可变渲染参数
+
+    颜色已转换为整数元组，权重已累积，像素尺寸已按图像缩放系数换算；
+    渲染的热路径直接使用这些值，不再检查类型。values 为编译时全部配置项的只读快照。
+    相等与哈希按 (图像缩放系数, 指纹) 判断，等价的配置可以作为字典键或放入集合。
+    """
+    scale: float
+    values: Mapping[str, Any]
+    colors_rgba: Mapping[str, Tuple[int, int, int, int]]
+    colors_bgr: Mapping[str, Tuple[int, int, int]]
+    style_names: Tuple[str, ...]
+    style_cum_weights: Tuple[float, ...]
+    box_types: Tuple[str, ...]
+    box_type_cum_weights: Tuple[float, ...]
+    box_size_px: Tuple[int, int]
+    bios_title_bar_px: int
+    mesh_dot_radius_px: int
+    mesh_cross_px: int
+    _fingerprints: Dict = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def canonical_json(self, names=None) -> str:
+        """规范化序列化：按名称排序的配置项，颜色统一为 RGBA 整数元组，等价的配置得到相同的字符串
+
+        Args:
+            names: 只包含这些配置项，None 表示全部
+        """
+        names = sorted(self.values) if names is None else sorted(set(names))
+        unknown = [name for name in names if name not in self.values]
+        if unknown:
+            raise ValueError(f"未知的配置项: {unknown}")
+        payload = {name: _canonical(self.colors_rgba.get(name, self.values[name])) for name in names}
+        return json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+
+    def fingerprint_of(self, names=None) -> str:
+        """配置项的指纹（规范化序列化的 blake2b 哈希），同一对象上按配置项集合缓存
+
+        Args:
+            names: 只覆盖这些配置项，None 表示全部
+        """
+        key = None if names is None else frozenset(names)
+        fingerprint = self._fingerprints.get(key)
+        if fingerprint is None:
+            payload = f"v{FINGERPRINT_VERSION}:{self.canonical_json(names)}"
+            fingerprint = hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+            self._fingerprints[key] = fingerprint
+        return fingerprint
+
+    @property
+    def fingerprint(self) -> str:
+        """全部配置项的指纹（与图像缩放系数无关）"""
+        return self.fingerprint_of()
+
+    def __eq__(self, other):
+        if not isinstance(other, CompiledConfig):
+            return NotImplemented
+        return self.scale == other.scale and self.fingerprint == other.fingerprint
+
+    def __hash__(self):
+        return hash((self.scale, self.fingerprint))
+
+
 @dataclass
 class CyberConfig:
     """赛博朋克风格配置类"""
@@ -144,11 +304,23 @@ class CyberConfig:
 
     # 11. 景深效果
     enable_depth_of_field: bool = True
+    depth_focus_mode: str = 'fixed'  # 'fixed'（使用下面的中心与半径）或 'auto'（由主体凸包推算）
     depth_focus_center: Tuple[float, float] = (0.5, 0.5)
     depth_focus_radius: float = 0.3
     depth_blur_amount: float = 1.5
     depth_darken_amount: float = 0.7
     depth_fade_start: float = 0.2
+    depth_blur_levels: int = 3  # 模糊金字塔层数，失焦越深使用越粗的一层
+    depth_engine: str = 'pyramid'  # 'pyramid'（OpenCV 模糊金字塔）或 'pil'（PIL 单一半径模糊）
+
+    # 12. 计算精度 ('float32' 或 'float64')，所有噪声与扭曲计算使用该精度
+    precision: str = 'float32'
+
+    # 13. 特效流水线：按顺序执行的阶段名（见 core.stages 中注册的特效）
+    pipeline: List[str] = field(default_factory=lambda: [
+        'mesh', 'text', 'boxes', 'depth_of_field',
+        'crt', 'perlin_noise', 'rgb_noise', 'scanline_noise'
+    ])
 
     def __post_init__(self):
         """初始化后处理，确保颜色格式正确"""
@@ -175,6 +347,105 @@ class CyberConfig:
                 result[key] = str(value)
         return result
 
+    def compile(self, scale: float = 1.0) -> CompiledConfig:
+        """校验配置并预先计算渲染所需的派生值
+
+        Args:
+            scale: 图像缩放系数（宽度 / 1200），用于换算像素尺寸
+
+        Returns:
+            CompiledConfig
+
+        Raises:
+            ValueError: 配置项的类型或取值无效（错误信息包含配置项名称与取值）
+        """
+        # 标量配置项的类型与声明一致（int 可用于 float 配置项）
+        for f in fields(self):
+            value = getattr(self, f.name)
+            if f.type is bool:
+                ok = isinstance(value, bool)
+            elif f.type is float:
+                ok = _is_number(value)
+            elif f.type is int:
+                ok = isinstance(value, int) and not isinstance(value, bool)
+            elif f.type is str:
+                ok = isinstance(value, str)
+            else:
+                continue
+            if not ok:
+                raise ValueError(f"配置项 {f.name} 应为 {f.type.__name__}，得到 {value!r}")
+
+        colors_rgba = {name: _compile_color(name, getattr(self, name)) for name in COLOR_FIELDS}
+
+        for name, minimum in _INT_RANGE_FIELDS.items():
+            value = getattr(self, name)
+            if (not isinstance(value, (list, tuple)) or len(value) != 2
+                    or not all(isinstance(v, int) and not isinstance(v, bool) for v in value)):
+                raise ValueError(f"配置项 {name} 必须是两个整数 (下限, 上限): {value!r}")
+            if value[0] > value[1]:
+                raise ValueError(f"配置项 {name} 的下限大于上限: {value!r}")
+            if minimum is not None and value[0] < minimum:
+                raise ValueError(f"配置项 {name} 的下限不能小于 {minimum}: {value!r}")
+        for name in ('box_float_range', 'depth_focus_center'):
+            value = getattr(self, name)
+            if not isinstance(value, (list, tuple)) or len(value) != 2 or not all(_is_number(v) for v in value):
+                raise ValueError(f"配置项 {name} 必须是两个数: {value!r}")
+        if self.box_float_range[0] > self.box_float_range[1]:
+            raise ValueError(f"配置项 box_float_range 的下限大于上限: {self.box_float_range!r}")
+
+        for name in _PROBABILITY_FIELDS:
+            if not 0 <= getattr(self, name) <= 1:
+                raise ValueError(f"配置项 {name} 必须在 [0, 1] 之间: {getattr(self, name)!r}")
+        for name in _NON_NEGATIVE_FIELDS:
+            if getattr(self, name) < 0:
+                raise ValueError(f"配置项 {name} 不能为负数: {getattr(self, name)!r}")
+        for name in _POSITIVE_FIELDS:
+            if getattr(self, name) < 1:
+                raise ValueError(f"配置项 {name} 必须 >= 1: {getattr(self, name)!r}")
+
+        style_names, style_cum_weights = _compile_weights('style_weights', self.style_weights)
+        box_types, box_type_cum_weights = _compile_weights('box_type_weights', self.box_type_weights)
+        if self.use_extended_errors:
+            _compile_weights('error_weights', self.error_weights)
+        if self.box_type_weights.get('bios', 0) > 0 and not self.bios_title_formats:
+            raise ValueError("配置项 bios_title_formats 为空，但 box_type_weights 中 bios 的权重大于0")
+
+        for name, value, choices in (('precision', self.precision, PRECISIONS),
+                                     ('depth_engine', self.depth_engine, DEPTH_ENGINES),
+                                     ('depth_focus_mode', self.depth_focus_mode, DEPTH_FOCUS_MODES)):
+            if value not in choices:
+                raise ValueError(f"配置项 {name} 必须是 {' / '.join(choices)} 之一: {value!r}")
+        if not isinstance(self.pipeline, (list, tuple)) or not all(isinstance(n, str) for n in self.pipeline):
+            raise ValueError(f"配置项 pipeline 必须是阶段名列表: {self.pipeline!r}")
+
+        if not _is_number(scale) or scale <= 0:
+            raise ValueError(f"图像缩放系数必须为正数: {scale!r}")
+
+        return CompiledConfig(
+            scale=scale,
+            values=MappingProxyType({f.name: _freeze(getattr(self, f.name)) for f in fields(self)}),
+            colors_rgba=MappingProxyType(colors_rgba),
+            colors_bgr=MappingProxyType({name: (c[2], c[1], c[0]) for name, c in colors_rgba.items()}),
+            style_names=style_names,
+            style_cum_weights=style_cum_weights,
+            box_types=box_types,
+            box_type_cum_weights=box_type_cum_weights,
+            box_size_px=(int(self.box_size_range[0] * scale), int(self.box_size_range[1] * scale)),
+            bios_title_bar_px=int(self.bios_title_bar_height * scale),
+            mesh_dot_radius_px=max(1, int(1.5 * scale)),
+            mesh_cross_px=int(3 * scale),
+        )
+
+    def fingerprint(self) -> str:
+        """配置的规范化指纹（见 CompiledConfig.fingerprint）
+
+        CyberConfig 可变，这里每次重新编译；需要多次使用时先 compile()，指纹缓存在编译结果上。
+
+        Raises:
+            ValueError: 配置无效
+        """
+        return self.compile().fingerprint
+
     @classmethod
     def from_dict(cls, data: dict) -> 'CyberConfig':
         """从字典创建配置"""
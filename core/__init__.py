@@ -2,31 +2,52 @@
 # !/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from core.renderer import ConfigurableCyberCore
-from core.effects import apply_crt_effects, apply_depth_of_field, apply_space_warp, apply_perlin_noise, apply_rgb_noise, apply_scanline_noise
-from core.boxes import draw_boxes
-from core.text import draw_chaotic_text
-from core.utils import (
-    detect_subject,
-    draw_sparse_wireframe,
-    get_font,
-    draw_text_with_stroke,
-    draw_nerve_line
-)
-
-__all__ = [
-    'ConfigurableCyberCore',
-    'apply_crt_effects',
-    'apply_depth_of_field',
-    'apply_space_warp',
-    'apply_perlin_noise',
-    'apply_rgb_noise',
-    'apply_scanline_noise',
-    'draw_boxes',
-    'draw_chaotic_text',
-    'detect_subject',
-    'draw_sparse_wireframe',
-    'get_font',
-    'draw_text_with_stroke',
-    'draw_nerve_line'
-]
\ No newline at end of file
+"""核心渲染引擎
+
+子模块依赖 OpenCV / PIL，导入包本身不加载它们：首次访问导出名时才导入对应子模块 (PEP 562)。
+"""
+
+import importlib
+
+# 导出名 -> 所在子模块
+_EXPORTS = {
+    'ConfigurableCyberCore': 'core.renderer',
+    'SequenceRenderer': 'core.sequence',
+    'VideoRenderer': 'core.video',
+    'apply_crt_effects': 'core.effects',
+    'apply_depth_of_field': 'core.effects',
+    'apply_space_warp': 'core.effects',
+    'apply_perlin_noise': 'core.effects',
+    'apply_rgb_noise': 'core.effects',
+    'apply_scanline_noise': 'core.effects',
+    'draw_boxes': 'core.boxes',
+    'EffectSpec': 'core.stages',
+    'register_effect': 'core.stages',
+    'stage_fingerprints': 'core.stages',
+    'ImageAnalysis': 'core.layout',
+    'LayoutPlan': 'core.layout',
+    'analyze_image': 'core.layout',
+    'plan_layout': 'core.layout',
+    'rasterize_layout': 'core.layout',
+    'draw_chaotic_text': 'core.text',
+    'detect_subject': 'core.utils',
+    'draw_sparse_wireframe': 'core.utils',
+    'get_font': 'core.utils',
+    'draw_text_with_stroke': 'core.utils',
+    'draw_nerve_line': 'core.utils',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value  # 缓存，之后的访问不再经过 __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,215 @@
+# core/cache.py
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from config import CompiledConfig
+
+_PROJECT_ROOT = Path(__file__).parent.parent
+_code_version = None
+_font_hashes = {}  # (绝对路径, 大小, 修改时间) -> 内容哈希
+
+
+def get_code_version() -> str:
+    """渲染相关源码的哈希，源码变化后旧缓存自动失效"""
+    global _code_version
+    if _code_version is None:
+        h = hashlib.blake2b(digest_size=8)
+        files = sorted((_PROJECT_ROOT / 'core').glob('*.py')) + \
+            sorted((_PROJECT_ROOT / 'data').glob('*.py')) + [_PROJECT_ROOT / 'config.py']
+        for path in files:
+            h.update(path.name.encode())
+            h.update(path.read_bytes())
+        _code_version = h.hexdigest()
+    return _code_version
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def hash_file(path, chunk_size=1024 * 1024) -> str:
+    """文件内容哈希（分块读取，与 hash_bytes 结果一致）"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def hash_config(config) -> str:
+    """配置哈希：CyberConfig 或 CompiledConfig 的规范化指纹，等价的配置（如元组/列表、十六进制/元组颜色）哈希相同
+
+    Raises:
+        ValueError: 配置无效
+    """
+    if isinstance(config, CompiledConfig):
+        return config.fingerprint
+    return config.fingerprint()
+
+
+def hash_font(font_path) -> str:
+    """字体文件内容哈希，按 (路径, 大小, 修改时间) 记忆；路径为空或文件不存在时渲染使用默认字体，返回 'default'"""
+    if not font_path:
+        return 'default'
+    path = os.path.abspath(font_path)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return 'default'
+    key = (path, st.st_size, st.st_mtime_ns)
+    digest = _font_hashes.get(key)
+    if digest is None:
+        digest = _font_hashes[key] = hash_file(path)
+    return digest
+
+
+def make_cache_key(image_bytes: bytes, config, seed, font_path=None, ext='.png', preview_size=None,
+                   full_plan=False) -> str:
+    """由 (输入图片, 配置, 种子, 字体, 输出格式, 代码版本[, 预览尺寸与规划方式]) 生成内容寻址的缓存键"""
+    parts = [hash_bytes(image_bytes), hash_config(config), str(seed), hash_font(font_path), ext.lower(),
+             get_code_version()]
+    if preview_size:
+        parts.append(f"preview{int(preview_size)}" + ("-fullplan" if full_plan else ""))
+    return hashlib.blake2b(":".join(parts).encode(), digest_size=20).hexdigest()
+
+
+class RenderCache:
+    """本地磁盘上的渲染结果缓存
+
+    文件按缓存键存放在 cache_dir/<前两位>/<键><扩展名>，同名 .json 保存统计信息。
+    总大小超过上限时按最近最少使用 (LRU) 顺序淘汰。
+    """
+
+    def __init__(self, cache_dir="outputs/cache", max_bytes=1024 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._index = OrderedDict()  # key -> (数据文件路径, 大小)，按访问时间排序
+        self._lock = threading.Lock()
+        self._load_index()
+
+    def _load_index(self):
+        """扫描缓存目录，按修改时间重建LRU顺序"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entries = []
+        for path in self.cache_dir.glob('*/*'):
+            if path.suffix == '.json' or path.name.startswith('.'):
+                continue
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, path.stem, path, st.st_size))
+
+        for _, key, path, size in sorted(entries):
+            self._index[key] = (path, size)
+            self.total_bytes += size
+
+    def _meta_path(self, path: Path) -> Path:
+        return path.with_suffix('.json')
+
+    def get(self, key):
+        """查找缓存
+
+        Returns:
+            (数据文件路径, 统计信息字典)，未命中时返回None
+        """
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None or not entry[0].exists():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            path, _ = entry
+            self._index.move_to_end(key)
+            self.hits += 1
+
+        try:
+            os.utime(path)
+            with open(self._meta_path(path), 'r', encoding='utf-8') as f:
+                stats = json.load(f)
+        except (OSError, ValueError):
+            stats = {}
+        return path, stats
+
+    def get_bytes(self, key):
+        """查找缓存并读取数据，返回 (bytes, 统计信息) 或 None"""
+        hit = self.get(key)
+        if hit is None:
+            return None
+        path, stats = hit
+        try:
+            return path.read_bytes(), stats
+        except OSError:
+            return None
+
+    def put(self, key, ext, stats, data: bytes = None, src_path=None):
+        """写入缓存，data 与 src_path 二选一"""
+        path = self.cache_dir / key[:2] / f"{key}{ext}"
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp = path.with_name(f".{path.name}.tmp")
+        if data is not None:
+            tmp.write_bytes(data)
+        else:
+            shutil.copyfile(src_path, tmp)
+        os.replace(tmp, path)
+
+        meta_tmp = path.with_name(f".{key}.json.tmp")
+        with open(meta_tmp, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, ensure_ascii=False)
+        os.replace(meta_tmp, self._meta_path(path))
+
+        size = path.stat().st_size
+        with self._lock:
+            if key in self._index:
+                self.total_bytes -= self._index[key][1]
+            self._index[key] = (path, size)
+            self._index.move_to_end(key)
+            self.total_bytes += size
+            self._evict()
+
+    def _drop(self, key):
+        path, size = self._index.pop(key)
+        self.total_bytes -= size
+        for p in (path, self._meta_path(path)):
+            try:
+                p.unlink()
+            except OSError:
+                pass
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and len(self._index) > 1:
+            oldest = next(iter(self._index))
+            self._drop(oldest)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            for key in list(self._index):
+                self._drop(key)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_render_cache() -> RenderCache:
+    """获取全局渲染缓存"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = RenderCache()
+    return _cache
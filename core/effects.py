@@ -4,13 +4,14 @@
 
 import cv2
 import numpy as np
-import random
 from PIL import Image, ImageFilter, ImageEnhance
 import math
-import sys
-from pathlib import Path
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from functools import lru_cache
 
-sys.path.append(str(Path(__file__).parent.parent))
+from core.utils import clip_rect, intersect_rects, rects_area
 
 
 def _fade(t):
@@ -23,41 +24,46 @@ def _lerp(a, b, t):
     return a + t * (b - a)
 
 
+_GRAD_X = np.array([1.0, -1.0, 1.0, -1.0])
+_GRAD_Y = np.array([1.0, 1.0, -1.0, -1.0])
+
+
 def _grad_2d(hash_val, x, y):
-    """二维梯度向量点积"""
+    """二维梯度向量点积（支持数组）"""
     h = hash_val & 3
-    if h == 0:
-        return x + y
-    elif h == 1:
-        return -x + y
-    elif h == 2:
-        return x - y
-    else:
-        return -x - y
+    return _GRAD_X[h] * x + _GRAD_Y[h] * y
 
 
+@lru_cache(maxsize=1024)
 def _generate_permutation(seed):
-    """生成Perlin噪声的排列表"""
+    """生成Perlin噪声的排列表（按种子缓存，返回只读数组）"""
     rng = np.random.RandomState(seed)
     p = np.arange(256, dtype=int)
     rng.shuffle(p)
-    return np.concatenate([p, p])
+    perm = np.concatenate([p, p])
+    perm.flags.writeable = False
+    return perm
 
 
-def _perlin_noise_2d(x, y, perm):
-    """计算单个点的二维Perlin噪声值, 返回[-1, 1]"""
-    xi = int(np.floor(x)) & 255
-    yi = int(np.floor(y)) & 255
-    xf = x - np.floor(x)
-    yf = y - np.floor(y)
+def _perlin_octave(xs, ys, perm):
+    """对网格 ys × xs 计算一个八度的二维Perlin噪声, 返回[len(ys), len(xs)], 范围[-1, 1]"""
+    x0 = np.floor(xs)
+    y0 = np.floor(ys)
+    xi = x0.astype(np.int64) & 255
+    yi = (y0.astype(np.int64) & 255)[:, np.newaxis]
+    xf = (xs - x0)[np.newaxis, :]
+    yf = (ys - y0)[:, np.newaxis]
 
     u = _fade(xf)
     v = _fade(yf)
 
-    aa = perm[perm[xi] + yi]
-    ab = perm[perm[xi] + yi + 1]
-    ba = perm[perm[xi + 1] + yi]
-    bb = perm[perm[xi + 1] + yi + 1]
+    # 行列坐标可分离: 先按列查一次排列表, 再与行坐标广播组合
+    px0 = perm[xi][np.newaxis, :]
+    px1 = perm[xi + 1][np.newaxis, :]
+    aa = perm[px0 + yi]
+    ab = perm[px0 + yi + 1]
+    ba = perm[px1 + yi]
+    bb = perm[px1 + yi + 1]
 
     x1 = _lerp(_grad_2d(aa, xf, yf), _grad_2d(ba, xf - 1, yf), u)
     x2 = _lerp(_grad_2d(ab, xf, yf - 1), _grad_2d(bb, xf - 1, yf - 1), u)
@@ -66,7 +72,10 @@ def _perlin_noise_2d(x, y, perm):
 
 
 def _perlin_noise_2d_array(h, w, scale, octaves, seed):
-    """生成二维Perlin噪声数组, 返回[h, w]的float64数组, 范围[-1, 1]"""
+    """生成二维Perlin噪声数组, 返回[h, w]的float64数组, 范围[-1, 1]
+
+    逐八度直接求值的参考实现，渲染时使用更快的 _perlin_noise_multi。
+    """
     perm = _generate_permutation(seed)
 
     noise = np.zeros((h, w), dtype=np.float64)
@@ -75,18 +84,10 @@ def _perlin_noise_2d_array(h, w, scale, octaves, seed):
     max_amplitude = 0.0
 
     for _ in range(octaves):
-        # 向量化计算坐标
         xs = np.arange(w, dtype=np.float64) * frequency / scale
         ys = np.arange(h, dtype=np.float64) * frequency / scale
-        xv, yv = np.meshgrid(xs, ys)
 
-        # 逐像素计算(用向量化没法完全避免循环, 但numpy广播加速)
-        octave_noise = np.zeros((h, w), dtype=np.float64)
-        for yi in range(h):
-            for xi in range(w):
-                octave_noise[yi, xi] = _perlin_noise_2d(xv[yi, xi], yv[yi, xi], perm)
-
-        noise += octave_noise * amplitude
+        noise += _perlin_octave(xs, ys, perm) * amplitude
         max_amplitude += amplitude
         amplitude *= 0.5
         frequency *= 2.0
@@ -95,32 +96,340 @@ def _perlin_noise_2d_array(h, w, scale, octaves, seed):
     return noise
 
 
-def apply_perlin_noise(core, img):
-    """应用Perlin噪声 - 模拟胶片颗粒和自然纹理"""
-    h, w = img.shape[:2]
-    intensity = core.cfg.noise_perlin_intensity * core.cfg.noise_strength
+def _octave_tables(xs, lattice_rows, perms):
+    """预计算一个八度在各格点行上的列方向插值表
+
+    对格点行 r，像素 (y, x) 的上边插值 x1 = P[r, x] + yf * Q[r, x]，
+    下边 x2 = P[r+1, x] + (yf - 1) * Q[r+1, x]，P/Q 只依赖列坐标与格点行，
+    因此逐像素计算只剩按行取表与线性组合。
+
+    Returns:
+        P, Q: [len(lattice_rows), len(xs), len(perms)] 的float64数组
+    """
+    x0 = np.floor(xs)
+    xi = x0.astype(np.int64) & 255
+    xf = xs - x0
+    u = _fade(xf)
+
+    rows = (lattice_rows & 255)[:, np.newaxis]
+    k = len(perms)
+    P = np.empty((len(lattice_rows), len(xs), k), dtype=np.float64)
+    Q = np.empty_like(P)
+    for c, perm in enumerate(perms):
+        g_a = perm[perm[xi][np.newaxis, :] + rows] & 3
+        g_b = perm[perm[xi + 1][np.newaxis, :] + rows] & 3
+        P[:, :, c] = (1 - u) * _GRAD_X[g_a] * xf + u * _GRAD_X[g_b] * (xf - 1)
+        Q[:, :, c] = (1 - u) * _GRAD_Y[g_a] + u * _GRAD_Y[g_b]
+    return P, Q
+
+
+def _perlin_noise_multi(h, w, scale, octaves, seeds, dtype=np.float32):
+    """一次生成多个种子的二维Perlin噪声, 返回[h, w, len(seeds)]数组, 范围[-1, 1]
+
+    各种子共享坐标网格、缓和曲线和八度频率表，结果与逐个调用
+    _perlin_noise_2d_array 在数值上一致（误差在 dtype 精度内）。
+    """
+    perms = [_generate_permutation(seed) for seed in seeds]
+    k = len(perms)
+
+    amplitudes = 0.5 ** np.arange(octaves)
+    frequencies = 2.0 ** np.arange(octaves)
+    weights = amplitudes / amplitudes.sum()
+
+    noise = np.zeros((h, w, k), dtype=dtype)
+    tmp = np.empty((h, w, k), dtype=dtype)
+
+    for frequency, weight in zip(frequencies, weights):
+        xs = np.arange(w, dtype=np.float64) * frequency / scale
+        ys = np.arange(h, dtype=np.float64) * frequency / scale
+
+        y0 = np.floor(ys)
+        yf = ys - y0
+        v = _fade(yf)
+        y0 = y0.astype(np.int64)
+        lattice_rows = np.arange(y0[0], y0[-1] + 2)
+        rel = y0 - y0[0]
+
+        P, Q = _octave_tables(xs, lattice_rows, perms)
+        P = P.astype(dtype)
+        Q = Q.astype(dtype)
+
+        # n = (1-v)·x1 + v·x2，振幅权重直接并入逐行系数
+        coeffs = (
+            (P, rel, (1 - v) * weight),
+            (Q, rel, (1 - v) * yf * weight),
+            (P, rel + 1, v * weight),
+            (Q, rel + 1, v * (yf - 1) * weight),
+        )
+        for table, index, coef in coeffs:
+            np.take(table, index, axis=0, out=tmp)
+            tmp *= coef.astype(dtype)[:, np.newaxis, np.newaxis]
+            noise += tmp
+
+    return noise
+
+
+# 三维改进Perlin噪声的16个梯度方向（立方体12条棱 + 4个重复），按 hash & 15 索引
+_GRAD3_X = np.array([1.0, -1.0, 1.0, -1.0, 1.0, -1.0, 1.0, -1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, -1.0, 0.0])
+_GRAD3_Y = np.array([1.0, 1.0, -1.0, -1.0, 0.0, 0.0, 0.0, 0.0, 1.0, -1.0, 1.0, -1.0, 1.0, -1.0, 1.0, -1.0])
+_GRAD3_Z = np.array([0.0, 0.0, 0.0, 0.0, 1.0, 1.0, -1.0, -1.0, 1.0, 1.0, -1.0, -1.0, 0.0, 1.0, 0.0, -1.0])
+
+# 时间噪声每个循环跨越的时间格点数，越大变化越快
+NOISE_TIME_PERIOD = 2
+
+
+def _plane_tables(xs, lattice_rows, perm, zi):
+    """预计算三维Perlin噪声在整数时间格点平面 zi 上、各格点行的列方向插值表
+
+    与 _octave_tables 相同的分解：对格点行 r，xy 梯度分量的上边插值为 P[r, x] + yf * Q[r, x]，
+    z 梯度分量的插值为 R[r, x]。时间 z = zi + dz 处该平面的贡献为 (xy 项) + dz * (z 项)。
+
+    Returns:
+        P, Q, R: [len(lattice_rows), len(xs)] 的float64数组
+    """
+    x0 = np.floor(xs)
+    xi = x0.astype(np.int64) & 255
+    xf = xs - x0
+    u = _fade(xf)
+
+    rows = (lattice_rows & 255)[:, np.newaxis]
+    g_a = perm[perm[perm[xi][np.newaxis, :] + rows] + (zi & 255)] & 15
+    g_b = perm[perm[perm[xi + 1][np.newaxis, :] + rows] + (zi & 255)] & 15
+    P = (1 - u) * _GRAD3_X[g_a] * xf + u * _GRAD3_X[g_b] * (xf - 1)
+    Q = (1 - u) * _GRAD3_Y[g_a] + u * _GRAD3_Y[g_b]
+    R = (1 - u) * _GRAD3_Z[g_a] + u * _GRAD3_Z[g_b]
+    return P, Q, R
+
+
+class NoiseCache:
+    """噪声场缓存（线程安全）
+
+    同一 (尺寸, 缩放, 八度, 种子) 的噪声场只计算一次，多个渲染线程共享。
+    并发请求同一噪声场时，后到的线程等待先到者的计算结果。
+    超过字节上限时按最近最少使用顺序淘汰。
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict()  # key -> Future
+        self._lock = threading.Lock()
+
+    def get(self, key, factory):
+        with self._lock:
+            fut = self._entries.get(key)
+            owner = fut is None
+            if owner:
+                fut = self._entries[key] = Future()
+            else:
+                self._entries.move_to_end(key)
+        if not owner:
+            return fut.result()
+
+        try:
+            value = factory()
+            value.flags.writeable = False
+        except BaseException as e:
+            with self._lock:
+                self._entries.pop(key, None)
+            fut.set_exception(e)
+            raise
+        fut.set_result(value)
+
+        with self._lock:
+            self.total_bytes += value.nbytes
+            while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+                old_key, old_fut = next(iter(self._entries.items()))
+                if not old_fut.done():
+                    break
+                del self._entries[old_key]
+                self.total_bytes -= old_fut.result().nbytes
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+
+noise_cache = NoiseCache()
+
+
+def get_noise_fields(h, w, scale, octaves, seeds, dtype=np.float32):
+    """获取（缓存的）多种子Perlin噪声场，返回只读的[h, w, len(seeds)]数组"""
+    seeds = tuple(int(seed) for seed in seeds)
+    dtype = np.dtype(dtype)
+    key = (h, w, float(scale), int(octaves), seeds, dtype.name)
+    return noise_cache.get(key, lambda: _perlin_noise_multi(h, w, scale, octaves, seeds, dtype))
+
+
+def get_noise_field(h, w, scale, octaves, seed, dtype=np.float32):
+    """获取（缓存的）单种子Perlin噪声场，返回只读的[h, w]数组"""
+    return get_noise_fields(h, w, scale, octaves, (seed,), dtype)[:, :, 0]
+
+
+def _time_plane(h, w, scale, octaves, seed, plane, dtype):
+    """（缓存的）时间格点平面上按振幅合并各八度后的插值项，返回只读的[h, w, 2]数组 (xy 项, z 项)"""
+    key = ('time', h, w, float(scale), int(octaves), int(seed), int(plane), dtype.name)
+
+    def compute():
+        perm = _generate_permutation(seed)
+        amplitudes = 0.5 ** np.arange(octaves)
+        frequencies = 2.0 ** np.arange(octaves)
+        weights = amplitudes / amplitudes.sum()
+
+        out = np.zeros((h, w, 2), dtype=dtype)
+        tmp = np.empty((h, w), dtype=dtype)
+        for frequency, weight in zip(frequencies, weights):
+            xs = np.arange(w, dtype=np.float64) * frequency / scale
+            ys = np.arange(h, dtype=np.float64) * frequency / scale
+
+            y0 = np.floor(ys)
+            yf = ys - y0
+            v = _fade(yf)
+            y0 = y0.astype(np.int64)
+            rel = y0 - y0[0]
+
+            P, Q, R = (table.astype(dtype) for table in
+                       _plane_tables(xs, np.arange(y0[0], y0[-1] + 2), perm, plane))
+            coeffs = (
+                (P, rel, (1 - v) * weight, 0),
+                (Q, rel, (1 - v) * yf * weight, 0),
+                (P, rel + 1, v * weight, 0),
+                (Q, rel + 1, v * (yf - 1) * weight, 0),
+                (R, rel, (1 - v) * weight, 1),
+                (R, rel + 1, v * weight, 1),
+            )
+            for table, index, coef, channel in coeffs:
+                np.take(table, index, axis=0, out=tmp)
+                tmp *= coef.astype(dtype)[:, np.newaxis]
+                out[:, :, channel] += tmp
+        return out
+
+    return noise_cache.get(key, compute)
+
+
+def get_noise_fields_at(h, w, scale, octaves, seeds, t, period=NOISE_TIME_PERIOD, dtype=np.float32):
+    """循环的时间相关Perlin噪声场：三维噪声在时间 t ∈ [0, 1) 处的切片, 返回[h, w, len(seeds)]数组
+
+    时间方向每个循环跨越 period 个格点（各八度共用，不随频率加倍），格点序号取模，t=0 与 t=1 首尾相接。
+    各八度因此共享同一时间插值系数，可以在每个时间格点平面上预先按振幅合并；
+    合并后的平面经 noise_cache 缓存，每帧只需对相邻两个平面做线性组合，范围约[-1, 1]。
+    """
+    dtype = np.dtype(dtype)
+    z = (t % 1.0) * period
+    z0 = int(math.floor(z))
+    dz = z - z0
+    s = _fade(dz)
+
+    noise = np.empty((h, w, len(seeds)), dtype=dtype)
+    for c, seed in enumerate(seeds):
+        p0 = _time_plane(h, w, scale, octaves, seed, z0 % period, dtype)
+        p1 = _time_plane(h, w, scale, octaves, seed, (z0 + 1) % period, dtype)
+        # (1-s)·(A0 + dz·B0) + s·(A1 + (dz-1)·B1)
+        out = noise[:, :, c]
+        np.multiply(p0[:, :, 0], dtype.type(1 - s), out=out)
+        for field, coef in ((p0[:, :, 1], (1 - s) * dz), (p1[:, :, 0], s), (p1[:, :, 1], s * (dz - 1))):
+            if coef:
+                out += field * dtype.type(coef)
+    return noise
+
+
+def get_noise_field_at(h, w, scale, octaves, seed, t, period=NOISE_TIME_PERIOD, dtype=np.float32):
+    """单种子的循环时间噪声场，返回[h, w]数组"""
+    return get_noise_fields_at(h, w, scale, octaves, (seed,), t, period, dtype)[:, :, 0]
+
+
+def _rgb_noise_seeds(seed):
+    """RGB三个通道噪声场的种子"""
+    return tuple(seed + c * 100 for c in range(3))
+
+
+def _rgb_noise_params(core):
+    """RGB通道噪声的 (scale, octaves, seeds)"""
+    return (core.cfg.noise_perlin_scale * 1.2,
+            max(2, core.cfg.noise_perlin_octaves - 1),
+            _rgb_noise_seeds(core.seed))
+
+
+def warm_noise_tables(seeds):
+    """预先生成给定渲染种子会用到的全部Perlin排列表
+
+    Returns:
+        生成的排列表数量
+    """
+    count = 0
+    for seed in seeds:
+        for s in (seed,) + _rgb_noise_seeds(seed):
+            _generate_permutation(s)
+            count += 1
+    return count
+
+
+def perlin_noise_tasks(core):
+    """Perlin噪声场的计算任务 [(fn, args)]，只依赖尺寸、配置和种子，可提前并行计算"""
+    return [(get_noise_field, (core.h, core.w, core.cfg.noise_perlin_scale,
+                               core.cfg.noise_perlin_octaves, core.seed, core.dtype))]
+
 
-    noise = _perlin_noise_2d_array(
-        h, w,
-        scale=core.cfg.noise_perlin_scale,
-        octaves=core.cfg.noise_perlin_octaves,
-        seed=core.seed
-    )
+def rgb_noise_tasks(core):
+    """RGB通道噪声场的计算任务 [(fn, args)]"""
+    return [(get_noise_fields, (core.h, core.w) + _rgb_noise_params(core) + (core.dtype,))]
+
+
+def _noise_extent(core, img, rows):
+    """噪声场的尺寸 (h, w)：整幅图像，或 img 为整帧（core.h 行）中 rows 对应的行带时取整帧尺寸"""
+    if rows is None:
+        return img.shape[:2]
+    return core.h, img.shape[1]
+
+
+def apply_perlin_noise(core, img, t=None, period=NOISE_TIME_PERIOD, rows=None):
+    """应用Perlin噪声 - 模拟胶片颗粒和自然纹理
+
+    Args:
+        t: 动画时间 [0, 1)，None 表示静态噪声；指定时使用循环的时间噪声场
+        period: 时间噪声每个循环跨越的格点数
+        rows: img 为整帧中的一个行带时，该行带的切片 slice(y0, y1)
+    """
+    h, w = _noise_extent(core, img, rows)
+    dtype = core.dtype
+    intensity = dtype.type(core.cfg.noise_perlin_intensity * core.cfg.noise_strength)
+
+    if t is None:
+        noise = get_noise_field(
+            h, w,
+            scale=core.cfg.noise_perlin_scale,
+            octaves=core.cfg.noise_perlin_octaves,
+            seed=core.seed,
+            dtype=dtype
+        )
+    else:
+        noise = get_noise_field_at(h, w, core.cfg.noise_perlin_scale, core.cfg.noise_perlin_octaves,
+                                   core.seed, t, period, dtype)
+
+    if rows is not None:
+        noise = noise[rows]
 
     # 将噪声映射到[-intensity, intensity]
-    noise_map = (noise * intensity).astype(np.float64)
+    noise_map = noise * intensity
 
     # 应用到图像
-    result = img.astype(np.float64)
-    for c in range(3):
-        result[:, :, c] += noise_map
+    result = img.astype(dtype)
+    result += noise_map[:, :, np.newaxis]
 
     return np.clip(result, 0, 255).astype(np.uint8)
 
 
-def apply_rgb_noise(core, img):
-    """RGB通道独立噪声 - 三个通道分别添加不同程度噪声"""
-    h, w = img.shape[:2]
+def apply_rgb_noise(core, img, t=None, period=NOISE_TIME_PERIOD, rows=None):
+    """RGB通道独立噪声 - 三个通道分别添加不同程度噪声
+
+    Args:
+        t: 动画时间 [0, 1)，None 表示静态噪声
+        period: 时间噪声每个循环跨越的格点数
+        rows: img 为整帧中的一个行带时，该行带的切片 slice(y0, y1)
+    """
+    h, w = _noise_extent(core, img, rows)
     strength = core.cfg.noise_strength
     intensities = [
         core.cfg.noise_rgb_r_intensity * strength,
@@ -128,50 +437,78 @@ def apply_rgb_noise(core, img):
         core.cfg.noise_rgb_b_intensity * strength,
     ]
 
-    result = img.astype(np.float64)
-    for c in range(3):
-        noise = _perlin_noise_2d_array(
-            h, w,
-            scale=core.cfg.noise_perlin_scale * 1.2,
-            octaves=max(2, core.cfg.noise_perlin_octaves - 1),
-            seed=core.seed + c * 100
-        )
-        result[:, :, c] += noise * intensities[c]
+    # 三个通道的噪声场一次生成 [h, w, 3]
+    if t is None:
+        noise = get_noise_fields(h, w, *_rgb_noise_params(core), dtype=core.dtype)
+    else:
+        noise = get_noise_fields_at(h, w, *_rgb_noise_params(core), t, period, core.dtype)
+    if rows is not None:
+        noise = noise[rows]
+
+    result = img.astype(core.dtype)
+    result += noise * np.array(intensities, dtype=core.dtype)
 
     return np.clip(result, 0, 255).astype(np.uint8)
 
 
-def apply_scanline_noise(core, img):
-    """扫描线噪声 - 模拟老式电视扫描线干扰"""
-    h, w = img.shape[:2]
+def apply_scanline_noise(core, img, phase=0.0, rows=None):
+    """扫描线噪声 - 模拟老式电视扫描线干扰
+
+    Args:
+        phase: 正弦波相位（以周期为单位），动画中逐帧推进形成滚动的干扰带
+        rows: img 为整帧中的一个行带时，该行带的切片 slice(y0, y1)
+    """
+    h, w = _noise_extent(core, img, rows)
     intensity = core.cfg.noise_scanline_intensity * core.cfg.noise_strength
     freq = core.cfg.noise_scanline_frequency
 
-    result = img.astype(np.float64)
+    result = img.astype(core.dtype)
 
-    # 每条扫描线施加随机偏移
+    # 每条扫描线施加随机偏移: 正弦波 + 随机抖动
     rng = np.random.RandomState(core.seed + 777)
-    for y in range(0, h, 2):
-        # 扫描线基础亮度调制: 正弦波 + 随机抖动
-        sine_val = np.sin(2.0 * np.pi * freq * y / h)
-        jitter = rng.uniform(-0.3, 0.3)
-        line_intensity = intensity * (0.5 + 0.5 * sine_val + jitter)
-
-        # 偶数行稍微变暗, 模拟CRT扫描线
-        if y % 2 == 0:
-            result[y, :, :] -= line_intensity * 0.6
-        else:
-            result[y, :, :] += line_intensity * 0.2
+    ys = np.arange(0, h, 2)
+    sine_val = np.sin(2.0 * np.pi * freq * ys / h + 2.0 * np.pi * phase)
+    jitter = rng.uniform(-0.3, 0.3, size=len(ys))
+    line_intensity = intensity * (0.5 + 0.5 * sine_val + jitter)
+
+    if rows is not None:
+        # 只保留落在行带内的扫描线，行号换算为行带内的偏移
+        band = slice((rows.start + 1) // 2, (rows.stop + 1) // 2)
+        ys = ys[band] - rows.start
+        line_intensity = line_intensity[band]
+
+    # 偶数行稍微变暗, 模拟CRT扫描线
+    result[ys] -= (line_intensity * 0.6).astype(core.dtype)[:, np.newaxis, np.newaxis]
 
     return np.clip(result, 0, 255).astype(np.uint8)
 
 
+def crt_shift(core):
+    """抽取CRT红/蓝通道的偏移量 (shift_x, shift_y)"""
+    shift_x = int(core.rng.uniform(1, core.cfg.rgb_shift_max) * core.scale)
+    shift_y = int(core.rng.uniform(0, 1) * core.scale)
+    return shift_x, shift_y
+
+
+def crt_scanline_spacing(core):
+    """CRT扫描线间距（像素）"""
+    return max(2, int(3 * core.scale))
+
+
 def apply_crt_effects(core, img):
     """应用CRT屏幕效果"""
+    return render_crt(core, img, *crt_shift(core))
+
+
+def render_crt(core, img, shift_x, shift_y, scanline_offset=0):
+    """按给定的通道偏移与扫描线起始行渲染CRT效果
+
+    Args:
+        shift_x, shift_y: 红色通道的偏移量，蓝色通道反向偏移（可为小数，亚像素插值）
+        scanline_offset: 扫描线起始行，动画中逐帧推进形成滚动效果
+    """
     h, w = img.shape[:2]
     b, g, r = cv2.split(img)
-    shift_x = int(random.uniform(1, core.cfg.rgb_shift_max) * core.scale)
-    shift_y = int(random.uniform(0, 1) * core.scale)
 
     # 红色通道偏移
     M_r = np.float32([[1, 0, shift_x], [0, 1, shift_y]])
@@ -185,115 +522,389 @@ def apply_crt_effects(core, img):
     glitched = cv2.merge((b_shifted, g, r_shifted))
 
     # 扫描线效果
-    scanline_spacing = max(2, int(3 * core.scale))
-    for y in range(0, h, scanline_spacing):
-        glitched[y:y + 1] = glitched[y:y + 1] * core.cfg.scanline_darkness
+    scanline_spacing = crt_scanline_spacing(core)
+    rows = slice(scanline_offset % scanline_spacing, None, scanline_spacing)
+    glitched[rows] = glitched[rows] * core.dtype.type(core.cfg.scanline_darkness)
 
     return glitched
 
 
-def apply_depth_of_field(core, img_pil):
-    """应用景深效果"""
-    if not core.cfg.enable_depth_of_field:
-        return img_pil
+# 景深需要处理的矩形面积超过整幅图像的该比例时，直接整幅处理
+DOF_REGION_MAX_FRACTION = 0.8
 
-    w, h = img_pil.size
-    focus_x = int(w * core.cfg.depth_focus_center[0])
-    focus_y = int(h * core.cfg.depth_focus_center[1])
-    focus_radius = min(w, h) * core.cfg.depth_focus_radius
 
-    # 创建深度蒙版
-    depth_mask = Image.new('L', (w, h), 0)
+def depth_focus(core):
+    """对焦区域 (中心x比例, 中心y比例, 半径比例)
 
-    # 创建径向渐变
-    for y in range(h):
-        for x in range(w):
-            dist = math.sqrt((x - focus_x)**2 + (y - focus_y)**2)
-            if dist > focus_radius:
-                fade = min(1.0, (dist - focus_radius) / (min(w, h) * core.cfg.depth_fade_start))
-                depth = int(255 * fade)
-                depth_mask.putpixel((x, y), depth)
+    depth_focus_mode 为 'auto' 且布局计划中有主体对焦区域时使用它（图像分析时由主体凸包的矩算出，
+    与计划一同复用），否则使用配置中的 depth_focus_center / depth_focus_radius。
+    """
+    plan = getattr(core, 'plan', None)
+    if core.cfg.depth_focus_mode == 'auto' and plan is not None and plan.focus is not None:
+        return plan.focus
+    return core.cfg.depth_focus_center[0], core.cfg.depth_focus_center[1], core.cfg.depth_focus_radius
 
-    # 应用模糊效果
-    blurred = img_pil.filter(ImageFilter.GaussianBlur(radius=core.cfg.depth_blur_amount))
-    enhancer = ImageEnhance.Brightness(blurred)
-    darkened = enhancer.enhance(1.0 - core.cfg.depth_darken_amount * 0.3)
 
-    # 根据深度蒙版混合
-    result = Image.composite(darkened, img_pil, depth_mask)
-    return result
+def _focus_geometry(core, w, h):
+    """对焦中心 (x, y) 与对焦半径（像素）"""
+    center_x, center_y, radius = depth_focus(core)
+    return int(w * center_x), int(h * center_y), min(w, h) * radius
 
 
-def apply_space_warp(core, img_pil, x, y, w, h):
-    """应用空间错位效果"""
-    # 裁剪区域
-    region = img_pil.crop((x, y, x + w, y + h))
-    if region.size[0] == 0 or region.size[1] == 0:
-        return img_pil
+def depth_of_field_region(core, w, h):
+    """景深会改变的区域 [(x0, y0, x1, y1)]：对焦圆内接正方形以外的（至多）四个矩形
+
+    正方形内的像素到对焦中心的距离不超过对焦半径，深度为0，模糊与混合都可以跳过。
+    """
+    focus_x, focus_y, focus_radius = _focus_geometry(core, w, h)
+    half = int(focus_radius / math.sqrt(2)) - 1
+    inner = clip_rect(focus_x - half, focus_y - half, focus_x + half + 1, focus_y + half + 1, w, h)
+    if half <= 0 or inner is None:
+        return [(0, 0, w, h)]
+
+    x0, y0, x1, y1 = inner
+    rects = [(0, 0, w, y0), (0, y1, w, h), (0, y0, x0, y1), (x1, y0, w, y1)]
+    return [rect for rect in rects if rect[0] < rect[2] and rect[1] < rect[3]]
 
-    region_np = np.array(region)
-    h_reg, w_reg = region_np.shape[:2]
 
-    # 创建扭曲后的图像
-    warped_np = region_np.copy()
+def _depth_mask(core, rect, w, h):
+    """rect 内各像素的深度（0 为对焦区域内，1 为完全失焦），core.dtype 数组"""
+    focus_x, focus_y, focus_radius = _focus_geometry(core, w, h)
+    fade_len = max(min(w, h) * core.cfg.depth_fade_start, 1e-6)
+    x0, y0, x1, y1 = rect
+    xs = np.arange(x0, x1, dtype=core.dtype) - focus_x
+    ys = np.arange(y0, y1, dtype=core.dtype) - focus_y
+    dist = np.sqrt(xs[np.newaxis, :] ** 2 + ys[:, np.newaxis] ** 2)
+    return np.clip((dist - focus_radius) / fade_len, 0, 1)
+
+
+# 高斯模糊半径超过该值时先缩小一半再模糊
+PYR_BLUR_SIGMA = 3.0
+
+
+def _gaussian_blur(src, sigma):
+    """高斯模糊；大半径时先 pyrDown，在一半尺寸上模糊后 pyrUp 回原尺寸
+
+    pyrDown 与 pyrUp 的 5 抽头核在原尺寸上各相当于方差为1的高斯模糊，剩余的模糊在缩小后的图上完成，
+    计算量约为原来的 1/4 且与直接模糊几乎看不出差别。
+    """
+    if sigma <= PYR_BLUR_SIGMA or min(src.shape[:2]) < 16:
+        return cv2.GaussianBlur(src, (0, 0), sigma) if sigma > 0 else src
+    blurred = _gaussian_blur(cv2.pyrDown(src), math.sqrt(sigma ** 2 - 2) / 2)
+    return cv2.pyrUp(blurred, dstsize=(src.shape[1], src.shape[0]))
+
+
+def _blur_levels(src, sigma, gains):
+    """src 的模糊金字塔 [第1层, 第2层, ...]，第 k 层乘以亮度系数 gains[k-1] 后放大回 src 的尺寸
+
+    第1层为 sigma 的高斯模糊，之后每层在上一层的基础上再 pyrDown 一次（模糊程度约翻倍），
+    变暗在缩小后的层上进行，再逐级 pyrUp 回原尺寸；缩小后的计算量按 1/4 递减，多一层的开销很小。
+    """
+    smalls = [_gaussian_blur(src, sigma)]
+    for _ in range(len(gains) - 1):
+        smalls.append(cv2.pyrDown(smalls[-1]))
+
+    levels = []
+    for k, gain in enumerate(gains):
+        up = cv2.convertScaleAbs(smalls[k], alpha=gain)
+        for larger in reversed(smalls[:k]):
+            up = cv2.pyrUp(up, dstsize=(larger.shape[1], larger.shape[0]))
+        levels.append(up)
+    return levels
+
+
+def _pyramid_count(core, w, h):
+    """实际用到的模糊层数：离对焦中心最远的角决定，为0时整幅图像都在对焦区域内"""
+    focus_x, focus_y, focus_radius = _focus_geometry(core, w, h)
+    fade_len = max(min(w, h) * core.cfg.depth_fade_start, 1e-6)
+    levels = max(1, int(core.cfg.depth_blur_levels))
+    far = max(math.hypot(x - focus_x, y - focus_y) for x in (0, w - 1) for y in (0, h - 1))
+    return min(levels, math.ceil(levels * min(1.0, (far - focus_radius) / fade_len)))
+
+
+def _blur_reach(core, w, h):
+    """模糊时需要向外多取的边距与裁剪起点的对齐（像素）
+
+    pyramid 引擎每次 pyrDown 采样间隔翻倍，裁剪起点按最深一层的采样间隔对齐，
+    边距覆盖高斯核与各级 5 抽头核的作用范围，裁剪区域内的结果与整幅图像模糊逐像素一致。
+    """
+    sigma = core.cfg.depth_blur_amount
+    if core.cfg.depth_engine == 'pil':
+        return int(4 * sigma) + 4, 1
+    depth = max(0, _pyramid_count(core, w, h) - 1)
+    while sigma > PYR_BLUR_SIGMA:
+        sigma = math.sqrt(sigma ** 2 - 2) / 2
+        depth += 1
+    return math.ceil(4 * core.cfg.depth_blur_amount) + 4 * 2 ** depth + 4, 2 ** depth
+
+
+def depth_of_field_bounds(core, w, h):
+    """景深实际处理的矩形 [(rect, bounds)]：rect 为写回的区域，bounds 为模糊时读取的区域
+
+    bounds 为 rect 外扩模糊边距后的矩形（起点按 _blur_reach 对齐）。所有 bounds 的面积之和
+    接近整幅图像时改为整幅模糊一次（所有 bounds 均为整幅图像），分块的裁剪与重复的边距反而更慢。
+    """
+    full = (0, 0, w, h)
+    margin, align = _blur_reach(core, w, h)
+    pairs = []
+    for rect in depth_of_field_region(core, w, h):
+        x0, y0, x1, y1 = rect
+        bounds = clip_rect((x0 - margin) // align * align, (y0 - margin) // align * align,
+                           x1 + margin, y1 + margin, w, h)
+        pairs.append((rect, bounds))
+    if rects_area([bounds for _, bounds in pairs]) > DOF_REGION_MAX_FRACTION * w * h:
+        return [(rect, full) for rect, _ in pairs]
+    return pairs
+
+
+def depth_of_field_work_region(core, w, h):
+    """景深读取并模糊的区域（各不相同的 bounds，相邻 bounds 重叠的边距重复计算），用于统计阶段读写的字节数"""
+    return list(dict.fromkeys(bounds for _, bounds in depth_of_field_bounds(core, w, h)))
+
+
+def _depth_of_field_pyramid(core, img):
+    """OpenCV 模糊金字塔景深，原地修改并返回 img
+
+    深度 d 对应位置 d * depth_blur_levels（第0层为原图），在相邻两层之间线性插值。
+    每层预先乘以该层深度对应的亮度系数，插值后的变暗程度同样随深度线性变化。
+    模糊金字塔只在 depth_of_field_bounds 的各 bounds 内计算（对焦圆内接正方形不参与模糊）；
+    混合从最外层开始向内逐层进行：第 i 层只影响深度位置小于 i+1 的像素，
+    即对焦圆外扩到第 i 层的圆内，每一步只处理该圆的包围矩形与 rect 的交集，更外面的像素直接取最外层。
+    """
+    h, w = img.shape[:2]
+    focus_x, focus_y, focus_radius = _focus_geometry(core, w, h)
+    fade_len = max(min(w, h) * core.cfg.depth_fade_start, 1e-6)
+    levels = max(1, int(core.cfg.depth_blur_levels))
+    darken = core.cfg.depth_darken_amount * 0.3
+
+    count = _pyramid_count(core, w, h)
+    if count <= 0:
+        return img
+
+    step = fade_len / levels
+    gains = [1 - darken * k / levels for k in range(1, count + 1)]
+
+    def ring_rect(i):
+        """深度位置小于 i+1 的像素的包围矩形"""
+        reach = focus_radius + (i + 1) * step
+        return clip_rect(math.floor(focus_x - reach), math.floor(focus_y - reach),
+                         math.ceil(focus_x + reach) + 1, math.ceil(focus_y + reach) + 1, w, h)
+
+    # 各矩形都从原图读取（相邻矩形的边距互相重叠），全部算完后再写回；相同的 bounds 只模糊一次
+    outer = ring_rect(count - 1)
+    pyramids = {}
+    results = []
+    for rect, bounds in depth_of_field_bounds(core, w, h):
+        x0, y0, x1, y1 = rect
+        bx0, by0, bx1, by1 = bounds
+        blurred = pyramids.get(bounds)
+        if blurred is None:
+            blurred = pyramids[bounds] = _blur_levels(img[by0:by1, bx0:bx1], core.cfg.depth_blur_amount, gains)
+        out = blurred[-1][y0 - by0:y1 - by0, x0 - bx0:x1 - bx0].copy()
+        area = intersect_rects(rect, outer) if outer else None
+        if area is not None:
+            ax0, ay0 = area[:2]
+            pos = _depth_mask(core, area, w, h) * levels
+            for i in range(count - 1, -1, -1):
+                ring = ring_rect(i)
+                part = intersect_rects(area, ring) if ring else None
+                if part is None:
+                    break
+                px0, py0, px1, py1 = part
+                # 深度按 core.dtype 计算；cv2.blendLinear 只接受 float32 权重，混合前再转换
+                t = np.clip(pos[py0 - ay0:py1 - ay0, px0 - ax0:px1 - ax0] - i, 0, 1).astype(np.float32, copy=False)
+                if i == 0:
+                    level = img[py0:py1, px0:px1]
+                else:
+                    level = blurred[i - 1][py0 - by0:py1 - by0, px0 - bx0:px1 - bx0]
+                sub = (slice(py0 - y0, py1 - y0), slice(px0 - x0, px1 - x0))
+                out[sub] = cv2.blendLinear(np.ascontiguousarray(out[sub]), level, t, 1 - t)
+        if img.shape[2] == 4:
+            # 变暗会同时缩放透明度，保持输入的透明度不变
+            out[..., 3] = img[y0:y1, x0:x1, 3]
+        results.append((rect, out))
+
+    for (x0, y0, x1, y1), out in results:
+        img[y0:y1, x0:x1] = out
+    return img
+
+
+def _depth_of_field_pil(core, img_pil):
+    """PIL 单一半径高斯模糊景深（depth_engine='pil'），返回结果图像
 
+    模糊、变暗与混合只在 depth_of_field_bounds 的矩形内进行（模糊时向外多取约4倍半径的边距，
+    结果与整幅图像模糊一致），此时原地修改 img_pil；整幅处理时返回新图像。
+    """
+    w, h = img_pil.size
+    radius = core.cfg.depth_blur_amount
+    darken = 1.0 - core.cfg.depth_darken_amount * 0.3
+
+    full = (0, 0, w, h)
+    pairs = depth_of_field_bounds(core, w, h)
+    if all(bounds == full for _, bounds in pairs):
+        pairs = [(full, full)]  # 整幅模糊时一次合成整幅图像
+    patches = []
+    for rect, bounds in pairs:
+        x0, y0, x1, y1 = rect
+        depth = (255 * _depth_mask(core, rect, w, h)).astype(np.uint8)
+        if not depth.any():
+            continue
+
+        source = img_pil if rect == full else img_pil.crop(bounds)
+        blurred = source.filter(ImageFilter.GaussianBlur(radius=radius))
+        darkened = ImageEnhance.Brightness(blurred).enhance(darken)
+        if img_pil.mode == 'RGBA':
+            # 亮度调整会同时缩放透明度，保持输入的透明度不变
+            darkened.putalpha(source.getchannel('A'))
+
+        if rect == full:
+            return Image.composite(darkened, img_pil, Image.fromarray(depth))
+        inner = (x0 - bounds[0], y0 - bounds[1], x1 - bounds[0], y1 - bounds[1])
+        patch = Image.composite(darkened.crop(inner), source.crop(inner), Image.fromarray(depth))
+        patches.append((patch, (x0, y0)))
+
+    for patch, offset in patches:
+        img_pil.paste(patch, offset)
+    return img_pil
+
+
+def render_depth_of_field(core, img):
+    """对 BGR 数组应用景深效果，返回结果（pyramid 引擎原地修改 img）"""
+    if core.cfg.depth_engine == 'pil':
+        img_pil = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+        return cv2.cvtColor(np.asarray(_depth_of_field_pil(core, img_pil)), cv2.COLOR_RGB2BGR)
+    return _depth_of_field_pyramid(core, img)
+
+
+def apply_depth_of_field(core, img_pil):
+    """应用景深效果，返回新图像"""
+    if not core.cfg.enable_depth_of_field:
+        return img_pil
+    if core.cfg.depth_engine == 'pil':
+        return _depth_of_field_pil(core, img_pil.copy())
+    # 金字塔引擎与通道顺序无关，直接处理 RGB(A) 数组
+    return Image.fromarray(_depth_of_field_pyramid(core, np.array(img_pil)))
+
+
+def plan_space_warp(rng, cfg, w, h, scale):
+    """预先决定空间错位的全部随机参数（只依赖框尺寸，不读取像素）
+
+    Args:
+        rng: 随机数生成器（random.Random）
+        cfg: CyberConfig配置对象
+        w, h: 错位区域尺寸
+        scale: 图像缩放系数
+
+    Returns:
+        (segments, color_shift, jitter, pixel_size)
+        segments: [(y0, y1, shift), ...]，shift>0 向右错位，<0 向左错位
+        color_shift: (r, g, b) 各通道水平偏移，None 表示不做通道错位
+        jitter: [(行号, 偏移), ...] 扫描线抖动
+        pixel_size: 像素化块大小，0 表示不做像素化
+    """
     # 根据强度决定错位程度
-    intensity = core.cfg.warp_intensity * random.uniform(0.8, 1.2)
-    segments = max(2, int(core.cfg.warp_segments * intensity))
+    intensity = cfg.warp_intensity * rng.uniform(0.8, 1.2)
+    segments = max(2, int(cfg.warp_segments * intensity))
 
     # 分段错位
-    if random.random() < 0.7:
-        segment_height = h_reg // segments
+    segment_ops = []
+    if rng.random() < 0.7:
+        segment_height = h // segments
         for i in range(segments):
             y_start = i * segment_height
-            y_end = (i + 1) * segment_height if i < segments - 1 else h_reg
+            y_end = (i + 1) * segment_height if i < segments - 1 else h
 
-            if random.random() < core.cfg.warp_glitch_chance:
-                shift = int(random.randint(*core.cfg.warp_shift_range) * intensity * core.scale)
-
-                if random.random() > 0.5:
-                    warped_np[y_start:y_end, shift:w_reg] = region_np[y_start:y_end, :w_reg-shift]
-                    warped_np[y_start:y_end, :shift] = region_np[y_start:y_end, w_reg-shift:]
-                else:
-                    warped_np[y_start:y_end, :w_reg-shift] = region_np[y_start:y_end, shift:]
-                    warped_np[y_start:y_end, w_reg-shift:] = region_np[y_start:y_end, :shift]
+            if rng.random() < cfg.warp_glitch_chance:
+                shift = int(rng.randint(*cfg.warp_shift_range) * intensity * scale)
+                segment_ops.append((y_start, y_end, shift if rng.random() > 0.5 else -shift))
 
     # 颜色通道错位
-    if core.cfg.warp_color_shift and random.random() < 0.5:
-        r_channel = warped_np[:, :, 0].copy()
-        g_channel = warped_np[:, :, 1].copy()
-        b_channel = warped_np[:, :, 2].copy()
+    color_shift = None
+    if cfg.warp_color_shift and rng.random() < 0.5:
+        color_shift = tuple(int(rng.randint(-5, 5) * intensity) for _ in range(3))
+
+    # 扫描线抖动
+    jitter = []
+    if cfg.warp_scanline_jitter and rng.random() < 0.4:
+        for line in range(0, h, 2):
+            if rng.random() < 0.3:
+                line_shift = int(rng.randint(-3, 3) * intensity)
+                if line_shift != 0:
+                    jitter.append((line, line_shift))
+
+    # 像素化效果
+    pixel_size = max(2, int(4 * intensity)) if rng.random() < 0.2 else 0
+
+    return segment_ops, color_shift, jitter, pixel_size
+
 
-        r_shift = int(random.randint(-5, 5) * intensity)
-        g_shift = int(random.randint(-5, 5) * intensity)
-        b_shift = int(random.randint(-5, 5) * intensity)
+def warp_region(arr, x, y, w, h, segments, color_shift, jitter, pixel_size):
+    """按 plan_space_warp 的参数对图像数组的 (x, y, w, h) 区域原地做空间错位
 
-        if r_shift != 0:
-            r_channel = np.roll(r_channel, r_shift, axis=1)
-        if g_shift != 0:
-            g_channel = np.roll(g_channel, g_shift, axis=1)
-        if b_shift != 0:
-            b_channel = np.roll(b_channel, b_shift, axis=1)
+    区域超出图像的部分按透明黑色补齐参与错位，写回时裁剪到图像范围内。
+    """
+    if w <= 0 or h <= 0:
+        return arr
 
-        warped_np = np.stack([r_channel, g_channel, b_channel], axis=2)
+    img_h, img_w = arr.shape[:2]
+    x1, y1 = min(x + w, img_w), min(y + h, img_h)
+    if x1 <= x or y1 <= y:
+        return arr
+
+    # 裁剪区域
+    region_np = np.zeros((h, w) + arr.shape[2:], dtype=arr.dtype)
+    region_np[:y1 - y, :x1 - x] = arr[y:y1, x:x1]
+    h_reg, w_reg = h, w
+
+    # 创建扭曲后的图像
+    warped_np = region_np.copy()
+
+    # 分段错位
+    for y_start, y_end, shift in segments:
+        if shift >= 0:
+            warped_np[y_start:y_end, shift:w_reg] = region_np[y_start:y_end, :w_reg-shift]
+            warped_np[y_start:y_end, :shift] = region_np[y_start:y_end, w_reg-shift:]
+        else:
+            shift = -shift
+            warped_np[y_start:y_end, :w_reg-shift] = region_np[y_start:y_end, shift:]
+            warped_np[y_start:y_end, w_reg-shift:] = region_np[y_start:y_end, :shift]
+
+    # 颜色通道错位（只保留RGB，写回时不透明）
+    if color_shift is not None:
+        channels = []
+        for c, channel_shift in enumerate(color_shift):
+            channel = warped_np[:, :, c].copy()
+            if channel_shift != 0:
+                channel = np.roll(channel, channel_shift, axis=1)
+            channels.append(channel)
+        warped_np = np.stack(channels, axis=2)
 
     # 扫描线抖动
-    if core.cfg.warp_scanline_jitter and random.random() < 0.4:
-        for line in range(0, h_reg, 2):
-            if random.random() < 0.3:
-                line_shift = int(random.randint(-3, 3) * intensity)
-                if line_shift != 0:
-                    warped_np[line:line+1] = np.roll(warped_np[line:line+1], line_shift, axis=1)
+    for line, line_shift in jitter:
+        warped_np[line:line+1] = np.roll(warped_np[line:line+1], line_shift, axis=1)
 
     # 像素化效果
-    if random.random() < 0.2:
-        pixel_size = max(2, int(4 * intensity))
+    if pixel_size:
         small = cv2.resize(warped_np, (w_reg // pixel_size, h_reg // pixel_size),
                            interpolation=cv2.INTER_LINEAR)
         warped_np = cv2.resize(small, (w_reg, h_reg), interpolation=cv2.INTER_NEAREST)
 
-    # 转换回PIL并粘贴
-    warped_img = Image.fromarray(warped_np)
-    img_pil.paste(warped_img, (x, y))
+    # 写回
+    channels = warped_np.shape[2]
+    arr[y:y1, x:x1, :channels] = warped_np[:y1 - y, :x1 - x]
+    if channels < arr.shape[2]:
+        arr[y:y1, x:x1, channels:] = 255
+    return arr
+
+
+def render_space_warp(img_pil, x, y, w, h, segments, color_shift, jitter, pixel_size):
+    """按 plan_space_warp 的参数对PIL图像区域做空间错位，返回新图像"""
+    arr = np.array(img_pil)
+    warp_region(arr, x, y, w, h, segments, color_shift, jitter, pixel_size)
+    return Image.fromarray(arr)
 
-    return img_pil
\ No newline at end of file
+
+def apply_space_warp(core, img_pil, x, y, w, h):
+    """应用空间错位效果"""
+    params = plan_space_warp(core.rng, core.cfg, w, h, core.scale)
+    return render_space_warp(img_pil, x, y, w, h, *params)
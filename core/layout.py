@@ -0,0 +1,861 @@
+# core/layout.py
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""两阶段布局：规划 (随机决策) 与 光栅化 (绘制) 分离
+
+规划阶段只根据 (图像分析结果, 配置, 种子) 做全部随机决策，产出紧凑的 LayoutPlan；
+光栅化阶段按计划绘制网格、文字与框，不再消耗随机数。
+同一份计划可以在不同分辨率的画布上光栅化（代理预览 / 全分辨率）。
+"""
+
+import json
+import random
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw
+
+from core.effects import plan_space_warp, warp_region
+from core.utils import bounding_rect, clip_rect, detect_subject, load_font, subject_focus
+from data.error_messages import (
+    SHORT_ERROR_CODES,
+    get_error_sampler,
+    get_random_short_code,
+    format_error_with_hex,
+    format_error_with_code
+)
+
+SECTIONS = ('mesh', 'text', 'boxes')
+
+# 网格图元类型
+MESH_LINE_AA, MESH_POLYLINE_AA, MESH_DOT, MESH_LINE = range(4)
+
+# 文字层条目类型
+TEXT_LABEL, TEXT_LINE = range(2)
+
+# 文字使用的全部字号（点，实际像素大小再乘以图像缩放系数）
+FONT_SIZES = (6, 8, 10, 13, 18)
+
+# 字体不可用时退回的默认字体的像素高度
+DEFAULT_FONT_PX = 12
+
+# 框类型（未知类型按 plain 处理）
+BOX_TYPES = ('plain', 'invert', 'bios', 'space_warp')
+BOX_PLAIN, BOX_INVERT, BOX_BIOS, BOX_SPACE_WARP = range(4)
+
+# 空间错位操作类型
+WARP_SEGMENT, WARP_JITTER = range(2)
+
+MESH_DTYPE = np.dtype([('kind', 'u1'), ('start', 'i4'), ('count', 'i4')])
+TEXT_DTYPE = np.dtype([
+    ('kind', 'u1'), ('x0', 'f4'), ('y0', 'f4'), ('x1', 'f4'), ('y1', 'f4'),
+    ('size', 'u1'), ('color', 'u1', (4,)), ('text', 'i4'), ('center_w', 'i4')
+])
+BOX_DTYPE = np.dtype([
+    ('type', 'u1'), ('x', 'i4'), ('y', 'i4'), ('w', 'i4'), ('h', 'i4'), ('title_h', 'i4')
+])
+CONNECTION_DTYPE = np.dtype([
+    ('x0', 'i4'), ('y0', 'i4'), ('x1', 'i4'), ('y1', 'i4'), ('jx', 'i4'), ('jy', 'i4'), ('jitter', '?')
+])
+WARP_DTYPE = np.dtype([('box', 'i4'), ('color_shift', 'i2', (3,)), ('has_color', '?'), ('pixel_size', 'i2')])
+WARP_OP_DTYPE = np.dtype([('warp', 'i4'), ('kind', 'u1'), ('y0', 'i4'), ('y1', 'i4'), ('shift', 'i4')])
+
+_ARRAY_FIELDS = {
+    'mesh': MESH_DTYPE,
+    'texts': TEXT_DTYPE,
+    'box_texts': TEXT_DTYPE,
+    'boxes': BOX_DTYPE,
+    'connections': CONNECTION_DTYPE,
+    'warps': WARP_DTYPE,
+    'warp_ops': WARP_OP_DTYPE,
+}
+
+HUD_LINE_COLOR = (200, 200, 200, 60)
+WARP_MARK_COLOR = (150, 150, 150, 200)
+STROKE_COLOR = (0, 0, 0, 255)
+
+
+@dataclass
+class ImageAnalysis:
+    """规划所需的图像分析结果（与随机种子无关，可复用）"""
+    width: int
+    height: int
+    hull: Optional[np.ndarray] = None  # 主体凸包 [N, 1, 2] int32
+    points: np.ndarray = field(default_factory=lambda: np.empty((0, 2), np.float32))  # 网格特征点
+    triangles: np.ndarray = field(default_factory=lambda: np.empty((0, 6), np.float32))  # Delaunay三角形
+    focus: Optional[Tuple[float, float, float]] = None  # 主体对焦区域（subject_focus 的结果）
+
+
+def analyze_image(img, cfg, scale, hull=None, mask=None):
+    """检测主体、特征点并做Delaunay三角剖分
+
+    Args:
+        img: BGR图像
+        cfg: CyberConfig配置对象
+        scale: 图像缩放系数 (宽度 / 1200)
+        hull, mask: 已有的主体检测结果，None 时调用 detect_subject
+    """
+    h, w = img.shape[:2]
+    if hull is None:
+        hull, mask = detect_subject(img, cfg)
+    if hull is None:
+        return ImageAnalysis(w, h)
+
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+    # 检测特征点
+    features = cv2.goodFeaturesToTrack(
+        gray,
+        maxCorners=int(cfg.mesh_complexity * scale),
+        qualityLevel=0.015,
+        minDistance=int(25 * scale),
+        mask=mask
+    )
+
+    points = [tuple(p[0]) for p in features] if features is not None else []
+
+    # 添加轮廓点
+    for p in hull:
+        points.append(tuple(p[0]))
+
+    # 创建Delaunay三角剖分
+    subdiv = cv2.Subdiv2D((0, 0, w, h))
+    valid_pts = []
+
+    for p in points:
+        if 0 <= p[0] < w and 0 <= p[1] < h:
+            try:
+                subdiv.insert(p)
+                valid_pts.append(p)
+            except cv2.error:
+                pass
+
+    return ImageAnalysis(
+        w, h, hull,
+        np.array(valid_pts, dtype=np.float32).reshape(-1, 2),
+        subdiv.getTriangleList().reshape(-1, 6),
+        subject_focus(hull, w, h)
+    )
+
+
+@dataclass
+class LayoutPlan:
+    """一次渲染的完整布局计划
+
+    所有坐标均以规划时的图像尺寸 (width, height) 为基准，文字内容存放在 strings 中，
+    记录里只保存索引。style 保存光栅化所需的已解析颜色与线宽。
+    """
+    width: int
+    height: int
+    seed: int
+    scale: float
+    mesh: np.ndarray
+    mesh_points: np.ndarray
+    texts: np.ndarray
+    box_texts: np.ndarray
+    boxes: np.ndarray
+    connections: np.ndarray
+    warps: np.ndarray
+    warp_ops: np.ndarray
+    strings: List[str] = field(default_factory=list)
+    style: Dict = field(default_factory=dict)
+    errors_used: List[str] = field(default_factory=list)
+    text_blocks: int = 0
+    focus: Optional[Tuple[float, float, float]] = None  # 主体对焦区域（比例），景深的 auto 对焦模式使用
+
+    @property
+    def nbytes(self) -> int:
+        """数组部分占用的字节数"""
+        return sum(getattr(self, name).nbytes for name in _ARRAY_FIELDS) + self.mesh_points.nbytes
+
+    def stats(self) -> dict:
+        """与渲染统计信息对应的计数"""
+        return {
+            'boxes_drawn': len(self.boxes),
+            'text_blocks': self.text_blocks,
+            'errors_used': list(self.errors_used),
+            'box_connections': len(self.connections),
+            'warp_boxes': len(self.warps),
+        }
+
+    def save(self, path):
+        """保存为 .npz（不依赖pickle）"""
+        meta = {
+            'width': self.width, 'height': self.height, 'seed': self.seed, 'scale': self.scale,
+            'strings': self.strings, 'style': self.style,
+            'errors_used': self.errors_used, 'text_blocks': self.text_blocks, 'focus': self.focus,
+        }
+        arrays = {name: getattr(self, name) for name in _ARRAY_FIELDS}
+        np.savez_compressed(path, mesh_points=self.mesh_points,
+                            meta=np.array(json.dumps(meta, ensure_ascii=False)), **arrays)
+
+    @classmethod
+    def load(cls, path) -> 'LayoutPlan':
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            arrays = {name: data[name] for name in _ARRAY_FIELDS}
+            mesh_points = data['mesh_points']
+        style = {k: tuple(v) if isinstance(v, list) else v for k, v in meta.pop('style').items()}
+        if meta.get('focus') is not None:
+            meta['focus'] = tuple(meta['focus'])
+        return cls(mesh_points=mesh_points, style=style, **meta, **arrays)
+
+
+class RecordBuffer:
+    """按行追加的结构化数组（容量倍增），每条记录不再对应一个 dict/tuple 对象"""
+
+    __slots__ = ('dtype', '_data', '_size')
+
+    def __init__(self, dtype, capacity=64):
+        self.dtype = np.dtype(dtype)
+        self._data = np.empty(capacity, dtype=self.dtype)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def _reserve(self, n):
+        if n > len(self._data):
+            data = np.empty(max(n, 2 * len(self._data)), dtype=self.dtype)
+            data[:self._size] = self._data[:self._size]
+            self._data = data
+
+    def append(self, row) -> int:
+        """追加一条记录，返回其索引"""
+        self._reserve(self._size + 1)
+        self._data[self._size] = row
+        self._size += 1
+        return self._size - 1
+
+    def extend(self, rows):
+        """追加多条记录（元组序列或同 dtype 的数组）"""
+        rows = np.asarray(rows, dtype=self.dtype)
+        self._reserve(self._size + len(rows))
+        self._data[self._size:self._size + len(rows)] = rows
+        self._size += len(rows)
+
+    def view(self) -> np.ndarray:
+        """当前记录的视图（后续追加可能使其失效）"""
+        return self._data[:self._size]
+
+    def array(self) -> np.ndarray:
+        """当前记录的紧凑副本"""
+        return self._data[:self._size].copy()
+
+
+class _PlanBuilder:
+    """规划期间按类别累积记录"""
+
+    def __init__(self):
+        self.records = {name: RecordBuffer(dtype) for name, dtype in _ARRAY_FIELDS.items()}
+        self.mesh_points = []
+        self.strings = []
+        self.errors_used = []
+        self.text_blocks = 0
+
+    def mesh(self, kind, points):
+        self.records['mesh'].append((kind, len(self.mesh_points), len(points)))
+        self.mesh_points.extend(points)
+
+    def text(self, layer, x, y, text, size, color, center_w=0):
+        self.records[layer].append((TEXT_LABEL, int(x), int(y), 0, 0, size, color, len(self.strings), center_w))
+        self.strings.append(text)
+
+    def line(self, x0, y0, x1, y1, color, width=1):
+        self.records['texts'].append((TEXT_LINE, x0, y0, x1, y1, width, color, -1, 0))
+
+    def build(self, width, height, seed, scale, style, focus=None):
+        arrays = {name: buf.array() for name, buf in self.records.items()}
+        return LayoutPlan(
+            width=width, height=height, seed=seed, scale=scale, focus=focus,
+            mesh_points=np.array(self.mesh_points, dtype=np.int32).reshape(-1, 2),
+            strings=self.strings, style=style,
+            errors_used=self.errors_used, text_blocks=self.text_blocks,
+            **arrays
+        )
+
+
+def plan_layout(analysis: ImageAnalysis, cfg, seed=42, rng=None, sections=SECTIONS,
+                compiled=None) -> LayoutPlan:
+    """规划布局：完成全部随机决策，不绘制任何像素
+
+    Args:
+        analysis: analyze_image 的结果
+        cfg: CyberConfig配置对象
+        seed: 随机种子
+        rng: 随机数生成器，None 时使用 random.Random(seed)
+        sections: 需要规划的部分，'mesh' / 'text' / 'boxes'
+        compiled: 按该图像尺寸编译的配置（cfg.compile 的结果），None 时在这里编译
+
+    Raises:
+        ValueError: 配置无效
+    """
+    rng = rng or random.Random(seed)
+    w, h = analysis.width, analysis.height
+    scale = w / 1200.0
+    cc = compiled or cfg.compile(scale)
+    b = _PlanBuilder()
+
+    if 'mesh' in sections:
+        _plan_mesh(b, rng, cfg, cc, analysis)
+    if 'text' in sections:
+        _plan_text(b, rng, cfg, cc, analysis.points, w, h)
+    if 'boxes' in sections:
+        _plan_boxes(b, rng, cfg, cc, w, h)
+
+    style = {
+        'mesh_color': cc.colors_bgr['mesh_color'],
+        'mesh_dot_color': cc.colors_bgr['color_warning'],
+        'mesh_dot_radius': cc.mesh_dot_radius_px,
+        'border_color': cc.colors_rgba['color_border'],
+        'border_width': cfg.box_border_thickness,
+        'line_color': cc.colors_rgba['box_line_color'],
+        'line_width': cfg.box_line_thickness,
+    }
+    return b.build(w, h, seed, scale, style, analysis.focus)
+
+
+# ==========================================
+# 规划
+# ==========================================
+def _plan_nerve_line(b, rng, cfg, pt1, pt2):
+    """神经线：直线，或带随机中点的折线/贝塞尔曲线"""
+    if rng.random() < cfg.nerve_mutation_chance:
+        mid_x, mid_y = (pt1[0] + pt2[0]) // 2, (pt1[1] + pt2[1]) // 2
+        dist = np.sqrt((pt1[0] - pt2[0]) ** 2 + (pt1[1] - pt2[1]) ** 2)
+        offset = int(dist * rng.uniform(0.1, 0.35))
+        cx = mid_x + rng.randint(-offset, offset)
+        cy = mid_y + rng.randint(-offset, offset)
+
+        if rng.random() > 0.4:
+            # 贝塞尔曲线
+            t = np.linspace(0, 1, 10)
+            xs = (1 - t) ** 2 * pt1[0] + 2 * (1 - t) * t * cx + t ** 2 * pt2[0]
+            ys = (1 - t) ** 2 * pt1[1] + 2 * (1 - t) * t * cy + t ** 2 * pt2[1]
+            b.mesh(MESH_POLYLINE_AA, np.stack([xs, ys], axis=1).astype(np.int32).tolist())
+        else:
+            b.mesh(MESH_LINE_AA, [pt1, (cx, cy)])
+            b.mesh(MESH_LINE_AA, [(cx, cy), pt2])
+            if rng.random() > 0.6:
+                b.mesh(MESH_DOT, [(cx, cy)])
+    else:
+        b.mesh(MESH_LINE_AA, [pt1, pt2])
+
+
+def _plan_mesh(b, rng, cfg, cc, analysis):
+    """主体区域内的稀疏神经网格"""
+    if analysis.hull is None:
+        return
+
+    for t in analysis.triangles:
+        pt1, pt2, pt3 = (int(t[0]), int(t[1])), (int(t[2]), int(t[3])), (int(t[4]), int(t[5]))
+        cx, cy = (pt1[0] + pt2[0] + pt3[0]) // 3, (pt1[1] + pt2[1] + pt3[1]) // 3
+
+        # 检查中心点是否在主体内
+        if cv2.pointPolygonTest(analysis.hull, (cx, cy), False) < 0:
+            continue
+
+        if rng.random() < cfg.line_connect_chance:
+            _plan_nerve_line(b, rng, cfg, pt1, pt2)
+            if rng.random() > 0.6:
+                _plan_nerve_line(b, rng, cfg, pt2, pt3)
+
+        if rng.random() > 0.95:
+            size = cc.mesh_cross_px
+            b.mesh(MESH_LINE, [(pt1[0] - size, pt1[1]), (pt1[0] + size, pt1[1])])
+            b.mesh(MESH_LINE, [(pt1[0], pt1[1] - size), (pt1[0], pt1[1] + size)])
+
+
+def erode_text(rng, text, erosion_rate):
+    """文字侵蚀效果"""
+    return "".join(
+        [rng.choice(["_", " ", ".", "x"]) if rng.random() < erosion_rate and c != " " else c
+         for c in text])
+
+
+def _plan_text(b, rng, cfg, cc, pts, w, h):
+    """日志块、独立报错、节点文字与标题"""
+    scale = cc.scale
+    normal = cc.colors_rgba['color_normal_text']
+    error = cc.colors_rgba['color_error_text']
+
+    num_blocks = rng.randint(*cfg.log_blocks_range)
+    b.text_blocks = num_blocks
+
+    # 预先确定各块的风格、行数和独立报错数，一次性抽取全部错误消息
+    block_styles = rng.choices(cc.style_names, cum_weights=cc.style_cum_weights, k=num_blocks)
+    block_lines = [rng.randint(*cfg.log_lines_per_block) for _ in range(num_blocks)]
+    num_fatal = rng.randint(*cfg.fatal_error_count)
+
+    sampler = get_error_sampler(cfg.error_weights if cfg.use_extended_errors else None)
+    drawn = sampler.draw(sum(block_lines) + num_fatal, rng=rng)
+    if cfg.use_extended_errors:
+        b.errors_used.extend(category for category, _ in drawn)
+    messages = iter(msg for _, msg in drawn)
+
+    for style, num_lines in zip(block_styles, block_lines):
+        base_x = rng.randint(int(10 * scale), int(w * 0.85))
+        curr_y = int(h * rng.uniform(0.1, 0.9))
+        curr_x = base_x
+
+        for _ in range(num_lines):
+            error_msg = next(messages)
+
+            is_error = rng.random() > 0.7
+            color = error if is_error else normal
+
+            tag = rng.choice(["[ERR]", "[WARN]", "[FAIL]", "[BUG]", "[FATAL]"]) if is_error else \
+                rng.choice(["[INFO]", "[DEBUG]", "[LOG]", "[TRACE]"])
+
+            format_type = rng.choice(['plain', 'hex', 'code'])
+            if format_type == 'hex':
+                full_text = format_error_with_hex(error_msg, rng=rng)
+            elif format_type == 'code':
+                full_text = format_error_with_code(error_msg, get_random_short_code(rng))
+            else:
+                full_text = f"{tag} {error_msg}"
+
+            if style == 'staircase':
+                curr_x += rng.randint(*cfg.staircase_step) * scale
+            elif style == 'jitter':
+                curr_x = base_x + rng.randint(-40, 40) * scale
+            else:
+                curr_x = base_x
+
+            curr_y += int(rng.uniform(15, 40) * scale)
+
+            if style == 'torn' and rng.random() < cfg.torn_trigger_chance:
+                split_point = len(tag)
+                gap_x = rng.randint(*cfg.torn_offset_x) * scale
+                gap_y = rng.randint(*cfg.torn_offset_y) * scale
+                b.text('texts', curr_x, curr_y, full_text[:split_point], 10, color)
+                b.text('texts', curr_x + gap_x, curr_y + gap_y, full_text[split_point:], 10, color)
+            else:
+                b.text('texts', curr_x, curr_y, full_text, 10, color)
+
+    # 独立报错
+    for _ in range(num_fatal):
+        ex = rng.randint(int(w * 0.1), int(w * 0.8))
+        ey = rng.randint(int(h * 0.1), int(h * 0.8))
+
+        error_msg = next(messages)
+        hex_addr = f"0x{rng.randint(0, 0xFFFFFF):06X}"
+        b.text('texts', ex, ey, erode_text(rng, f"{error_msg} at {hex_addr}", 0.1), 13, error)
+
+        if len(pts) and rng.random() < cfg.hud_line_chance:
+            tx, ty = pts[rng.randrange(len(pts))]
+            b.line(ex + 80 * scale, ey + 5 * scale, tx, ty, HUD_LINE_COLOR)
+
+    # 节点文字
+    node_codes = SHORT_ERROR_CODES if cfg.use_extended_errors else ["ERR", "FAIL", "BAD", "NULL"]
+    for px, py in pts:
+        if rng.random() > cfg.node_text_chance:
+            continue
+        txt = rng.choice(node_codes)
+        ox = rng.randint(4, 15) * (1 if rng.random() > 0.5 else -1)
+        oy = rng.randint(4, 15) * (1 if rng.random() > 0.5 else -1)
+        b.text('texts', px + ox, py + oy, txt, 8, normal)
+
+    # 标题
+    t1 = erode_text(rng, "SYSTEM_PANIC", cfg.title_erosion_rate)
+    t2 = erode_text(rng, ":: KERNEL_DUMP", cfg.title_erosion_rate * 0.6)
+    t3 = erode_text(rng, "CRITICAL ERROR", cfg.title_erosion_rate * 0.4)
+
+    b.text('texts', 20, 20, t1, 18, error)
+    b.text('texts', 25, 20 + 22 * scale, t2, 18, normal)
+    b.text('texts', 20, 20 + 50 * scale, t3, 13, error)
+
+
+def _plan_boxes(b, rng, cfg, cc, w, h):
+    """四种类型的框、框内文字与框间连线"""
+    scale = cc.scale
+    error_messages = SHORT_ERROR_CODES if cfg.use_extended_errors else [
+        "ERR", "FAIL", "BAD", "HALT", "STOP", "ABORT", "PANIC"
+    ]
+
+    # 各类型在累积权重中的编号（未知类型按 plain 处理）
+    type_codes = [BOX_TYPES.index(t) if t in BOX_TYPES else BOX_PLAIN for t in cc.box_types]
+    cum_weights = cc.box_type_cum_weights
+    total_weight = cum_weights[-1]
+    num_boxes = rng.randint(*cfg.box_count)
+    title_h = cc.bios_title_bar_px
+
+    records = b.records['boxes']
+    for _ in range(num_boxes):
+        # 按权重随机选择类型：第一个累积权重 >= r 的类型
+        code = type_codes[bisect_left(cum_weights, rng.random() * total_weight)]
+
+        # 随机位置和大小
+        box_w = rng.randint(*cc.box_size_px)
+        box_h = rng.randint(int(box_w * 0.6), int(box_w * 0.9))
+
+        x = rng.randint(10, max(11, w - box_w - 10))
+        y = rng.randint(10, max(11, h - box_h - 10))
+
+        records.append((code, x, y, box_w, box_h, title_h if code == BOX_BIOS else 0))
+    boxes = records.view()
+
+    # 空间错位参数
+    for i in np.flatnonzero(boxes['type'] == BOX_SPACE_WARP).tolist():
+        segments, color_shift, jitter, pixel_size = plan_space_warp(
+            rng, cfg, int(boxes['w'][i]), int(boxes['h'][i]), scale)
+        warp = b.records['warps'].append((i, color_shift or (0, 0, 0), color_shift is not None, pixel_size))
+        b.records['warp_ops'].extend([(warp, WARP_SEGMENT, y0, y1, shift) for y0, y1, shift in segments])
+        b.records['warp_ops'].extend([(warp, WARP_JITTER, line, line + 1, shift) for line, shift in jitter])
+
+    # 框内文字
+    float_color = cc.colors_rgba['color_float']
+    normal = cc.colors_rgba['color_normal_text']
+    for code, x, y, box_w, box_h, box_title_h in boxes.tolist():
+        if cfg.box_float_display:
+            value = rng.uniform(*cfg.box_float_range)
+            b.text('box_texts', x, y + (box_h - 8) // 2, f"{value:.{cfg.box_float_precision}f}", 8,
+                   float_color, center_w=box_w)
+
+        if code == BOX_BIOS:
+            title_format = rng.choice(cfg.bios_title_formats)
+            error_code = rng.choice(error_messages)
+            b.text('box_texts', x + 3, y + (box_title_h - 10) // 2, f"{title_format}:{error_code}", 10, normal)
+
+        if code == BOX_SPACE_WARP:
+            b.text('box_texts', x + 3, y + 3, "~WARP~", 6, WARP_MARK_COLOR)
+
+    # 框间中点连线
+    if cfg.box_line_connect_chance > 0 and len(boxes) >= 2:
+        b.records['connections'].extend(plan_connections(rng, cfg, boxes, scale))
+
+
+def box_centers(boxes):
+    """框记录数组 -> 中点坐标数组 (cx, cy)"""
+    return boxes['x'] + boxes['w'] // 2, boxes['y'] + boxes['h'] // 2
+
+
+def plan_connections(rng, cfg, boxes, scale):
+    """框间中点连线
+
+    逐行向量化计算与后续框的距离，只对距离内的候选对按 (i, j) 顺序抽取随机数，
+    结果与逐对循环完全一致，但不再有 O(n^2) 的Python循环。
+
+    Returns:
+        CONNECTION_DTYPE 记录数组
+    """
+    cx, cy = box_centers(boxes)
+    cx, cy = cx.astype(np.int64), cy.astype(np.int64)
+    max_dist = cfg.box_line_max_distance * scale
+    chance = cfg.box_line_connect_chance
+    jitter_chance = cfg.box_line_jitter_chance
+    amount = cfg.box_line_jitter_amount
+
+    starts, ends, jitters = [], [], []
+    for i in range(len(boxes) - 1):
+        dx = cx[i] - cx[i + 1:]
+        dy = cy[i] - cy[i + 1:]
+        dist = np.sqrt(dx * dx + dy * dy)
+        near = np.flatnonzero(dist < max_dist)
+        if not len(near):
+            continue
+
+        thresholds = (chance * (1 - dist[near] / max_dist)).tolist()
+        for j, threshold in zip((near + i + 1).tolist(), thresholds):
+            if rng.random() >= threshold:
+                continue
+            starts.append(i)
+            ends.append(j)
+            if rng.random() < jitter_chance:
+                jitters.append((rng.randint(-amount, amount), rng.randint(-amount, amount)))
+            else:
+                jitters.append(None)
+
+    conns = np.zeros(len(starts), dtype=CONNECTION_DTYPE)
+    if not starts:
+        return conns
+
+    starts, ends = np.array(starts), np.array(ends)
+    conns['x0'], conns['y0'] = cx[starts], cy[starts]
+    conns['x1'], conns['y1'] = cx[ends], cy[ends]
+    conns['jitter'] = [jit is not None for jit in jitters]
+    offsets = np.array([jit or (0, 0) for jit in jitters], dtype=np.int64)
+    mask = conns['jitter']
+    conns['jx'][mask] = ((conns['x0'] + conns['x1']) // 2 + offsets[:, 0])[mask]
+    conns['jy'][mask] = ((conns['y0'] + conns['y1']) // 2 + offsets[:, 1])[mask]
+    return conns
+
+
+# ==========================================
+# 光栅化
+# ==========================================
+def _scaler(plan, width):
+    """画布宽度与计划的尺寸比例，返回 (比例, 整数坐标缩放函数)"""
+    s = width / plan.width
+    if s == 1:
+        return s, int
+    return s, lambda v: int(round(v * s))
+
+
+def _mesh_geometry(plan, width, height):
+    """按画布缩放的网格顶点、圆点半径与网格覆盖的矩形（没有网格时为 None）"""
+    s, sc = _scaler(plan, width)
+    points = plan.mesh_points if s == 1 else np.round(plan.mesh_points * s).astype(np.int32)
+    dot_radius = max(1, sc(plan.style['mesh_dot_radius']))
+    # 抗锯齿线条向外延伸约1像素
+    rect = bounding_rect(points, dot_radius + 2, width, height) if len(plan.mesh) else None
+    return points, dot_radius, rect
+
+
+def mesh_region(plan: LayoutPlan, width, height):
+    """网格会改变的区域 [(x0, y0, x1, y1)]（主体凸包附近），没有网格时为空列表"""
+    rect = _mesh_geometry(plan, width, height)[2]
+    return [rect] if rect else []
+
+
+def rasterize_mesh(plan: LayoutPlan, canvas):
+    """绘制网格（半透明叠加到 canvas 上，原地修改并返回）
+
+    叠加层的复制与混合只在网格覆盖的矩形内进行，其余像素不读写。
+    """
+    h, w = canvas.shape[:2]
+    points, dot_radius, rect = _mesh_geometry(plan, w, h)
+    if rect is None:
+        return canvas
+
+    x0, y0, x1, y1 = rect
+    points = points - np.array([x0, y0], dtype=points.dtype)
+    color = plan.style['mesh_color']
+    dot_color = plan.style['mesh_dot_color']
+
+    roi = canvas[y0:y1, x0:x1]
+    overlay = roi.copy()
+    for kind, start, count in plan.mesh.tolist():
+        pts = points[start:start + count]
+        if kind == MESH_POLYLINE_AA:
+            cv2.polylines(overlay, [pts.reshape(-1, 1, 2)], False, color, 1, cv2.LINE_AA)
+        elif kind == MESH_DOT:
+            cv2.circle(overlay, tuple(pts[0].tolist()), dot_radius, dot_color, -1)
+        else:
+            line_type = cv2.LINE_AA if kind == MESH_LINE_AA else cv2.LINE_8
+            cv2.line(overlay, tuple(pts[0].tolist()), tuple(pts[1].tolist()), color, 1, line_type)
+
+    cv2.addWeighted(overlay, 0.65, roi, 0.35, 0, roi)
+    return canvas
+
+
+def _draw_labels(draw, records, strings, font_path, font_scale, s):
+    """绘制带黑色描边的文字及HUD连线"""
+    fonts = {}
+    for kind, x0, y0, x1, y1, size, color, text, center_w in records.tolist():
+        color = tuple(color)
+        if kind == TEXT_LINE:
+            draw.line([(x0 * s, y0 * s), (x1 * s, y1 * s)], fill=color, width=size)
+            continue
+
+        font = fonts.get(size)
+        if font is None:
+            font = fonts[size] = load_font(font_path, size, font_scale)
+        text = strings[text]
+
+        x, y = int(x0 * s), int(y0 * s)
+        if center_w:
+            bbox = draw.textbbox((0, 0), text, font=font)
+            x += (int(center_w * s) - (bbox[2] - bbox[0])) // 2
+
+        # 黑色描边
+        draw.text((x - 1, y), text, font=font, fill=STROKE_COLOR)
+        draw.text((x + 1, y), text, font=font, fill=STROKE_COLOR)
+        draw.text((x, y - 1), text, font=font, fill=STROKE_COLOR)
+        draw.text((x, y + 1), text, font=font, fill=STROKE_COLOR)
+        draw.text((x, y), text, font=font, fill=color)
+
+
+def _label_rects(records, strings, font_scale, s, width, height):
+    """文字与HUD连线各自可能覆盖的矩形（含1像素描边）
+
+    只按字号与字符数估计一个保守的外接矩形（每个字符至多一个字号宽高，四周再各留一个字号），
+    不加载字体、不逐条测量文字，用于判断能否跳过阶段与统计改变的字节数。
+    """
+    if not len(records):
+        return []
+    # 每个字符串的最长行字符数与行数
+    extents = np.array([(max(map(len, text.split('\n'))), text.count('\n') + 1) for text in strings] or [(0, 0)],
+                       dtype=np.float64)
+
+    size = records['size'].astype(np.float64)
+    lines = records['kind'] == TEXT_LINE
+    x0, y0 = records['x0'] * s, records['y0'] * s
+    x1, y1 = records['x1'] * s, records['y1'] * s
+
+    em = np.maximum(np.floor(size * font_scale), DEFAULT_FONT_PX)
+    chars, rows = extents[np.where(lines, 0, records['text'])].T
+    x, y = np.floor(x0), np.floor(y0)
+    center_w = np.floor(records['center_w'] * s)
+    centered = records['center_w'] != 0
+    # 居中时的偏移随文字宽度在 [(center_w - 最大宽度) / 2, center_w / 2] 之间
+    shift_min = np.where(centered, np.floor((center_w - chars * em) / 2), 0)
+    shift_max = np.where(centered, np.floor(center_w / 2), 0)
+
+    left = np.where(lines, np.minimum(x0, x1) - size, x + shift_min - em)
+    top = np.where(lines, np.minimum(y0, y1) - size, y - em)
+    right = np.where(lines, np.maximum(x0, x1) + size + 1, x + shift_max + (chars + 1) * em)
+    bottom = np.where(lines, np.maximum(y0, y1) + size + 1, y + (rows + 1) * em)
+
+    rects = (clip_rect(*rect, width, height) for rect in zip(left.tolist(), top.tolist(),
+                                                              right.tolist(), bottom.tolist()))
+    return [rect for rect in rects if rect]
+
+
+def text_region(plan: LayoutPlan, width, height):
+    """文字层可能改变的区域 [(x0, y0, x1, y1)]（保守估计）"""
+    s, _ = _scaler(plan, width)
+    return _label_rects(plan.texts, plan.strings, plan.scale * s, s, width, height)
+
+
+def draw_text_layer(plan: LayoutPlan, img_pil, font_path=None):
+    """在 RGBA 的 PIL 图像上原地绘制文字层并返回该图像（不透明）"""
+    s, _ = _scaler(plan, img_pil.width)
+    draw = ImageDraw.Draw(img_pil)
+    _draw_labels(draw, plan.texts, plan.strings, font_path, plan.scale * s, s)
+    # 绘制时像素直接写入颜色自身的透明度，恢复为不透明，后续的叠加与只有RGB的图像一致
+    img_pil.putalpha(255)
+    return img_pil
+
+
+def rasterize_text(plan: LayoutPlan, canvas, font_path=None):
+    """绘制文字层，返回新的BGR图像"""
+    img_pil = Image.fromarray(cv2.cvtColor(canvas, cv2.COLOR_BGR2RGBA))
+    img_pil = draw_text_layer(plan, img_pil, font_path)
+    return cv2.cvtColor(np.asarray(img_pil), cv2.COLOR_RGBA2BGR)
+
+
+def _scaled_boxes(plan, sc):
+    """按画布缩放的框 [(type, x, y, w, h, title_h)]"""
+    return [(code, sc(x), sc(y), sc(w), sc(h), sc(title_h))
+            for code, x, y, w, h, title_h in plan.boxes.tolist()]
+
+
+def _connection_segments(plan, sc):
+    """按画布缩放的框间连线线段 [(p0, p1)]，带抖动的连线拆成两段"""
+    segments = []
+    for x0, y0, x1, y1, jx, jy, jitter in plan.connections.tolist():
+        p0, p1 = (sc(x0), sc(y0)), (sc(x1), sc(y1))
+        if jitter:
+            pj = (sc(jx), sc(jy))
+            segments += [(p0, pj), (pj, p1)]
+        else:
+            segments.append((p0, p1))
+    return segments
+
+
+def _layer_rect(points, pad, width, height):
+    """只覆盖给定顶点的叠加层矩形，没有顶点时为 None"""
+    return bounding_rect(np.array(points, dtype=np.int64).reshape(-1, 2), pad, width, height)
+
+
+def boxes_region(plan: LayoutPlan, width, height):
+    """框会改变的区域 [(x0, y0, x1, y1)]：各框（含边框）、框间连线与框内文字（文字为保守估计）"""
+    s, sc = _scaler(plan, width)
+    border = max(1, sc(plan.style['border_width'])) + 1
+    line_width = max(1, sc(plan.style['line_width'])) + 1
+
+    rects = [clip_rect(x - border, y - border, x + box_w + border + 1, y + box_h + border + 1, width, height)
+             for _, x, y, box_w, box_h, _ in _scaled_boxes(plan, sc)]
+    rects += [_layer_rect([p0, p1], line_width, width, height) for p0, p1 in _connection_segments(plan, sc)]
+    rects = [rect for rect in rects if rect]
+    return rects + _label_rects(plan.box_texts, plan.strings, plan.scale * s, s, width, height)
+
+
+def draw_boxes_layer(plan: LayoutPlan, rgba, font_path=None):
+    """绘制框（反色/空间错位、框内文字、连线与边框）
+
+    连线与边框先画在透明叠加层上再合成，叠加层只覆盖连线/边框所在的矩形。
+
+    Args:
+        rgba: RGBA 数组，反色与空间错位直接在其上原地修改
+
+    Returns:
+        不透明的 RGBA 的 PIL 图像
+    """
+    height, width = rgba.shape[:2]
+    s, sc = _scaler(plan, width)
+    boxes = _scaled_boxes(plan, sc)
+
+    # 空间错位参数按框索引分组
+    segments = [[] for _ in range(len(plan.warps))]
+    jitter = [[] for _ in range(len(plan.warps))]
+    for warp, kind, y0, y1, shift in plan.warp_ops.tolist():
+        if kind == WARP_SEGMENT:
+            segments[warp].append((sc(y0), sc(y1), sc(shift)))
+        else:
+            jitter[warp].append((sc(y0), sc(shift)))
+
+    warp_params = {}
+    for warp, (box, color_shift, has_color, pixel_size) in enumerate(plan.warps.tolist()):
+        color_shift = tuple(sc(v) for v in color_shift) if has_color else None
+        pixel_size = max(2, sc(pixel_size)) if pixel_size else 0
+        warp_params[box] = (segments[warp], color_shift, jitter[warp], pixel_size)
+
+    # 先处理特殊效果（直接在RGBA数组上原地修改）
+    for i, (code, x, y, box_w, box_h, _) in enumerate(boxes):
+        if code == BOX_INVERT:
+            region = rgba[y + 1:y + box_h - 1, x + 1:x + box_w - 1]
+            np.subtract(255, region, out=region)
+        elif code == BOX_SPACE_WARP:
+            warp_region(rgba, x, y, box_w, box_h, *warp_params[i])
+    img_pil = Image.fromarray(rgba)
+
+    # 框内文字
+    draw = ImageDraw.Draw(img_pil)
+    _draw_labels(draw, plan.box_texts, plan.strings, font_path, plan.scale * s, s)
+
+    # 框间中点连线
+    segments = _connection_segments(plan, sc)
+    line_width = max(1, sc(plan.style['line_width']))
+    rect = _layer_rect(segments, line_width + 1, width, height)
+    if rect:
+        x0, y0, x1, y1 = rect
+        line_layer = Image.new('RGBA', (x1 - x0, y1 - y0), (0, 0, 0, 0))
+        line_draw = ImageDraw.Draw(line_layer)
+        color = plan.style['line_color']
+        for (ax, ay), (bx, by) in segments:
+            line_draw.line([(ax - x0, ay - y0), (bx - x0, by - y0)], fill=color, width=line_width)
+        img_pil.alpha_composite(line_layer, dest=(x0, y0))
+
+    # 边框
+    border_width = max(1, sc(plan.style['border_width']))
+    corners = [((x, y), (x + box_w, y + box_h)) for _, x, y, box_w, box_h, _ in boxes]
+    rect = _layer_rect(corners, border_width + 1, width, height)
+    if rect:
+        x0, y0, x1, y1 = rect
+        border_layer = Image.new('RGBA', (x1 - x0, y1 - y0), (0, 0, 0, 0))
+        border_draw = ImageDraw.Draw(border_layer)
+        color = plan.style['border_color']
+        for code, x, y, box_w, box_h, title_h in boxes:
+            x, y = x - x0, y - y0
+            border_draw.rectangle([x, y, x + box_w, y + box_h], outline=color, width=border_width)
+            if code == BOX_BIOS:
+                border_draw.line([x, y + title_h, x + box_w, y + title_h], fill=color, width=border_width)
+        img_pil.alpha_composite(border_layer, dest=(x0, y0))
+
+    img_pil.putalpha(255)
+    return img_pil
+
+
+def rasterize_boxes(plan: LayoutPlan, canvas, font_path=None):
+    """绘制框（反色/空间错位、框内文字、连线与边框），返回新的BGR图像"""
+    img_pil = draw_boxes_layer(plan, cv2.cvtColor(canvas, cv2.COLOR_BGR2RGBA), font_path)
+    return cv2.cvtColor(np.asarray(img_pil), cv2.COLOR_RGBA2BGR)
+
+
+def rasterize_layout(plan: LayoutPlan, canvas, font_path=None):
+    """按计划依次绘制网格、文字与框
+
+    Args:
+        plan: plan_layout 的结果
+        canvas: BGR画布，可以与规划尺寸不同（按宽度比例缩放坐标与字号）
+        font_path: 字体文件路径
+    """
+    canvas = rasterize_mesh(plan, canvas.copy())
+    canvas = rasterize_text(plan, canvas, font_path)
+    return rasterize_boxes(plan, canvas, font_path)
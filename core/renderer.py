@@ -6,61 +6,89 @@ import cv2
 import numpy as np
 import random
 import os
-from PIL import Image, ImageFont, ImageDraw
+from PIL import ImageFont, ImageDraw
 import time
 import math
 
 from config import CyberConfig
-from core.effects import apply_crt_effects, apply_depth_of_field, apply_perlin_noise, apply_rgb_noise, apply_scanline_noise
-from core.boxes import draw_boxes
-from core.text import draw_chaotic_text
-from core.utils import detect_subject, draw_sparse_wireframe
-from data.error_messages import get_random_error, SHORT_ERROR_CODES
+from core.effects import depth_focus
+from core.layout import BOX_DTYPE, analyze_image, plan_layout
+from core.stages import prefetch_stages, resolve_pipeline, run_stages, split_pipeline
+from core.utils import load_font, load_image, load_proxy_image, write_image_atomic
+from data.error_messages import get_error_sampler, SHORT_ERROR_CODES
 
 
 class ConfigurableCyberCore:
     """赛博朋克风格渲染核心"""
 
-    def __init__(self, img_path, font_path, config: CyberConfig, seed=42, debug_mode=False):
+    def __init__(self, img_path, font_path, config: CyberConfig, seed=42, debug_mode=False, executor=None,
+                 preview_size=None, compiled=None, plan=None, full_plan=False):
+        """
+        Args:
+            img_path: 输入图片路径、编码后的图片数据 (bytes)，或已解码的BGR图像数组
+            font_path: 字体文件路径
+            config: 渲染配置
+            seed: 随机种子
+            debug_mode: 是否输出调试信息
+            executor: 可选的线程池，用于与主流程并行计算相互独立的阶段（如噪声场）
+            preview_size: 预览/代理渲染的目标长边（像素），按满足该长边的最小尺寸缩小解码
+            compiled: 可选的已编译配置（config.compile() 的结果），缩放系数与图像一致时直接复用，不再重复校验
+            plan: 可选的已有布局计划，指定时跳过主体检测与布局规划（如视频片段内的帧共用关键帧的计划）
+            full_plan: 与 preview_size 一起使用：按全尺寸图像检测主体并规划布局，再按预览尺寸光栅化，
+                布局与同一种子的完整渲染一致（需要全尺寸解码）
+        """
         self.seed = seed
         self.font_path = font_path
         self.cfg = config
         self.debug_mode = debug_mode
+        self.executor = executor
 
-        self.origin = cv2.imread(img_path)
+        # 按全尺寸规划布局时的全尺寸图像，规划完成后释放
+        self.plan_source = None
+
+        decode_start = time.perf_counter()
+        if isinstance(img_path, np.ndarray):
+            self.origin, decode_scale = img_path, 1
+        elif preview_size and full_plan:
+            self.plan_source, self.origin, decode_scale = load_proxy_image(img_path, preview_size)
+        else:
+            self.origin, decode_scale = load_image(img_path, preview_size)
+        decode_time = time.perf_counter() - decode_start
         if self.origin is None:
+            if isinstance(img_path, (bytes, bytearray, memoryview)):
+                raise ValueError("无法解码输入图片数据")
             raise ValueError(f"无法读取图片: {img_path}")
 
         self.h, self.w = self.origin.shape[:2]
         self.scale = self.w / 1200.0
+
+        # 校验配置并预先换算颜色、权重与像素尺寸（配置无效时在任何渲染阶段之前报错）
+        if compiled is not None and compiled.scale == self.scale:
+            self.compiled = compiled
+        else:
+            self.compiled = self.cfg.compile(self.scale)
+
+        # 特效计算精度
+        self.dtype = np.dtype(self.cfg.precision)
+
+        # 特效流水线：所有帧共用的图层阶段 + 时间相关阶段（未知的阶段名在这里直接报错）
+        self.stages = resolve_pipeline(self.cfg)
+        self.layer_stages, self.frame_stages = split_pipeline(self.stages)
+
+        # 错误消息采样器（按权重预编译，相同配置复用）
+        self.error_sampler = get_error_sampler(
+            self.cfg.error_weights if self.cfg.use_extended_errors else None)
+
         self.canvas = self.origin.copy()
 
-        random.seed(seed)
-        np.random.seed(seed)
-
-        # 安全地转换颜色顺序从RGBA到BGR，确保是整数
-        def safe_int(x):
-            try:
-                return int(x)
-            except (ValueError, TypeError):
-                return 255  # 默认值
-
-        # 转换颜色，确保所有值都是整数
-        self.cv_red = (
-            safe_int(self.cfg.color_warning[2]),
-            safe_int(self.cfg.color_warning[1]),
-            safe_int(self.cfg.color_warning[0])
-        )
-        self.cv_white = (
-            safe_int(self.cfg.color_normal_text[2]),
-            safe_int(self.cfg.color_normal_text[1]),
-            safe_int(self.cfg.color_normal_text[0])
-        )
-        self.cv_mesh = (
-            safe_int(self.cfg.mesh_color[2]),
-            safe_int(self.cfg.mesh_color[1]),
-            safe_int(self.cfg.mesh_color[0])
-        )
+        # 每次渲染独立的随机数生成器，避免多线程并发渲染时互相干扰全局状态
+        self.rng = random.Random(seed)
+        self.np_rng = np.random.default_rng(seed)
+
+        # OpenCV 使用的BGR颜色
+        self.cv_red = self.compiled.colors_bgr['color_warning']
+        self.cv_white = self.compiled.colors_bgr['color_normal_text']
+        self.cv_mesh = self.compiled.colors_bgr['mesh_color']
 
         # 统计信息
         self.stats = {
@@ -68,12 +96,20 @@ class ConfigurableCyberCore:
             'text_blocks': 0,
             'errors_used': [],
             'processing_time': 0,
+            'decode_time': decode_time,
+            'decode_scale': decode_scale,
             'box_connections': 0,
-            'warp_boxes': 0
+            'warp_boxes': 0,
+            'stage_times': {},
+            'bytes_touched': {},
+            'conversions': 0
         }
 
-        # 存储框的位置信息用于连线
-        self.boxes_info = []
+        # 框的位置信息（BOX_DTYPE 结构化记录数组，type 为 BOX_TYPES 中的索引）
+        self.boxes_info = np.empty(0, dtype=BOX_DTYPE)
+
+        # 布局计划，可预先指定以复用已有计划（需与图像尺寸一致或按比例缩放）
+        self.plan = plan
 
     def log_debug(self, message):
         """调试日志"""
@@ -81,17 +117,8 @@ class ConfigurableCyberCore:
             print(f"[DEBUG] {message}")
 
     def get_font(self, size_pt):
-        """获取字体"""
-        if not self.font_path or not os.path.exists(self.font_path):
-            return ImageFont.load_default()
-        try:
-            # 根据图像缩放调整字体大小
-            font_size = int(size_pt * self.scale)
-            return ImageFont.truetype(self.font_path, font_size)
-        except Exception as e:
-            if self.debug_mode:
-                print(f"[DEBUG] 字体加载失败: {e}")
-            return ImageFont.load_default()
+        """获取字体（根据图像缩放调整字体大小）"""
+        return load_font(self.font_path, size_pt, self.scale, debug=self.debug_mode)
 
     def draw_text_with_stroke(self, draw, x, y, text, font, fill_color, is_error=False):
         """绘制文字，带黑色描边"""
@@ -116,70 +143,102 @@ class ConfigurableCyberCore:
 
     def get_random_error_message(self):
         """获取随机错误消息"""
+        return self.draw_error_messages(1)[0]
+
+    def draw_error_messages(self, k):
+        """批量抽取 k 条错误消息，扩展模式下记录所用类别"""
+        drawn = self.error_sampler.draw(k, rng=self.rng)
         if self.cfg.use_extended_errors:
-            categories = list(self.cfg.error_weights.keys())
-            weights = list(self.cfg.error_weights.values())
-            category = random.choices(categories, weights=weights, k=1)[0]
-            self.stats['errors_used'].append(category)
-            return get_random_error(category)
-        else:
-            simple_errors = [
-                "KERNEL_PANIC", "SYSTEM_HALT", "MEMORY_CORRUPTION",
-                "HASH_MISMATCH", "KEY_EXPIRED", "ACCESS_DENIED",
-                "DISK_ERR", "CPU_FAULT", "NETWORK_TIMEOUT"
-            ]
-            return random.choice(simple_errors)
-
-    def run(self, save_path):
-        """运行完整渲染流程"""
+            self.stats['errors_used'].extend(category for category, _ in drawn)
+        return [msg for _, msg in drawn]
+
+    def build_plan(self):
+        """规划布局（只做随机决策，不绘制），结果保存在 self.plan"""
+        if self.plan is None:
+            if self.plan_source is None:
+                analysis = analyze_image(self.origin, self.cfg, self.scale)
+                self.plan = plan_layout(analysis, self.cfg, self.seed, compiled=self.compiled)
+            else:
+                # 全尺寸规划，光栅化时按画布宽度缩放
+                scale = self.plan_source.shape[1] / 1200.0
+                analysis = analyze_image(self.plan_source, self.cfg, scale)
+                self.plan = plan_layout(analysis, self.cfg, self.seed)
+                self.plan_source = None
+            self.log_debug(f"布局规划完成: {len(self.plan.texts)} 条文字, {len(self.plan.boxes)} 个框, "
+                           f"{self.plan.nbytes} 字节")
+            if self.cfg.enable_depth_of_field:
+                self.log_debug("景深对焦区域 (x, y, 半径): " + ", ".join(f"{v:.3f}" for v in depth_focus(self)))
+
+        self.stats.update(self.plan.stats())
+        self.boxes_info = self.plan.boxes
+        return self.plan
+
+    def render_layers(self, progress=None):
+        """渲染流水线中与时间无关的阶段（默认为网格、文字、框与景深）
+
+        Args:
+            progress: 可选的进度回调 progress(fraction, desc)
+
+        Returns:
+            BGR格式的底图
+        """
+        if progress is not None:
+            progress(0.0, "规划布局")
+        self.build_plan()
+
+        self.canvas = run_stages(self, self.canvas, self.layer_stages, progress=progress, span=(0.1, 0.6))
+        self.log_debug(f"图层阶段: {[spec.name for spec in self.layer_stages]}")
+        return self.canvas
+
+    def render(self, progress=None):
+        """运行渲染流程（不写文件）
+
+        Args:
+            progress: 可选的进度回调 progress(fraction, desc)
+
+        Returns:
+            BGR格式的结果图像
+        """
         start_time = time.time()
 
         self.log_debug("开始处理图像...")
 
-        # 保存原始图像的副本
-        original = self.canvas.copy()
-
-        hull, mask = detect_subject(self.origin, self.cfg)
-        self.log_debug(f"检测到主体，轮廓点数: {len(hull) if hull is not None else 0}")
+        # 噪声场等预计算只依赖尺寸、配置和种子，可与网格/文字/框/景深并行计算
+        prefetch_stages(self, self.stages)
 
-        pts = draw_sparse_wireframe(self, hull, mask)
-        self.log_debug(f"绘制网格，生成 {len(pts)} 个特征点")
+        self.render_layers(progress)
 
-        # 绘制文字
-        self.canvas = draw_chaotic_text(self, pts)
+        # 时间相关阶段（默认为CRT与噪声），静态渲染不带单帧参数
+        self.canvas = run_stages(self, self.canvas, self.frame_stages, progress=progress, span=(0.6, 0.9))
+        self.log_debug(f"特效阶段: {[spec.name for spec in self.frame_stages]}")
 
-        # 添加四种类型的框
-        self.canvas = draw_boxes(self, self.canvas)
+        # 确保图像不是全白
+        if np.mean(self.canvas) > 250:
+            self.log_debug("警告：检测到图像可能全白，使用原始图像")
+            self.canvas = self.origin.copy()
 
-        # 应用景深效果
-        if self.cfg.enable_depth_of_field:
-            img_pil = Image.fromarray(cv2.cvtColor(self.canvas, cv2.COLOR_BGR2RGB))
-            img_pil = apply_depth_of_field(self, img_pil)
-            self.canvas = cv2.cvtColor(np.array(img_pil), cv2.COLOR_RGB2BGR)
+        self.stats['processing_time'] = time.time() - start_time
+        return self.canvas
 
-        # 应用CRT效果
-        self.canvas = apply_crt_effects(self, self.canvas)
+    def run(self, save_path, progress=None):
+        """运行完整渲染流程并保存结果
 
-        # 应用噪声效果
-        if self.cfg.enable_noise:
-            self.log_debug("应用Perlin噪声...")
-            self.canvas = apply_perlin_noise(self, self.canvas)
-            if self.cfg.noise_rgb_separate:
-                self.log_debug("应用RGB通道独立噪声...")
-                self.canvas = apply_rgb_noise(self, self.canvas)
-            if self.cfg.noise_scanline_enabled:
-                self.log_debug("应用扫描线噪声...")
-                self.canvas = apply_scanline_noise(self, self.canvas)
+        Args:
+            save_path: 输出文件路径
+            progress: 可选的进度回调 progress(fraction, desc)
+        """
+        start_time = time.time()
 
-        # 确保图像不是全白
-        if np.mean(self.canvas) > 250:
-            self.log_debug("警告：检测到图像可能全白，使用原始图像")
-            self.canvas = original
+        self.render(progress)
 
-        cv2.imwrite(save_path, self.canvas)
+        if progress is not None:
+            progress(0.95, "保存图像")
+        write_image_atomic(save_path, self.canvas)
 
         elapsed_time = time.time() - start_time
         self.stats['processing_time'] = elapsed_time
+        if progress is not None:
+            progress(1.0, "完成")
 
         print(f"Saved: {save_path}")
         if self.debug_mode:
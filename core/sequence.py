@@ -0,0 +1,411 @@
+# core/sequence.py
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""单张图片生成首尾相接的循环故障动画，以及逐帧特效与帧写出（视频模式共用）
+
+图像分析、布局规划与网格/文字/框/景深只计算一次，作为所有帧共用的静态底图；
+逐帧只重新计算廉价的时间相关特效：CRT 通道偏移、扫描线相位与带时间维度的 Perlin 噪声。
+"""
+
+import math
+import os
+import random
+import shutil
+import subprocess
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, NamedTuple, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from config import CyberConfig
+from core.effects import NOISE_TIME_PERIOD, crt_shift
+from core.stages import run_stages
+from core.renderer import ConfigurableCyberCore
+from core.utils import write_image_atomic
+
+# 支持的输出格式；无扩展名的输出路径表示 PNG 图片序列目录
+SEQUENCE_FORMATS = ('.gif', '.webp', '.mp4', '.webm', '.avi')
+
+# 每帧出现大幅通道偏移（故障闪烁）的概率
+GLITCH_CHANCE = 0.12
+
+# 每个循环内扫描线滚动的周期数
+SCANLINE_CYCLES = 2
+
+
+class FrameParams(NamedTuple):
+    """单帧的时间相关参数"""
+
+    t: float                # 循环内的时间 [0, 1)
+    shift_x: float          # CRT 红/蓝通道水平偏移
+    shift_y: float          # CRT 红/蓝通道垂直偏移
+    scanline_phase: float   # 扫描线相位 [0, 1)
+    noise_period: int = NOISE_TIME_PERIOD  # 时间噪声每个循环跨越的格点数
+
+
+def frame_params(core, index, frames, base_shift) -> FrameParams:
+    """第 index 帧的时间相关参数，只由 (种子, index mod frames) 决定，每 frames 帧循环一次
+
+    Args:
+        core: 渲染核心（提供种子、配置与缩放系数）
+        index: 帧序号
+        frames: 每个循环的帧数
+        base_shift: 基础通道偏移 (shift_x, shift_y)，通常为 crt_shift(core)
+    """
+    t = (index % frames) / frames
+    rng = random.Random(core.seed * 1000003 + index % frames)
+    base_x, base_y = base_shift
+
+    # 通道偏移随时间平滑摆动，偶尔出现一帧大幅偏移
+    shift_x = base_x * (1.0 + 0.5 * math.sin(2.0 * math.pi * t))
+    shift_y = base_y * (1.0 + 0.5 * math.cos(2.0 * math.pi * t))
+    if rng.random() < GLITCH_CHANCE:
+        shift_x = rng.uniform(1, core.cfg.rgb_shift_max * 3) * core.scale * rng.choice((-1, 1))
+        shift_y = rng.uniform(-2, 2) * core.scale
+
+    return FrameParams(t, shift_x, shift_y, (t * SCANLINE_CYCLES) % 1.0)
+
+
+def apply_frame_effects(core, img, params: FrameParams, noise_period=NOISE_TIME_PERIOD) -> np.ndarray:
+    """对底图执行流水线中的时间相关阶段（默认为CRT、时间噪声、扫描线），返回新图像，不修改 img 与 core"""
+    return run_stages(core, img, core.frame_stages, params._replace(noise_period=noise_period))
+
+
+class SequenceRenderer:
+    """循环故障动画渲染器
+
+    布局在所有帧中保持不变；每帧参数只由 (种子, 帧序号) 决定，帧可以任意顺序并行渲染，
+    结果与串行渲染一致，t=0 与 t=1 首尾相接。
+
+    Args:
+        img_path: 输入图片路径、编码后的图片数据或BGR图像数组
+        font_path: 字体文件路径
+        config: 渲染配置
+        seed: 随机种子
+        frames: 每个循环的帧数
+        fps: 帧率
+        noise_period: 时间噪声每个循环跨越的格点数，越大噪声变化越快
+        workers: 并行渲染帧的线程数，None 时取 CPU 核数（最多 4）
+        executor: 可选的外部线程池，指定时 workers 只决定提前渲染的帧数
+        debug_mode: 是否输出调试信息
+        preview_size: 目标长边（像素），按满足该长边的最小尺寸缩小解码
+    """
+
+    def __init__(self, img_path, font_path, config: CyberConfig, seed=42, frames=24, fps=12,
+                 noise_period=NOISE_TIME_PERIOD, workers=None, executor=None, debug_mode=False, preview_size=None):
+        if frames < 1:
+            raise ValueError(f"帧数必须大于0: {frames}")
+        if fps <= 0:
+            raise ValueError(f"帧率必须大于0: {fps}")
+
+        self.core = ConfigurableCyberCore(img_path, font_path, config, seed, debug_mode, preview_size=preview_size)
+        self.cfg = config
+        self.seed = seed
+        self.frames = int(frames)
+        self.fps = fps
+        self.noise_period = noise_period
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.executor = executor
+
+        self.base = None
+        self._shift = (0, 0)
+
+        self.stats = dict(self.core.stats, frames=self.frames, fps=fps, analysis_time=0.0, frame_time=0.0,
+                          encode_time=0.0, processing_time=0.0, encoder=None)
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """帧尺寸 (宽, 高)"""
+        return self.core.w, self.core.h
+
+    def prepare(self, progress=None):
+        """计算静态底图与基础通道偏移（只执行一次）
+
+        Returns:
+            BGR格式的底图
+        """
+        if self.base is None:
+            start = time.perf_counter()
+            self.base = self.core.render_layers(progress)
+            self.base.flags.writeable = False
+            # 与静态渲染相同的基础偏移，t=0 时接近单张渲染的效果
+            self._shift = crt_shift(self.core)
+            self.stats.update(self.core.stats)
+            self.stats['analysis_time'] = time.perf_counter() - start
+        return self.base
+
+    def frame_params(self, index) -> FrameParams:
+        """第 index 帧的时间相关参数（只由种子与帧序号决定）"""
+        return frame_params(self.core, index, self.frames, self._shift)
+
+    def render_frame(self, index) -> np.ndarray:
+        """渲染第 index 帧（线程安全，不修改共享状态）"""
+        return apply_frame_effects(self.core, self.prepare(), self.frame_params(index), self.noise_period)
+
+    def iter_frames(self, progress=None) -> Iterator[Tuple[int, np.ndarray]]:
+        """按帧序号依次产出 (序号, BGR帧)
+
+        帧在线程池中并行渲染，最多提前 2 × 线程数 帧，内存占用与总帧数无关。
+        """
+        self.prepare(progress)
+        executor = self.executor or ThreadPoolExecutor(self.workers, thread_name_prefix="sequence-frame")
+        window = 2 * self.workers
+        pending = deque()
+        try:
+            for index in range(self.frames):
+                pending.append((index, executor.submit(self.render_frame, index)))
+                if len(pending) >= window:
+                    index, fut = pending.popleft()
+                    yield index, fut.result()
+            while pending:
+                index, fut = pending.popleft()
+                yield index, fut.result()
+        finally:
+            for _, fut in pending:
+                fut.cancel()
+            if executor is not self.executor:
+                executor.shutdown(wait=True)
+
+    def run(self, save_path, progress=None) -> dict:
+        """渲染全部帧并边渲染边编码写出
+
+        Args:
+            save_path: 输出路径，扩展名决定格式（见 SEQUENCE_FORMATS），无扩展名时写出 PNG 图片序列目录
+            progress: 可选的进度回调 progress(fraction, desc)
+
+        Returns:
+            统计信息字典
+        """
+        start = time.perf_counter()
+
+        def report(fraction, desc):
+            if progress is not None:
+                progress(fraction, desc)
+
+        # 底图占整体进度的前 30%
+        self.prepare(lambda fraction, desc: report(fraction * 0.3, desc))
+
+        encode_time = 0.0
+        frames_start = time.perf_counter()
+        with open_sequence_writer(save_path, self.fps, self.size) as writer:
+            self.stats['encoder'] = writer.name
+            for index, frame in self.iter_frames():
+                encode_start = time.perf_counter()
+                writer.write(frame)
+                encode_time += time.perf_counter() - encode_start
+                report(0.3 + 0.65 * (index + 1) / self.frames, f"渲染帧 {index + 1}/{self.frames}")
+            report(0.95, "编码动画")
+            encode_start = time.perf_counter()
+        encode_time += time.perf_counter() - encode_start
+
+        elapsed = time.perf_counter() - frames_start
+        self.stats['encode_time'] = encode_time
+        self.stats['frame_time'] = (elapsed - encode_time) / self.frames
+        self.stats['processing_time'] = time.perf_counter() - start
+        report(1.0, "完成")
+
+        if self.core.debug_mode:
+            print(f"[DEBUG] 动画统计信息: {self.stats}")
+        return self.stats
+
+    def get_stats(self):
+        """获取处理统计信息"""
+        return self.stats
+
+
+# ----------------------------------------------------------------------
+# 帧写出
+# ----------------------------------------------------------------------
+class _SequenceWriter:
+    """帧写出器基类：write(BGR帧)，close() 完成编码；支持 with 语句，异常时丢弃不完整的输出"""
+
+    name = None
+
+    def write(self, frame):
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+    def abort(self):
+        """丢弃未完成的输出"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def _tmp_path(path):
+    """同目录的临时文件，保留扩展名以便编码器识别格式"""
+    directory, name = os.path.split(path)
+    stem, ext = os.path.splitext(name)
+    return os.path.join(directory, f".{stem}.tmp{ext}")
+
+
+class FFmpegWriter(_SequenceWriter):
+    """通过 ffmpeg 子进程流式编码：原始 BGR 帧写入 stdin，完成后原子替换输出文件"""
+
+    name = 'ffmpeg'
+
+    # 各格式的编码参数（mp4/webm 的 yuv420p 需要偶数尺寸）
+    CODEC_ARGS = {
+        '.mp4': ['-vf', 'scale=trunc(iw/2)*2:trunc(ih/2)*2', '-c:v', 'libx264', '-pix_fmt', 'yuv420p',
+                 '-movflags', '+faststart'],
+        '.webm': ['-vf', 'scale=trunc(iw/2)*2:trunc(ih/2)*2', '-c:v', 'libvpx-vp9', '-pix_fmt', 'yuv420p',
+                  '-b:v', '0', '-crf', '32'],
+        '.gif': ['-vf', 'split[a][b];[a]palettegen[p];[b][p]paletteuse', '-loop', '0'],
+        '.webp': ['-c:v', 'libwebp', '-loop', '0', '-q:v', '80'],
+        '.avi': ['-c:v', 'mjpeg', '-q:v', '3'],
+    }
+
+    def __init__(self, path, fps, size, ffmpeg='ffmpeg'):
+        self.path = path
+        self.tmp = _tmp_path(path)
+        w, h = size
+        cmd = [ffmpeg, '-y', '-loglevel', 'error',
+               '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f"{w}x{h}", '-r', str(fps), '-i', '-',
+               *self.CODEC_ARGS[os.path.splitext(path)[1].lower()], self.tmp]
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def write(self, frame):
+        try:
+            self.proc.stdin.write(np.ascontiguousarray(frame).tobytes())
+        except BrokenPipeError:
+            self.close()  # 抛出 ffmpeg 的错误信息
+
+    def close(self):
+        if not self.proc.stdin.closed:
+            self.proc.stdin.close()
+        error = self.proc.stderr.read().decode('utf-8', 'replace').strip()
+        if self.proc.wait() != 0:
+            self.abort()
+            raise RuntimeError(f"ffmpeg 编码失败: {error}")
+        os.replace(self.tmp, self.path)
+
+    def abort(self):
+        if self.proc.poll() is None:
+            self.proc.kill()
+            self.proc.wait()
+        if os.path.exists(self.tmp):
+            os.remove(self.tmp)
+
+
+class PillowAnimationWriter(_SequenceWriter):
+    """没有 ffmpeg 时用 Pillow 编码 GIF/WebP
+
+    Pillow 需要全部帧才能编码，帧在内存中保留到 close()（GIF 帧先量化为调色板图像，每像素 1 字节）。
+    """
+
+    name = 'pillow'
+
+    def __init__(self, path, fps, size):
+        self.path = path
+        self.duration = int(round(1000 / fps))
+        self.is_gif = path.lower().endswith('.gif')
+        self.frames = []
+
+    def write(self, frame):
+        img = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        self.frames.append(img.quantize(256, method=Image.Quantize.FASTOCTREE) if self.is_gif else img)
+
+    def close(self):
+        if not self.frames:
+            raise ValueError("没有可写出的帧")
+        tmp = _tmp_path(self.path)
+        try:
+            self.frames[0].save(tmp, save_all=True, append_images=self.frames[1:], duration=self.duration, loop=0)
+            os.replace(tmp, self.path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        finally:
+            self.frames = []
+
+    def abort(self):
+        self.frames = []
+
+
+class OpenCVVideoWriter(_SequenceWriter):
+    """没有 ffmpeg 时用 cv2.VideoWriter 流式编码 MP4 (mp4v) / AVI (MJPG)"""
+
+    name = 'opencv'
+
+    FOURCC = {'.mp4': 'mp4v', '.avi': 'MJPG'}
+
+    def __init__(self, path, fps, size):
+        self.path = path
+        self.tmp = _tmp_path(path)
+        ext = os.path.splitext(path)[1].lower()
+        self.writer = cv2.VideoWriter(self.tmp, cv2.VideoWriter_fourcc(*self.FOURCC[ext]), fps, tuple(size))
+        if not self.writer.isOpened():
+            raise RuntimeError(f"OpenCV 无法创建 {ext} 视频编码器")
+
+    def write(self, frame):
+        self.writer.write(frame)
+
+    def close(self):
+        self.writer.release()
+        os.replace(self.tmp, self.path)
+
+    def abort(self):
+        self.writer.release()
+        if os.path.exists(self.tmp):
+            os.remove(self.tmp)
+
+
+class ImageSequenceWriter(_SequenceWriter):
+    """逐帧写出 PNG 图片序列 frame_00000.png、frame_00001.png ..."""
+
+    name = 'png'
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.count = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, frame):
+        write_image_atomic(os.path.join(self.directory, f"frame_{self.count:05d}.png"), frame)
+        self.count += 1
+
+    def close(self):
+        pass
+
+
+def open_sequence_writer(path, fps, size, ffmpeg=None) -> _SequenceWriter:
+    """按输出路径选择帧写出器
+
+    Args:
+        path: 输出路径；无扩展名表示 PNG 图片序列目录
+        fps: 帧率
+        size: 帧尺寸 (宽, 高)
+        ffmpeg: ffmpeg 可执行文件路径，None 时在 PATH 中查找
+
+    Raises:
+        ValueError: 不支持的格式
+        RuntimeError: 格式需要 ffmpeg 但未找到
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if not ext:
+        return ImageSequenceWriter(path)
+    if ext not in SEQUENCE_FORMATS:
+        raise ValueError(f"不支持的动画格式: {ext}，可选 {', '.join(SEQUENCE_FORMATS)} 或无扩展名的图片序列目录")
+
+    ffmpeg = ffmpeg or shutil.which('ffmpeg')
+    if ffmpeg:
+        return FFmpegWriter(path, fps, size, ffmpeg)
+    if ext in ('.gif', '.webp'):
+        return PillowAnimationWriter(path, fps, size)
+    if ext in OpenCVVideoWriter.FOURCC:
+        return OpenCVVideoWriter(path, fps, size)
+    raise RuntimeError(f"输出 {ext} 需要 ffmpeg，未在 PATH 中找到")
@@ -0,0 +1,388 @@
+# core/stages.py
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""特效注册表与阶段调度
+
+每个特效通过 register_effect 声明：读取的配置字段、输入/输出的图像表示、能否按行带分块执行、
+开销等级、是否随动画时间变化、会改变的区域，以及可提前并行计算的与像素无关的任务（如噪声场）。
+CyberConfig.pipeline 按顺序列出阶段名，调度器据此：
+
+- 只在相邻阶段的表示不同时转换（BGR 数组 / RGBA 数组 / RGBA 的 PIL 图像）
+- 跳过区域为空的阶段（例如没有检测到主体时的网格），并统计每个阶段读写的字节数
+- 渲染开始时把所有阶段的预计算任务提交到线程池，与前面的阶段并行
+- 连续的可分块阶段按行带在线程池中并行执行，每个行带依次经过这些阶段
+
+每个阶段声明的配置字段同时用于计算该阶段的配置子指纹（stage_fingerprints），
+用于缓存或断点续跑时判断哪些阶段的参数发生了变化。
+
+新增特效只需注册，不需要修改渲染器::
+
+    @register_effect('vignette', config_fields=('vignette_amount',), cost=COST_LIGHT)
+    def apply_vignette(core, img, frame):
+        ...
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from core.effects import (
+    NOISE_TIME_PERIOD, apply_perlin_noise, apply_rgb_noise, apply_scanline_noise, crt_scanline_spacing, crt_shift,
+    depth_of_field_work_region, perlin_noise_tasks, render_crt, render_depth_of_field, rgb_noise_tasks
+)
+from core.layout import (
+    boxes_region, draw_boxes_layer, draw_text_layer, mesh_region, rasterize_mesh, text_region
+)
+from core.utils import rects_area
+
+# 图像表示
+REPR_BGR = 'bgr'    # uint8 的 BGR 数组（OpenCV）
+REPR_RGBA = 'rgba'  # uint8 的 RGBA 数组
+REPR_PIL = 'pil'    # RGBA 模式的 PIL 图像
+REPRESENTATIONS = (REPR_BGR, REPR_RGBA, REPR_PIL)
+
+# 各表示每像素的字节数
+BYTES_PER_PIXEL = {REPR_BGR: 3, REPR_RGBA: 4, REPR_PIL: 4}
+
+# 开销等级
+COST_LIGHT = 'light'    # 逐像素的简单运算
+COST_MEDIUM = 'medium'  # 若干整幅图像的数组运算
+COST_HEAVY = 'heavy'    # 模糊、文字光栅化等
+COSTS = (COST_LIGHT, COST_MEDIUM, COST_HEAVY)
+
+# 分块执行时每个行带的行数
+TILE_ROWS = 256
+
+# plan_layout 用同一个随机数生成器依次规划的图层阶段：前面阶段的配置决定消耗多少随机数，
+# 因此会改变后面阶段的布局
+LAYOUT_STAGES = ('mesh', 'text', 'boxes')
+
+
+@dataclass(frozen=True)
+class EffectSpec:
+    """已注册特效的声明
+
+    fn(core, img, frame) 接收 input 表示的图像，返回 output 表示的图像；
+    frame 为动画的单帧参数（core.sequence.FrameParams），静态渲染时为 None。
+    静态特效可以原地修改 img，时间相关特效不可以（动画的各帧共用同一张只读底图）。
+    可分块的特效还接受 rows=slice(y0, y1)，此时 img 为整帧中该行带的 BGR 数组。
+    """
+    name: str
+    fn: Callable
+    input: str = REPR_BGR
+    output: str = REPR_BGR
+    tileable: bool = False
+    cost: str = COST_MEDIUM
+    temporal: bool = False
+    config_fields: Tuple[str, ...] = ()
+    enabled: Optional[Callable] = None    # enabled(cfg) -> bool，None 表示总是执行
+    prefetch: Optional[Callable] = None   # prefetch(core) -> [(fn, args)]，与像素无关的预计算任务
+    region: Optional[Callable] = None     # region(core, w, h) -> [(x0, y0, x1, y1)]，None 表示整幅图像
+    label: str = ''
+
+    def is_enabled(self, cfg) -> bool:
+        return self.enabled is None or bool(self.enabled(cfg))
+
+
+# 特效名 -> EffectSpec
+EFFECTS: Dict[str, EffectSpec] = {}
+
+
+def register_effect(name, *, input=REPR_BGR, output=None, tileable=False, cost=COST_MEDIUM, temporal=False,
+                    config_fields=(), enabled=None, prefetch=None, region=None, label=None, replace=False):
+    """注册特效的装饰器
+
+    Args:
+        name: 特效名，即 CyberConfig.pipeline 中使用的阶段名
+        input, output: 输入/输出的图像表示（REPRESENTATIONS），output 默认与 input 相同
+        tileable: 输出的每一行只依赖输入的同一行（以及整帧尺寸），可以按行带分块并行执行
+        cost: 开销等级（COSTS）
+        temporal: 结果是否随动画时间变化；动画与视频只逐帧重新执行时间相关阶段及其之后的阶段
+        config_fields: 特效读取的 CyberConfig 字段
+        enabled: enabled(cfg) -> bool，返回 False 时跳过该阶段
+        prefetch: prefetch(core) -> [(fn, args)]，只依赖尺寸、配置和种子的预计算任务
+        region: region(core, w, h) -> [(x0, y0, x1, y1)]，特效可能改变的全部像素所在的矩形；
+            特效自身应只在这些矩形内复制、模糊与混合。返回空列表时跳过该阶段，不注册表示整幅图像
+        label: 进度提示文字
+        replace: 是否允许覆盖同名特效
+
+    Raises:
+        ValueError: 重名、未知的表示或开销等级
+    """
+    output = output or input
+
+    def decorator(fn):
+        if name in EFFECTS and not replace:
+            raise ValueError(f"特效已注册: {name}")
+        for rep in (input, output):
+            if rep not in REPRESENTATIONS:
+                raise ValueError(f"未知的图像表示: {rep}（可用: {', '.join(REPRESENTATIONS)}）")
+        if cost not in COSTS:
+            raise ValueError(f"未知的开销等级: {cost}（可用: {', '.join(COSTS)}）")
+        if tileable and not (input == output == REPR_BGR):
+            raise ValueError(f"可分块的特效必须输入输出 BGR 数组: {name}")
+
+        EFFECTS[name] = EffectSpec(
+            name=name, fn=fn, input=input, output=output, tileable=tileable, cost=cost, temporal=temporal,
+            config_fields=tuple(config_fields), enabled=enabled, prefetch=prefetch, region=region,
+            label=label or name,
+        )
+        return fn
+
+    return decorator
+
+
+def get_effect(name) -> EffectSpec:
+    """按名称获取特效声明
+
+    Raises:
+        ValueError: 未注册的特效
+    """
+    spec = EFFECTS.get(name)
+    if spec is None:
+        raise ValueError(f"未知的特效阶段: {name}（可用: {', '.join(EFFECTS)}）")
+    return spec
+
+
+def stage_config_fields(spec: EffectSpec) -> Tuple[str, ...]:
+    """影响该阶段结果的配置项：声明的 config_fields，图层阶段再加上在它之前规划的图层阶段的配置项"""
+    if spec.name not in LAYOUT_STAGES:
+        return spec.config_fields
+    names = set()
+    for name in LAYOUT_STAGES[:LAYOUT_STAGES.index(spec.name) + 1]:
+        if name in EFFECTS:
+            names.update(EFFECTS[name].config_fields)
+    return tuple(sorted(names))
+
+
+def stage_fingerprints(compiled, stages=None) -> Dict[str, str]:
+    """各阶段的配置子指纹 {阶段名: 指纹}，只覆盖 stage_config_fields 中的配置项
+
+    子指纹只反映该阶段自身的参数；阶段的输出还取决于输入图像、种子与前面各阶段的输出。
+
+    Args:
+        compiled: CyberConfig.compile() 的结果，指纹缓存在它上面
+        stages: EffectSpec 列表，None 表示配置的流水线中的全部阶段
+    """
+    if stages is None:
+        stages = [get_effect(name) for name in compiled.values['pipeline']]
+    return {spec.name: compiled.fingerprint_of(stage_config_fields(spec)) for spec in stages}
+
+
+def resolve_pipeline(cfg) -> List[EffectSpec]:
+    """按 cfg.pipeline 的顺序解析阶段，跳过当前配置下未启用的特效"""
+    return [spec for spec in map(get_effect, cfg.pipeline) if spec.is_enabled(cfg)]
+
+
+def split_pipeline(stages) -> Tuple[List[EffectSpec], List[EffectSpec]]:
+    """拆分为 (静态阶段, 逐帧阶段)：第一个时间相关阶段之前的部分所有帧共用"""
+    for i, spec in enumerate(stages):
+        if spec.temporal:
+            return list(stages[:i]), list(stages[i:])
+    return list(stages), []
+
+
+def convert(img, src, dst):
+    """在图像表示之间转换，表示相同时原样返回"""
+    if src == dst:
+        return img
+    if src == REPR_PIL:
+        if img.mode != 'RGBA':
+            img = img.convert('RGBA')
+        # 转为 RGBA 数组时可能被原地修改，需要可写副本
+        return np.array(img) if dst == REPR_RGBA else cv2.cvtColor(np.asarray(img), cv2.COLOR_RGBA2BGR)
+    if src == REPR_BGR:
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGBA)
+        return img if dst == REPR_RGBA else Image.fromarray(img)
+    # RGBA 数组
+    return Image.fromarray(img) if dst == REPR_PIL else cv2.cvtColor(img, cv2.COLOR_RGBA2BGR)
+
+
+def prefetch_stages(core, stages):
+    """把各阶段与像素无关的预计算任务提交到 core.executor（没有线程池时不做任何事）"""
+    if core.executor is None:
+        return
+    for spec in stages:
+        if spec.prefetch is not None:
+            for fn, args in spec.prefetch(core):
+                core.executor.submit(fn, *args)
+
+
+def _run_tiled(core, img, group):
+    """按行带在线程池中执行一组连续的可分块阶段（静态渲染），结果与整幅执行一致"""
+    h = img.shape[0]
+    out = np.empty_like(img)
+
+    def run_band(y0, y1):
+        rows = slice(y0, y1)
+        band = img[rows]
+        for spec in group:
+            band = spec.fn(core, band, None, rows=rows)
+        out[rows] = band
+
+    futures = [core.executor.submit(run_band, y0, min(y0 + TILE_ROWS, h)) for y0 in range(0, h, TILE_ROWS)]
+    for fut in futures:
+        fut.result()
+    return out
+
+
+def run_stages(core, img, stages, frame=None, progress=None, span=(0.0, 1.0)):
+    """依次执行阶段，返回 BGR 图像
+
+    Args:
+        core: 渲染核心（提供配置、种子、随机数生成器与线程池）
+        img: BGR 输入图像
+        stages: EffectSpec 列表（resolve_pipeline / split_pipeline 的结果）
+        frame: 动画的单帧参数，静态渲染时为 None
+        progress: 可选的进度回调 progress(fraction, desc)
+        span: 这些阶段占用的进度区间 (起, 止)
+
+    静态渲染时各阶段耗时累计到 core.stats['stage_times']，改变区域的字节数累计到 core.stats['bytes_touched']，
+    表示转换次数累计到 core.stats['conversions']；逐帧渲染（frame 不为 None）可能在多个线程中并发执行，不修改 core。
+    """
+    record = frame is None
+    tiled = record and core.executor is not None and img.shape[0] > TILE_ROWS
+    conversions = 0
+
+    rep = REPR_BGR
+    i = 0
+    while i < len(stages):
+        spec = stages[i]
+        if progress is not None:
+            progress(span[0] + (span[1] - span[0]) * i / len(stages), spec.label)
+
+        group = [spec]
+        use_tiles = tiled and spec.tileable
+        if use_tiles:
+            while i + len(group) < len(stages) and stages[i + len(group)].tileable:
+                group.append(stages[i + len(group)])
+
+        start = time.perf_counter()
+        regions = [member.region(core, core.w, core.h) if member.region else None for member in group]
+        if regions == [[]]:
+            core.log_debug(f"阶段 {spec.name} 没有需要改变的区域，跳过")
+            i += 1
+            continue
+
+        if rep != spec.input:
+            img = convert(img, rep, spec.input)
+            conversions += 1
+        if use_tiles:
+            img = _run_tiled(core, img, group)
+        else:
+            img = spec.fn(core, img, frame)
+        rep = spec.output
+
+        if record:
+            name = '+'.join(s.name for s in group)
+            stage_times = core.stats['stage_times']
+            stage_times[name] = stage_times.get(name, 0.0) + time.perf_counter() - start
+            bytes_touched = core.stats['bytes_touched']
+            for member, rects in zip(group, regions):
+                area = core.w * core.h if rects is None else rects_area(rects)
+                bytes_touched[member.name] = bytes_touched.get(member.name, 0) + area * BYTES_PER_PIXEL[member.input]
+        i += len(group)
+
+    if rep != REPR_BGR:
+        img = convert(img, rep, REPR_BGR)
+        conversions += 1
+    if record:
+        core.stats['conversions'] += conversions
+    return img
+
+
+# ==========================================
+# 内置特效
+# ==========================================
+def _noise_enabled(cfg):
+    return cfg.enable_noise
+
+
+def _noise_time(frame):
+    """单帧参数中的 (t, period)，静态渲染时 t 为 None"""
+    if frame is None:
+        return None, NOISE_TIME_PERIOD
+    return frame.t, frame.noise_period
+
+
+@register_effect('mesh', cost=COST_LIGHT, label="绘制网格",
+                 region=lambda core, w, h: mesh_region(core.plan, w, h),
+                 config_fields=('mesh_complexity', 'line_connect_chance', 'nerve_mutation_chance',
+                                'mesh_color', 'color_warning'))
+def _mesh_stage(core, img, frame):
+    return rasterize_mesh(core.plan, img)
+
+
+@register_effect('text', input=REPR_PIL, cost=COST_HEAVY, label="绘制文字",
+                 region=lambda core, w, h: text_region(core.plan, w, h),
+                 config_fields=('log_blocks_range', 'log_lines_per_block', 'node_text_chance', 'title_erosion_rate',
+                                'fatal_error_count', 'hud_line_chance', 'style_weights',
+                                'torn_trigger_chance', 'torn_offset_x', 'torn_offset_y', 'staircase_step',
+                                'color_normal_text', 'color_error_text', 'use_extended_errors', 'error_weights'))
+def _text_stage(core, img, frame):
+    return draw_text_layer(core.plan, img, core.font_path)
+
+
+@register_effect('boxes', input=REPR_RGBA, output=REPR_PIL, cost=COST_HEAVY, label="绘制框",
+                 region=lambda core, w, h: boxes_region(core.plan, w, h),
+                 config_fields=('box_count', 'box_size_range', 'box_type_weights', 'box_border_thickness',
+                                'color_border', 'color_normal_text', 'color_float', 'box_float_display',
+                                'box_float_range', 'box_float_precision', 'bios_title_bar_height',
+                                'bios_title_formats', 'box_line_connect_chance', 'box_line_max_distance',
+                                'box_line_thickness', 'box_line_color', 'box_line_jitter_chance',
+                                'box_line_jitter_amount', 'warp_intensity', 'warp_segments', 'warp_glitch_chance',
+                                'warp_shift_range', 'warp_color_shift', 'warp_scanline_jitter',
+                                'use_extended_errors', 'error_weights'))
+def _boxes_stage(core, img, frame):
+    return draw_boxes_layer(core.plan, img, core.font_path)
+
+
+@register_effect('depth_of_field', cost=COST_HEAVY, label="景深效果",
+                 enabled=lambda cfg: cfg.enable_depth_of_field, region=depth_of_field_work_region,
+                 config_fields=('enable_depth_of_field', 'depth_focus_mode', 'depth_focus_center',
+                                'depth_focus_radius', 'depth_blur_amount', 'depth_blur_levels', 'depth_darken_amount',
+                                'depth_fade_start', 'depth_engine', 'precision'))
+def _depth_of_field_stage(core, img, frame):
+    return render_depth_of_field(core, img)
+
+
+@register_effect('crt', cost=COST_MEDIUM, temporal=True, label="CRT效果",
+                 config_fields=('rgb_shift_max', 'scanline_darkness', 'precision'))
+def _crt_stage(core, img, frame):
+    if frame is None:
+        return render_crt(core, img, *crt_shift(core))
+    offset = int(frame.scanline_phase * crt_scanline_spacing(core))
+    return render_crt(core, img, frame.shift_x, frame.shift_y, scanline_offset=offset)
+
+
+@register_effect('perlin_noise', tileable=True, cost=COST_MEDIUM, temporal=True, label="噪声效果",
+                 enabled=_noise_enabled, prefetch=perlin_noise_tasks,
+                 config_fields=('enable_noise', 'noise_perlin_scale', 'noise_perlin_octaves',
+                                'noise_perlin_intensity', 'noise_strength', 'precision'))
+def _perlin_noise_stage(core, img, frame, rows=None):
+    t, period = _noise_time(frame)
+    return apply_perlin_noise(core, img, t=t, period=period, rows=rows)
+
+
+@register_effect('rgb_noise', tileable=True, cost=COST_MEDIUM, temporal=True, label="RGB通道噪声",
+                 enabled=lambda cfg: cfg.enable_noise and cfg.noise_rgb_separate, prefetch=rgb_noise_tasks,
+                 config_fields=('enable_noise', 'noise_rgb_separate', 'noise_perlin_scale', 'noise_perlin_octaves',
+                                'noise_rgb_r_intensity', 'noise_rgb_g_intensity', 'noise_rgb_b_intensity',
+                                'noise_strength', 'precision'))
+def _rgb_noise_stage(core, img, frame, rows=None):
+    t, period = _noise_time(frame)
+    return apply_rgb_noise(core, img, t=t, period=period, rows=rows)
+
+
+@register_effect('scanline_noise', tileable=True, cost=COST_LIGHT, temporal=True, label="扫描线噪声",
+                 enabled=lambda cfg: cfg.enable_noise and cfg.noise_scanline_enabled,
+                 config_fields=('enable_noise', 'noise_scanline_enabled', 'noise_scanline_intensity',
+                                'noise_scanline_frequency', 'noise_strength', 'precision'))
+def _scanline_noise_stage(core, img, frame, rows=None):
+    phase = 0.0 if frame is None else frame.scanline_phase
+    return apply_scanline_noise(core, img, phase=phase, rows=rows)
@@ -2,10 +2,153 @@
 # !/usr/bin/env python
 # -*- coding: utf-8 -*-
 import cv2
+import io
 import numpy as np
-import random
 import os
-from PIL import ImageFont
+from functools import lru_cache
+from PIL import Image, ImageFont
+
+# 缩小解码标志：JPEG 在 DCT 阶段直接按 1/2、1/4、1/8 解码，其他格式解码后缩小
+_REDUCED_COLOR_FLAGS = {
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+@lru_cache(maxsize=64)
+def load_truetype(font_path, font_size):
+    """加载TrueType字体（按路径和字号缓存，工作进程内复用）"""
+    return ImageFont.truetype(font_path, font_size)
+
+
+def load_font(font_path, size_pt, scale, debug=False):
+    """按图像缩放系数加载字体，字体不可用时退回默认字体"""
+    if not font_path or not os.path.exists(font_path):
+        return ImageFont.load_default()
+    try:
+        return load_truetype(font_path, int(size_pt * scale))
+    except Exception as e:
+        if debug:
+            print(f"[DEBUG] 字体加载失败: {e}")
+        return ImageFont.load_default()
+
+
+def reduced_decode_factor(size, target_long_edge) -> int:
+    """长边仍不小于目标的最大缩小倍数 (8/4/2)，不满足时返回 1
+
+    Args:
+        size: 原图 (宽, 高)
+        target_long_edge: 目标长边（像素），为空表示全尺寸
+    """
+    if not target_long_edge:
+        return 1
+    long_edge = max(size)
+    for factor in sorted(_REDUCED_COLOR_FLAGS, reverse=True):
+        if -(-long_edge // factor) >= target_long_edge:
+            return factor
+    return 1
+
+
+def load_image(source, target_long_edge=None):
+    """解码为BGR图像，指定目标长边时选择满足该长边的最小解码尺寸
+
+    Args:
+        source: 图片路径或编码后的图片数据 (bytes)
+        target_long_edge: 目标长边（像素），用于预览/代理渲染，None 表示全尺寸
+
+    Returns:
+        (BGR图像，解码失败为None；缩小倍数)
+    """
+    in_memory = isinstance(source, (bytes, bytearray, memoryview))
+    factor = 1
+    if target_long_edge:
+        # 只读取文件头获取尺寸
+        try:
+            with Image.open(io.BytesIO(source) if in_memory else source) as im:
+                factor = reduced_decode_factor(im.size, target_long_edge)
+        except (OSError, ValueError):
+            pass  # 无法识别的格式交给 OpenCV 全尺寸解码并报告错误
+
+    flag = _REDUCED_COLOR_FLAGS.get(factor, cv2.IMREAD_COLOR)
+    if in_memory:
+        img = cv2.imdecode(np.frombuffer(source, dtype=np.uint8), flag)
+    else:
+        img = cv2.imread(source, flag)
+    return img, factor
+
+
+def load_proxy_image(source, target_long_edge):
+    """全尺寸解码后缩小为代理图像，尺寸与 load_image 的缩小解码一致
+
+    用于按全尺寸规划布局、按代理尺寸光栅化：布局与同一种子的完整渲染一致，代价是全尺寸解码。
+
+    Returns:
+        (全尺寸BGR图像，无需缩小时为None；代理BGR图像，解码失败为None；缩小倍数)
+    """
+    full, _ = load_image(source)
+    if full is None:
+        return None, None, 1
+    h, w = full.shape[:2]
+    factor = reduced_decode_factor((w, h), target_long_edge)
+    if factor == 1:
+        return None, full, 1
+    proxy = cv2.resize(full, (-(-w // factor), -(-h // factor)), interpolation=cv2.INTER_AREA)
+    return full, proxy, factor
+
+
+def clip_rect(x0, y0, x1, y1, width, height):
+    """把矩形 [x0, x1) × [y0, y1) 裁剪到画布内，为空时返回 None"""
+    x0, y0 = max(0, int(x0)), max(0, int(y0))
+    x1, y1 = min(width, int(x1)), min(height, int(y1))
+    if x0 >= x1 or y0 >= y1:
+        return None
+    return x0, y0, x1, y1
+
+
+def intersect_rects(a, b):
+    """两个矩形的交集，为空时返回 None"""
+    x0, y0, x1, y1 = max(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), min(a[3], b[3])
+    if x0 >= x1 or y0 >= y1:
+        return None
+    return x0, y0, x1, y1
+
+
+def bounding_rect(points, pad, width, height):
+    """点集 [N, 2] 向外扩展 pad 像素后的包围矩形（裁剪到画布内），点集为空时返回 None"""
+    if not len(points):
+        return None
+    x0, y0 = points.min(axis=0)
+    x1, y1 = points.max(axis=0)
+    return clip_rect(x0 - pad, y0 - pad, x1 + pad + 1, y1 + pad + 1, width, height)
+
+
+def rects_area(rects):
+    """矩形列表的面积之和（像素数，重叠部分重复计算）"""
+    return sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in rects)
+
+
+def write_bytes_atomic(path, data: bytes):
+    """先写入同目录的临时文件再原子替换，崩溃时不会留下不完整的输出文件"""
+    directory, name = os.path.split(path)
+    tmp = os.path.join(directory, f".{name}.tmp")
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def write_image_atomic(path, img):
+    """按扩展名编码后原子写入"""
+    ext = os.path.splitext(path)[1] or '.png'
+    ok, encoded = cv2.imencode(ext, img)
+    if not ok:
+        raise ValueError(f"无法编码输出格式: {ext}")
+    write_bytes_atomic(path, encoded.tobytes())
 
 
 def get_font(core, size_pt):
@@ -66,6 +209,33 @@ def detect_subject(img, cfg):
     return hull, mask
 
 
+def subject_focus(hull, width, height):
+    """由主体凸包的矩估计对焦区域
+
+    中心为凸包的质心，半径为与凸包二阶矩相同的椭圆的长半轴（2 * sqrt(最大特征值)），
+    均表示为图像尺寸的比例：(中心x / 宽, 中心y / 高, 半径 / 短边)。
+
+    Args:
+        hull: 主体凸包 [N, 1, 2]
+        width, height: 图像尺寸
+
+    Returns:
+        (focus_x, focus_y, focus_radius)，凸包为空或退化（面积为0）时返回 None
+    """
+    if hull is None or len(hull) < 3:
+        return None
+    m = cv2.moments(hull)
+    if m['m00'] <= 0:
+        return None
+    mu20, mu02, mu11 = m['mu20'] / m['m00'], m['mu02'] / m['m00'], m['mu11'] / m['m00']
+    major = (mu20 + mu02) / 2 + np.sqrt(((mu20 - mu02) / 2) ** 2 + mu11 ** 2)
+    return (
+        float(m['m10'] / m['m00'] / width),
+        float(m['m01'] / m['m00'] / height),
+        float(2 * np.sqrt(major) / min(width, height)),
+    )
+
+
 def draw_sparse_wireframe(core, hull, mask):
     """绘制稀疏线框
 
@@ -77,63 +247,16 @@ def draw_sparse_wireframe(core, hull, mask):
     Returns:
         valid_pts: 有效特征点列表
     """
+    from core.layout import analyze_image, plan_layout, rasterize_mesh  # 避免循环导入
+
     if hull is None:
         return []
 
-    gray = cv2.cvtColor(core.origin, cv2.COLOR_BGR2GRAY)
-
-    # 检测特征点
-    features = cv2.goodFeaturesToTrack(
-        gray,
-        maxCorners=int(core.cfg.mesh_complexity * core.scale),
-        qualityLevel=0.015,
-        minDistance=int(25 * core.scale),
-        mask=mask
-    )
-
-    points = [tuple(p[0]) for p in features] if features is not None else []
-
-    # 添加轮廓点
-    for p in hull:
-        points.append(tuple(p[0]))
-
-    # 创建Delaunay三角剖分
-    rect = (0, 0, core.w, core.h)
-    subdiv = cv2.Subdiv2D(rect)
-    valid_pts = []
-
-    for p in points:
-        if 0 <= p[0] < core.w and 0 <= p[1] < core.h:
-            try:
-                subdiv.insert(p)
-                valid_pts.append(p)
-            except:
-                pass
-
-    # 获取三角形并绘制
-    triangles = subdiv.getTriangleList()
-    overlay = core.canvas.copy()
-
-    for t in triangles:
-        pt1, pt2, pt3 = (int(t[0]), int(t[1])), (int(t[2]), int(t[3])), (int(t[4]), int(t[5]))
-        cx, cy = (pt1[0] + pt2[0] + pt3[0]) // 3, (pt1[1] + pt2[1] + pt3[1]) // 3
-
-        # 检查中心点是否在主体内
-        if cv2.pointPolygonTest(hull, (cx, cy), False) < 0:
-            continue
-
-        if random.random() < core.cfg.line_connect_chance:
-            draw_nerve_line(core, overlay, pt1, pt2, 1)
-            if random.random() > 0.6:
-                draw_nerve_line(core, overlay, pt2, pt3, 1)
-
-        if random.random() > 0.95:
-            size = int(3 * core.scale)
-            cv2.line(overlay, (pt1[0] - size, pt1[1]), (pt1[0] + size, pt1[1]), core.cv_mesh, 1)
-            cv2.line(overlay, (pt1[0], pt1[1] - size), (pt1[0], pt1[1] + size), core.cv_mesh, 1)
-
-    cv2.addWeighted(overlay, 0.65, core.canvas, 0.35, 0, core.canvas)
-    return valid_pts
+    analysis = analyze_image(core.origin, core.cfg, core.scale, hull, mask)
+    plan = plan_layout(analysis, core.cfg, core.seed, rng=core.rng, sections=('mesh',),
+                       compiled=core.compiled)
+    rasterize_mesh(plan, core.canvas)
+    return [tuple(p) for p in analysis.points]
 
 
 def draw_nerve_line(core, img, pt1, pt2, thickness):
@@ -146,24 +269,16 @@ def draw_nerve_line(core, img, pt1, pt2, thickness):
         pt2: 终点
         thickness: 线宽
     """
-    # 确保颜色值是整数元组
-    color = core.cv_mesh
-
-    # 确保颜色值是三个整数的元组
-    if not isinstance(color, tuple) or len(color) != 3:
-        color = (255, 255, 255)  # 默认白色
-
-    # 确保所有值都是整数
-    color = (int(color[0]), int(color[1]), int(color[2]))
+    color = core.cv_mesh  # 编译配置时已转换为BGR整数元组
 
-    if random.random() < core.cfg.nerve_mutation_chance:
+    if core.rng.random() < core.cfg.nerve_mutation_chance:
         mid_x, mid_y = (pt1[0] + pt2[0]) // 2, (pt1[1] + pt2[1]) // 2
         dist = np.sqrt((pt1[0] - pt2[0]) ** 2 + (pt1[1] - pt2[1]) ** 2)
-        offset = int(dist * random.uniform(0.1, 0.35))
-        cx = mid_x + random.randint(-offset, offset)
-        cy = mid_y + random.randint(-offset, offset)
+        offset = int(dist * core.rng.uniform(0.1, 0.35))
+        cx = mid_x + core.rng.randint(-offset, offset)
+        cy = mid_y + core.rng.randint(-offset, offset)
 
-        if random.random() > 0.4:
+        if core.rng.random() > 0.4:
             # 绘制贝塞尔曲线
             pts = []
             for t in np.linspace(0, 1, 10):
@@ -176,12 +291,7 @@ def draw_nerve_line(core, img, pt1, pt2, thickness):
         else:
             cv2.line(img, pt1, (cx, cy), color, thickness, cv2.LINE_AA)
             cv2.line(img, (cx, cy), pt2, color, thickness, cv2.LINE_AA)
-            if random.random() > 0.6:
-                # 确保红色值也是整数
-                red_color = core.cv_red
-                if not isinstance(red_color, tuple) or len(red_color) != 3:
-                    red_color = (0, 0, 255)  # 默认红色
-                red_color = (int(red_color[0]), int(red_color[1]), int(red_color[2]))
-                cv2.circle(img, (cx, cy), max(1, int(1.5 * core.scale)), red_color, -1)
+            if core.rng.random() > 0.6:
+                cv2.circle(img, (cx, cy), max(1, int(1.5 * core.scale)), core.cv_red, -1)
     else:
         cv2.line(img, pt1, pt2, color, thickness, cv2.LINE_AA)
\ No newline at end of file
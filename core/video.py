@@ -0,0 +1,222 @@
+# core/video.py
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""视频逐帧故障渲染（流式）
+
+cv2.VideoCapture 逐帧读取；主体检测与布局规划只在关键帧（场景切换或每 N 帧）执行，
+同一片段内的帧共用布局计划。帧在线程池中并行渲染、按原顺序写出，
+同时在途的帧数有上限，内存占用与视频长度无关。
+"""
+
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Tuple
+
+import cv2
+import numpy as np
+
+from config import CyberConfig
+from core.effects import NOISE_TIME_PERIOD, crt_shift
+from core.layout import analyze_image, plan_layout
+from core.renderer import ConfigurableCyberCore
+from core.sequence import apply_frame_effects, frame_params, open_sequence_writer
+
+# 视频元数据缺失帧率时使用的默认值
+DEFAULT_FPS = 25.0
+
+
+class VideoRenderer:
+    """视频故障渲染器
+
+    Args:
+        video_path: 输入视频路径
+        font_path: 字体文件路径
+        config: 渲染配置
+        seed: 随机种子（所有片段共用，布局决策在片段之间保持一致的风格）
+        redetect_every: 最多每隔多少帧重新检测主体并规划布局，0 表示只在场景切换时检测
+        scene_threshold: 场景切换阈值，相邻帧灰度直方图的 Bhattacharyya 距离 (0~1)
+        effect_cycle: 时间相关特效（CRT 摆动、扫描线滚动、噪声）的循环帧数，None 时取 2 秒
+        workers: 并行渲染帧的线程数，None 时取 CPU 核数（最多 4）
+        executor: 可选的外部线程池，指定时 workers 只决定在途帧数
+        max_frames: 最多处理的帧数，None 表示整个视频
+        debug_mode: 是否输出调试信息
+
+    Raises:
+        ValueError: 无法打开视频
+    """
+
+    def __init__(self, video_path, font_path, config: CyberConfig, seed=42, redetect_every=30,
+                 scene_threshold=0.35, effect_cycle=None, workers=None, executor=None, max_frames=None,
+                 debug_mode=False):
+        self.capture = cv2.VideoCapture(video_path)
+        if not self.capture.isOpened():
+            raise ValueError(f"无法打开视频: {video_path}")
+
+        self.video_path = video_path
+        self.font_path = font_path
+        self.cfg = config
+        self.seed = seed
+        self.redetect_every = redetect_every
+        self.scene_threshold = scene_threshold
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.executor = executor
+        self.max_frames = max_frames
+        self.debug_mode = debug_mode
+
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+        self.width = int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        # 配置无效时在读取任何帧之前报错
+        self.compiled = config.compile(max(self.width, 1) / 1200.0)
+        frame_count = int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        if max_frames is not None:
+            frame_count = min(frame_count, max_frames) if frame_count > 0 else max_frames
+        self.frame_count = frame_count  # 容器给出的帧数，可能不准确或为0
+        self.effect_cycle = effect_cycle or max(1, int(round(self.fps * 2)))
+
+        self._prev_hist = None
+        self.stats = {
+            'frames': 0,
+            'source_fps': self.fps,
+            'keyframes': 0,
+            'scene_cuts': 0,
+            'detect_time': 0.0,
+            'render_time': 0.0,
+            'processing_time': 0.0,
+            'throughput_fps': 0.0,
+            'max_in_flight': 0,
+            'encoder': None,
+        }
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """帧尺寸 (宽, 高)"""
+        return self.width, self.height
+
+    def log_debug(self, message):
+        """调试日志"""
+        if self.debug_mode:
+            print(f"[DEBUG] {message}")
+
+    def _is_scene_cut(self, frame) -> bool:
+        """与上一帧比较缩略灰度直方图，判断是否发生场景切换"""
+        small = cv2.resize(frame, (64, 36), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        hist = cv2.calcHist([gray], [0], None, [32], [0, 256])
+        cv2.normalize(hist, hist)
+        prev, self._prev_hist = self._prev_hist, hist
+        if prev is None:
+            return False
+        return cv2.compareHist(prev, hist, cv2.HISTCMP_BHATTACHARYYA) > self.scene_threshold
+
+    def _plan_segment(self, frame):
+        """关键帧：检测主体、特征点并规划布局，供后续帧共用"""
+        start = time.perf_counter()
+        h, w = frame.shape[:2]
+        plan = plan_layout(analyze_image(frame, self.cfg, w / 1200.0), self.cfg, self.seed,
+                           compiled=self.compiled if w == self.width else None)
+        self.stats['detect_time'] += time.perf_counter() - start
+        self.stats['keyframes'] += 1
+        return plan
+
+    def _render_frame(self, index, frame, plan) -> Tuple[np.ndarray, float]:
+        """按共享的布局计划渲染一帧（线程安全）"""
+        start = time.perf_counter()
+        core = ConfigurableCyberCore(frame, self.font_path, self.cfg, self.seed, self.debug_mode,
+                                     compiled=self.compiled, plan=plan)
+        base = core.render_layers()
+        params = frame_params(core, index, self.effect_cycle, crt_shift(core))
+        result = apply_frame_effects(core, base, params, NOISE_TIME_PERIOD)
+        return result, time.perf_counter() - start
+
+    def iter_frames(self) -> Iterator[Tuple[int, np.ndarray]]:
+        """按帧序号依次产出 (序号, BGR帧)；视频只能遍历一次
+
+        读取与关键帧检测在当前线程中顺序进行，帧渲染提交到线程池，最多 2 × 线程数 帧在途。
+        """
+        executor = self.executor or ThreadPoolExecutor(self.workers, thread_name_prefix="video-frame")
+        window = 2 * self.workers
+        pending = deque()
+        plan = None
+        since_detect = 0
+        index = 0
+
+        def collect():
+            i, fut = pending.popleft()
+            frame, elapsed = fut.result()
+            self.stats['render_time'] += elapsed
+            self.stats['frames'] += 1
+            return i, frame
+
+        try:
+            while self.max_frames is None or index < self.max_frames:
+                ok, frame = self.capture.read()
+                if not ok:
+                    break
+
+                cut = self._is_scene_cut(frame)
+                if plan is None or cut or (self.redetect_every and since_detect >= self.redetect_every):
+                    plan = self._plan_segment(frame)
+                    since_detect = 0
+                    if cut:
+                        self.stats['scene_cuts'] += 1
+                        self.log_debug(f"第 {index} 帧场景切换，重新检测主体")
+                since_detect += 1
+
+                pending.append((index, executor.submit(self._render_frame, index, frame, plan)))
+                self.stats['max_in_flight'] = max(self.stats['max_in_flight'], len(pending))
+                index += 1
+                if len(pending) >= window:
+                    yield collect()
+
+            while pending:
+                yield collect()
+        finally:
+            for _, fut in pending:
+                fut.cancel()
+            if executor is not self.executor:
+                executor.shutdown(wait=True)
+
+    def run(self, save_path, progress=None) -> dict:
+        """渲染整个视频并按顺序流式写出
+
+        Args:
+            save_path: 输出路径，扩展名决定容器格式（.mp4/.avi/.webm/.gif/.webp），无扩展名时写出图片序列目录
+            progress: 可选的进度回调 progress(fraction, desc)
+
+        Returns:
+            统计信息字典（含吞吐量 throughput_fps）
+        """
+        start = time.perf_counter()
+        try:
+            with open_sequence_writer(save_path, self.fps, self.size) as writer:
+                self.stats['encoder'] = writer.name
+                for index, frame in self.iter_frames():
+                    writer.write(frame)
+                    if progress is not None:
+                        elapsed = time.perf_counter() - start
+                        fps = (index + 1) / elapsed if elapsed > 0 else 0.0
+                        fraction = min((index + 1) / self.frame_count, 0.99) if self.frame_count > 0 else 0.0
+                        progress(fraction, f"帧 {index + 1}/{self.frame_count or '?'} · {fps:.1f} fps")
+        finally:
+            self.release()
+
+        elapsed = time.perf_counter() - start
+        self.stats['processing_time'] = elapsed
+        self.stats['throughput_fps'] = self.stats['frames'] / elapsed if elapsed > 0 else 0.0
+        if progress is not None:
+            progress(1.0, "完成")
+
+        self.log_debug(f"视频统计信息: {self.stats}")
+        return self.stats
+
+    def release(self):
+        """释放视频读取器"""
+        self.capture.release()
+
+    def get_stats(self):
+        """获取处理统计信息"""
+        return self.stats
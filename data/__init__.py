@@ -1,24 +1,40 @@
 # data/__init__.py
 # !/usr/bin/env python
 # -*- coding: utf-8 -*-
-from .error_messages import (
-    ERROR_MESSAGES,
-    SHORT_ERROR_CODES,
-    get_random_error,
-    get_random_short_code,
-    get_random_bios_error,
-    format_error_with_hex,
-    format_error_with_code,
-    format_stack_trace
-)
-
-__all__ = [
-    'ERROR_MESSAGES',
-    'SHORT_ERROR_CODES',
-    'get_random_error',
-    'get_random_short_code',
-    'get_random_bios_error',
-    'format_error_with_hex',
-    'format_error_with_code',
-    'format_stack_trace'
-]
\ No newline at end of file
+
+"""错误消息数据
+
+导出名在首次访问时才导入 (PEP 562)，大体积的消息目录由 error_messages 再按需加载。
+"""
+
+import importlib
+
+# 导出名 -> 所在子模块
+_EXPORTS = {
+    'ERROR_MESSAGES': 'data.error_messages',
+    'SHORT_ERROR_CODES': 'data.error_messages',
+    'SIMPLE_ERRORS': 'data.error_messages',
+    'ErrorMessageSampler': 'data.error_messages',
+    'get_error_sampler': 'data.error_messages',
+    'get_random_error': 'data.error_messages',
+    'get_random_short_code': 'data.error_messages',
+    'get_random_bios_error': 'data.error_messages',
+    'format_error_with_hex': 'data.error_messages',
+    'format_error_with_code': 'data.error_messages',
+    'format_stack_trace': 'data.error_messages',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value  # 缓存，之后的访问不再经过 __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -105,7 +105,8 @@ def main():
     print("=" * 50)
 
     # 导入并运行主应用
-    from app import demo
+    from app import demo, start_render_service
+    start_render_service()
     demo.launch(
         server_name="0.0.0.0",
         server_port=7860,
@@ -0,0 +1,29 @@
+# service/__init__.py
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from .render_service import (
+    RenderService,
+    RenderJob,
+    QueueFullError,
+    get_render_service,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    JOB_DONE,
+    JOB_FAILED,
+    JOB_CANCELLED
+)
+from .worker import WorkerWarmup
+
+__all__ = [
+    'RenderService',
+    'RenderJob',
+    'QueueFullError',
+    'get_render_service',
+    'JOB_QUEUED',
+    'JOB_RUNNING',
+    'JOB_DONE',
+    'JOB_FAILED',
+    'JOB_CANCELLED',
+    'WorkerWarmup'
+]
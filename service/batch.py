@@ -0,0 +1,169 @@
+# service/batch.py
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""批量处理：输入文件发现与断点续跑清单"""
+
+import json
+import os
+import threading
+import time
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+ITEM_DONE = 'done'
+ITEM_FAILED = 'failed'
+
+# 批量处理支持的输入格式（小写扩展名）
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.tif', '.tiff', '.bmp')
+
+
+def parse_patterns(text) -> tuple:
+    """把逗号或换行分隔的 glob 模式文本解析为元组，空文本返回空元组"""
+    if not text:
+        return ()
+    return tuple(p.strip() for p in text.replace('\n', ',').split(',') if p.strip())
+
+
+def _matches(rel_path, name, patterns):
+    return any(fnmatch(rel_path, p) or fnmatch(name, p) for p in patterns)
+
+
+def iter_image_files(root, include=(), exclude=(), recursive=True, extensions=IMAGE_EXTENSIONS,
+                     skip_dirs: Iterable = ()) -> Iterator[str]:
+    """用 os.scandir 逐个产出目录下的图片文件路径，边遍历边产出，不预先构建完整列表
+
+    模式按相对 root 的路径（'/' 分隔）或文件名匹配，如 '*.png'、'2024/*'、'*_mask.*'。
+
+    Args:
+        root: 输入目录
+        include: 只保留匹配任一模式的文件，空表示全部
+        exclude: 跳过匹配任一模式的文件或目录（目录整棵跳过）
+        recursive: 是否进入子目录
+        extensions: 接受的扩展名（小写）
+        skip_dirs: 需要跳过的目录（如输出目录），按真实路径比较
+
+    Yields:
+        文件路径（root 与相对路径拼接），同一目录内按 scandir 返回顺序
+    """
+    skip = {os.path.realpath(d) for d in skip_dirs}
+    stack = [(root, '')]
+    while stack:
+        directory, rel_dir = stack.pop()
+        subdirs = []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    rel = f"{rel_dir}{entry.name}"
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        continue
+                    if is_dir:
+                        if recursive and not _matches(rel, entry.name, exclude) \
+                                and os.path.realpath(entry.path) not in skip:
+                            subdirs.append((entry.path, f"{rel}/"))
+                        continue
+                    if not entry.name.lower().endswith(extensions):
+                        continue
+                    if include and not _matches(rel, entry.name, include):
+                        continue
+                    if _matches(rel, entry.name, exclude):
+                        continue
+                    yield entry.path
+        except OSError:
+            continue  # 无权限或遍历过程中被删除的目录
+        # 逆序入栈，子目录按 scandir 顺序依次处理（深度优先）
+        stack.extend(reversed(subdirs))
+
+
+class BatchManifest:
+    """批量任务清单 (JSONL)
+
+    每处理完一个条目追加一行记录：输入路径、输入哈希、配置哈希、字体哈希、种子、输出路径、状态与耗时。
+    重新运行时，输入、配置、字体、种子都未变且输出文件仍存在的条目可以跳过，
+    未指定种子的条目沿用上次记录的种子。崩溃时最多丢失最后一行（加载时忽略不完整的行）。
+    """
+
+    FILENAME = 'manifest.jsonl'
+
+    def __init__(self, output_dir):
+        self.path = Path(output_dir) / self.FILENAME
+        self._records = {}  # 输入绝对路径 -> 最新记录
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def _key(input_path) -> str:
+        return os.path.abspath(input_path)
+
+    def _load(self):
+        try:
+            f = open(self.path, 'r', encoding='utf-8')
+        except FileNotFoundError:
+            return
+        with f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    self._records[self._key(record['input'])] = record
+                except (ValueError, KeyError, TypeError):
+                    continue  # 崩溃时写了一半的行
+
+    def __len__(self):
+        return len(self._records)
+
+    def lookup(self, input_path) -> Optional[dict]:
+        """输入文件的最新记录，没有则返回None"""
+        return self._records.get(self._key(input_path))
+
+    def recorded_seed(self, input_path, config_hash) -> Optional[int]:
+        """同一输入、同一配置上次使用的种子"""
+        record = self.lookup(input_path)
+        if record is None or record.get('config_hash') != config_hash:
+            return None
+        return record.get('seed')
+
+    def is_done(self, input_path, input_hash, config_hash, seed, font_hash=None) -> bool:
+        """该条目是否已以相同的输入、配置、字体与种子成功完成，且输出文件仍存在"""
+        record = self.lookup(input_path)
+        return (record is not None
+                and record.get('status') == ITEM_DONE
+                and record.get('input_hash') == input_hash
+                and record.get('config_hash') == config_hash
+                and record.get('font_hash') == font_hash
+                and record.get('seed') == seed
+                and os.path.exists(record.get('output') or ''))
+
+    def record(self, input_path, input_hash, config_hash, seed, output_path, status,
+               render_time=None, elapsed=None, error=None, font_hash=None):
+        """追加一条记录（单次写入并落盘）
+
+        Args:
+            font_hash: 字体哈希（core.cache.hash_font）
+            render_time: 渲染耗时（秒）
+            elapsed: 从提交到完成的耗时（秒，含排队）
+        """
+        record = {
+            'input': input_path,
+            'input_hash': input_hash,
+            'config_hash': config_hash,
+            'font_hash': font_hash,
+            'seed': seed,
+            'output': output_path,
+            'status': status,
+            'render_time': render_time,
+            'elapsed': elapsed,
+            'error': error,
+            'finished_at': time.time(),
+        }
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self._records[self._key(input_path)] = record
+        return record
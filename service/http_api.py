@@ -0,0 +1,277 @@
+# service/http_api.py
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""HTTP/JSON 渲染接口
+
+    python -m service.http_api --port 7861
+
+接口:
+    POST   /render                 同步渲染，直接返回结果图片
+    POST   /batch                  批量提交，返回任务ID列表
+    GET    /batch/{batch_id}       批量任务状态
+    GET    /batch/{batch_id}/events  按完成顺序推送任务状态 (NDJSON)
+    GET    /jobs/{job_id}          任务状态
+    DELETE /jobs/{job_id}          取消任务
+    GET    /jobs/{job_id}/result   获取结果图片
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from typing import List, Optional
+
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
+
+from config import CyberConfig
+from core.cache import get_render_cache
+from service.render_service import RenderService, QueueFullError, get_render_service, JOB_DONE
+from service.worker import WorkerWarmup
+
+MEDIA_TYPES = {
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.webp': 'image/webp',
+}
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _parse_config(config_json: Optional[str]) -> CyberConfig:
+    """解析 CyberConfig.to_dict() 生成的JSON"""
+    if not config_json:
+        return CyberConfig()
+    try:
+        data = json.loads(config_json)
+    except json.JSONDecodeError as e:
+        raise HTTPException(400, f"config 不是合法的JSON: {e}")
+    try:
+        config = CyberConfig.from_dict(data)
+        config.compile()
+    except (TypeError, ValueError) as e:
+        raise HTTPException(400, f"config 字段无效: {e}")
+    return config
+
+
+def _parse_format(output_format: str) -> str:
+    ext = '.' + output_format.lower().lstrip('.')
+    if ext not in MEDIA_TYPES:
+        raise HTTPException(400, f"不支持的输出格式: {output_format}")
+    return ext
+
+
+def _parse_preview_size(preview_size: Optional[str]) -> Optional[int]:
+    """预览目标长边：未指定为 None，否则必须是正整数"""
+    if preview_size is None or not preview_size.strip():
+        return None
+    try:
+        value = int(preview_size)
+    except ValueError:
+        value = 0
+    if value <= 0:
+        raise HTTPException(400, f"preview_size 应为正整数: {preview_size}")
+    return value
+
+
+def _iter_chunks(data: bytes):
+    for i in range(0, len(data), CHUNK_SIZE):
+        yield data[i:i + CHUNK_SIZE]
+
+
+def create_app(service: RenderService = None, font_path: str = None) -> FastAPI:
+    """创建渲染接口应用
+
+    Args:
+        service: 渲染服务，默认使用全局服务（工作进程常驻，跨请求复用）
+        font_path: 渲染使用的字体路径
+    """
+    app = FastAPI(title="AlgorithmGlitchCore Render API")
+    batches = {}  # batch_id -> 任务列表，所有任务记录都过期（服务的 job_ttl）后一并清理
+
+    def get_service() -> RenderService:
+        return service or get_render_service()
+
+    async def submit(data, config, seed, ext, user, preview_size=None):
+        """提交任务（哈希、校验配置与入队都是阻塞调用，放到线程池中执行，不阻塞事件循环）"""
+        try:
+            return await run_in_threadpool(get_service().submit_bytes, data, font_path, config, seed, ext=ext,
+                                           user_id=user, preview_size=preview_size)
+        except QueueFullError as e:
+            raise HTTPException(429, str(e))
+
+    def failure(job) -> HTTPException:
+        """失败任务对应的HTTP错误：输入无效（ValueError，如无法解码的图片）为 400，其余为 500"""
+        if job.error_type == 'ValueError':
+            return HTTPException(400, job.error)
+        return HTTPException(500, job.error or job.status)
+
+    def purge_batches():
+        """清理所有任务都已结束并超过 job_ttl（或已被服务清理）的批量记录"""
+        svc = get_service()
+        now = time.time()
+
+        def expired(jobs):
+            for j in jobs:
+                job = svc.get_job(j['job_id'])
+                if job is not None and not (job.done and job.finished_at
+                                            and now - job.finished_at > svc.job_ttl):
+                    return False
+            return True
+
+        for batch_id in [b for b, jobs in batches.items() if expired(jobs)]:
+            del batches[batch_id]
+
+    def result_response(job):
+        headers = {
+            'X-Job-Id': job.job_id,
+            'X-Seed': str(job.seed),
+            'X-Render-Time': f"{job.stats['processing_time']:.3f}",
+        }
+        if job.stats.get('cache_hit'):
+            headers['X-Cache'] = 'HIT'
+        if job.result is not None:
+            return StreamingResponse(_iter_chunks(job.result),
+                                     media_type=MEDIA_TYPES.get(job.output_ext, 'application/octet-stream'),
+                                     headers=headers)
+        return FileResponse(job.save_path, headers=headers)
+
+    @app.post("/render")
+    async def render(
+            image: UploadFile = File(...),
+            config: Optional[str] = Form(None),
+            seed: int = Form(42),
+            output_format: str = Form('png'),
+            user: Optional[str] = Form(None),
+            preview_size: Optional[str] = Form(None)
+    ):
+        """同步渲染单张图片，preview_size 为代理渲染的目标长边（缩小解码，可选）"""
+        cfg = _parse_config(config)
+        ext = _parse_format(output_format)
+        job_id = await submit(await image.read(), cfg, seed, ext, user, _parse_preview_size(preview_size))
+
+        job = await get_service().wait_async(job_id)
+        if job.status != JOB_DONE:
+            raise failure(job)
+        return result_response(job)
+
+    @app.post("/batch")
+    async def batch(
+            images: List[UploadFile] = File(...),
+            config: Optional[str] = Form(None),
+            seeds: Optional[str] = Form(None),
+            output_format: str = Form('png'),
+            user: Optional[str] = Form(None)
+    ):
+        """批量提交，seeds 为逗号分隔的种子列表（可选，不足部分随机）"""
+        cfg = _parse_config(config)
+        ext = _parse_format(output_format)
+        try:
+            seed_list = [int(s) for s in seeds.split(',') if s.strip()] if seeds else []
+        except ValueError:
+            raise HTTPException(400, f"seeds 格式错误: {seeds}")
+
+        jobs = []
+        try:
+            for i, image in enumerate(images):
+                seed = seed_list[i] if i < len(seed_list) else random.randint(1, 1000000)
+                job_id = await submit(await image.read(), cfg, seed, ext, user)
+                jobs.append({'job_id': job_id, 'filename': image.filename, 'seed': seed})
+        except HTTPException:
+            # 队列中途满了：取消已提交的任务，不留下没有批量ID的孤立任务
+            svc = get_service()
+            for j in jobs:
+                svc.cancel(j['job_id'])
+            raise
+
+        purge_batches()
+        batch_id = uuid.uuid4().hex
+        batches[batch_id] = jobs
+        return {'batch_id': batch_id, 'jobs': jobs}
+
+    def get_batch(batch_id):
+        purge_batches()
+        if batch_id not in batches:
+            raise HTTPException(404, f"批量任务不存在: {batch_id}")
+        return batches[batch_id]
+
+    @app.get("/batch/{batch_id}")
+    async def batch_status(batch_id: str):
+        jobs = get_batch(batch_id)
+        return {'batch_id': batch_id,
+                'jobs': [dict(get_service().status(j['job_id']) or {}, filename=j['filename'])
+                         for j in jobs]}
+
+    @app.get("/batch/{batch_id}/events")
+    async def batch_events(batch_id: str):
+        """按完成顺序逐行推送任务状态"""
+        jobs = get_batch(batch_id)
+        svc = get_service()
+
+        async def stream():
+            waiters = [svc.wait_async(j['job_id']) for j in jobs if svc.get_job(j['job_id'])]
+            for fut in asyncio.as_completed(waiters):
+                job = await fut
+                yield json.dumps(job.to_dict(), ensure_ascii=False) + "\n"
+
+        return StreamingResponse(stream(), media_type='application/x-ndjson')
+
+    def get_job(job_id):
+        job = get_service().get_job(job_id)
+        if job is None:
+            raise HTTPException(404, f"任务不存在: {job_id}")
+        return job
+
+    @app.get("/jobs/{job_id}")
+    async def job_status(job_id: str):
+        get_job(job_id)
+        return get_service().status(job_id)
+
+    @app.delete("/jobs/{job_id}")
+    async def cancel_job(job_id: str):
+        get_job(job_id)
+        return {'job_id': job_id, 'cancelled': get_service().cancel(job_id)}
+
+    @app.get("/jobs/{job_id}/result")
+    async def job_result(job_id: str):
+        job = get_job(job_id)
+        if not job.done:
+            raise HTTPException(409, f"任务尚未完成: {job.status}")
+        if job.status != JOB_DONE:
+            raise HTTPException(410, job.error or job.status)
+        return result_response(job)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AlgorithmGlitchCore HTTP 渲染接口")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7861)
+    parser.add_argument("--workers", type=int, default=None, help="渲染工作进程数")
+    parser.add_argument("--queue", type=int, default=64, help="未完成任务上限")
+    parser.add_argument("--font", default=None, help="字体文件路径")
+    parser.add_argument("--no-cache", action="store_true", help="禁用渲染结果缓存")
+    parser.add_argument("--max-tasks-per-child", type=int, default=None,
+                        help="工作进程处理多少个任务后被替换，默认不回收")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    cache = None if args.no_cache else get_render_cache()
+    service = RenderService(max_workers=args.workers, max_queue=args.queue, cache=cache,
+                            warmup=WorkerWarmup(font_path=args.font),
+                            max_tasks_per_child=args.max_tasks_per_child).start()
+    try:
+        uvicorn.run(create_app(service, args.font), host=args.host, port=args.port)
+    finally:
+        service.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+# service/pipeline.py
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""三段式批量流水线：预读解码 → 渲染 → 编码写出
+
+每段有独立的线程池，段与段之间是有界队列：下游处理不过来时上游阻塞（背压），
+同时在途的条目数因此有上限，内存不会随输入数量增长。
+"""
+
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+# 段内线程结束的标记
+_DONE = object()
+
+
+@dataclass
+class PipelineItem:
+    """流经流水线的条目，各段函数读写 data 并可设置 error"""
+
+    index: int
+    source: Any
+    data: dict = field(default_factory=dict)
+    error: Optional[str] = None
+    timings: dict = field(default_factory=dict)
+
+
+@dataclass
+class StageStats:
+    """单段的统计：线程数、处理条目数与累计忙碌时间"""
+
+    name: str
+    workers: int
+    items: int = 0
+    errors: int = 0
+    busy: float = 0.0
+
+    def utilization(self, wall: float) -> float:
+        """忙碌时间占 (线程数 × 墙钟时间) 的比例"""
+        return self.busy / (self.workers * wall) if wall > 0 else 0.0
+
+
+class _Stage:
+    def __init__(self, name, fn, workers, out_queue):
+        self.fn = fn
+        self.stats = StageStats(name, workers)
+        self.in_queue = None
+        self.out_queue = out_queue
+        self._remaining = workers
+        self._lock = threading.Lock()
+
+
+class BatchPipeline:
+    """三段式流水线
+
+    每个段函数形如 fn(item)，原地修改 item.data；抛出异常时条目标记为失败，后续段跳过该条目，
+    但失败的条目仍会从 run() 产出。
+
+    Args:
+        decode: 预读/解码段函数（I/O 密集）
+        render: 渲染段函数
+        write: 编码/写出段函数（I/O 密集）
+        decode_workers, render_workers, write_workers: 各段线程数
+        queue_size: 段间队列容量，默认为渲染线程数的两倍
+    """
+
+    def __init__(self, decode: Callable, render: Callable, write: Callable,
+                 decode_workers=2, render_workers=2, write_workers=2, queue_size=None):
+        queue_size = queue_size or render_workers * 2
+        self._queues = [queue.Queue(queue_size) for _ in range(4)]
+        self._stages = [
+            _Stage('decode', decode, decode_workers, self._queues[1]),
+            _Stage('render', render, render_workers, self._queues[2]),
+            _Stage('write', write, write_workers, self._queues[3]),
+        ]
+        for stage, in_queue in zip(self._stages, self._queues):
+            stage.in_queue = in_queue
+
+        self._stop = threading.Event()
+        self._threads = []
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def stats(self):
+        return [stage.stats for stage in self._stages]
+
+    def wall_time(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    def utilization(self) -> dict:
+        """各段利用率 {段名: 0~1}，用于确定各线程池大小"""
+        wall = self.wall_time()
+        return {s.name: s.utilization(wall) for s in self.stats}
+
+    def describe_utilization(self) -> str:
+        wall = self.wall_time()
+        return " | ".join(f"{s.name} {s.utilization(wall):.0%} ({s.workers} 线程)" for s in self.stats)
+
+    def _put(self, q, item) -> bool:
+        """带停止检查的阻塞 put，流水线被关闭时返回 False"""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _feed(self, items):
+        try:
+            for index, source in enumerate(items):
+                if not self._put(self._queues[0], PipelineItem(index, source)):
+                    return
+        finally:
+            for _ in range(self._stages[0].stats.workers):
+                self._put(self._queues[0], _DONE)
+
+    def _work(self, stage):
+        stats = stage.stats
+        while True:
+            try:
+                item = stage.in_queue.get(timeout=0.1)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return
+                continue
+            if item is _DONE:
+                break
+
+            if item.error is None:
+                start = time.perf_counter()
+                try:
+                    stage.fn(item)
+                except Exception as e:
+                    item.error = str(e)
+                    stats.errors += 1
+                elapsed = time.perf_counter() - start
+                item.timings[stats.name] = elapsed
+                with stage._lock:
+                    stats.busy += elapsed
+                    stats.items += 1
+
+            if not self._put(stage.out_queue, item):
+                return
+
+        # 本段最后一个线程结束时通知下游
+        with stage._lock:
+            stage._remaining -= 1
+            last = stage._remaining == 0
+        if last:
+            downstream = self._stages.index(stage) + 1
+            count = self._stages[downstream].stats.workers if downstream < len(self._stages) else 1
+            for _ in range(count):
+                self._put(stage.out_queue, _DONE)
+
+    def run(self, items: Iterable) -> Iterator[PipelineItem]:
+        """运行流水线，按完成顺序产出条目；items 可以是惰性迭代器"""
+        self.started_at = time.perf_counter()
+        self._threads = [threading.Thread(target=self._feed, args=(items,), name="pipeline-feed", daemon=True)]
+        for stage in self._stages:
+            for i in range(stage.stats.workers):
+                self._threads.append(threading.Thread(
+                    target=self._work, args=(stage,), name=f"pipeline-{stage.stats.name}-{i}", daemon=True))
+        for t in self._threads:
+            t.start()
+
+        try:
+            while True:
+                item = self._queues[3].get()
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            self.finished_at = time.perf_counter()
+            self.close()
+
+    def close(self):
+        """停止所有段（消费者提前退出时调用），已在处理中的条目会完成当前段"""
+        self._stop.set()
+        for t in self._threads:
+            t.join()
@@ -0,0 +1,550 @@
+# service/render_service.py
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import atexit
+import concurrent.futures
+import multiprocessing
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Optional
+
+from core.cache import make_cache_key, get_render_cache
+from service.worker import init_worker, render_job, render_bytes_job, render_sequence_job, render_video_job, worker_ready
+
+# 任务状态
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+
+FINAL_STATES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+
+class QueueFullError(RuntimeError):
+    """渲染任务队列已满"""
+
+
+@dataclass
+class RenderJob:
+    """单个渲染任务的状态记录"""
+
+    job_id: str
+    user_id: str
+    img_path: Optional[str]
+    save_path: Optional[str]
+    seed: int
+    status: str = JOB_QUEUED
+    progress: float = 0.0
+    stage: str = ""
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    stats: Optional[dict] = None
+    result: Optional[bytes] = field(default=None, repr=False)
+    error: Optional[str] = None
+    error_type: Optional[str] = None  # 失败时的异常类型名，如 'ValueError'（输入无效）
+    cancel_requested: bool = False
+    cache_key: Optional[str] = None
+    output_ext: str = '.png'
+    future: concurrent.futures.Future = field(default_factory=concurrent.futures.Future, repr=False)
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINAL_STATES
+
+    def to_dict(self) -> dict:
+        """转换为可序列化的状态字典"""
+        return {
+            'job_id': self.job_id,
+            'user_id': self.user_id,
+            'status': self.status,
+            'progress': self.progress,
+            'stage': self.stage,
+            'seed': self.seed,
+            'save_path': self.save_path,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'stats': self.stats,
+            'error': self.error,
+        }
+
+
+class RenderService:
+    """异步渲染服务
+
+    在后台线程中运行 asyncio 事件循环，任务通过有界队列提交，
+    由进程池中的工作进程（或线程池中的工作线程）渲染。支持任务ID、
+    进度查询、取消以及每用户并发数限制，无需任何外部消息中间件。
+    """
+
+    def __init__(self, max_workers=None, max_queue=64, per_user_limit=2, job_ttl=3600.0, cache=None,
+                 mode='process', stage_threads=0, warmup=None, max_tasks_per_child=None):
+        """
+        Args:
+            max_workers: 工作进程/线程数，默认 CPU 核数 - 1
+            max_queue: 未完成任务（排队 + 运行中）的上限
+            per_user_limit: 每个用户同时运行的任务数上限
+            job_ttl: 已完成任务记录的保留时间（秒）
+            cache: 可选的 RenderCache，命中时任务直接完成，不进入队列
+            mode: 'process' 进程池，或 'thread' 线程池（共享字体缓存与噪声缓存）
+            stage_threads: 每个工作进程内并行计算独立阶段的线程数
+            warmup: 可选的 WorkerWarmup；设置后启动服务时即创建全部工作者并完成预热
+            max_tasks_per_child: 工作进程处理多少个任务后被替换（限制内存增长），None 表示不回收；仅进程模式
+        """
+        if mode not in ('process', 'thread'):
+            raise ValueError(f"未知的渲染模式: {mode}")
+        if max_tasks_per_child is not None and max_tasks_per_child < 1:
+            raise ValueError(f"max_tasks_per_child 必须 >= 1: {max_tasks_per_child}")
+        self.mode = mode
+        self.stage_threads = stage_threads
+        self.warmup = warmup
+        self.max_tasks_per_child = max_tasks_per_child
+        self.worker_info = []
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.max_queue = max_queue
+        self.per_user_limit = per_user_limit
+        self.job_ttl = job_ttl
+        self.cache = cache
+
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._executor = None
+        self._progress_queue = None
+        self._progress_thread = None
+        self._worker_sem = None
+        self._user_sems = {}  # 用户ID -> 并发信号量，只保留有未结束任务的用户
+        self._user_jobs = {}  # 用户ID -> 未结束的任务数
+
+    # ------------------------------------------------------------------
+    # 生命周期
+    # ------------------------------------------------------------------
+    def start(self):
+        """启动事件循环线程与工作进程池"""
+        with self._lock:
+            if self._loop is not None:
+                return self
+
+            # 预热时所有工作者在屏障处会合，确保每个工作者都被创建并完成初始化
+            if self.mode == 'thread':
+                self._progress_queue = queue.Queue()
+                barrier = threading.Barrier(self.max_workers) if self.warmup is not None else None
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="render-worker",
+                    initializer=init_worker,
+                    initargs=(self._progress_queue, self.stage_threads, self.warmup, barrier)
+                )
+            else:
+                ctx = self._mp_context()
+                self._progress_queue = ctx.Queue()
+                barrier = ctx.Barrier(self.max_workers) if self.warmup is not None else None
+                self._executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=ctx,
+                    initializer=init_worker,
+                    initargs=(self._progress_queue, self.stage_threads, self.warmup, barrier),
+                    max_tasks_per_child=self.max_tasks_per_child
+                )
+
+            if self.warmup is not None:
+                self._prestart_workers()
+
+            self._loop = asyncio.new_event_loop()
+            started = threading.Event()
+            self._thread = threading.Thread(
+                target=self._run_loop, args=(started,), name="render-service", daemon=True
+            )
+            self._thread.start()
+            started.wait()
+
+            self._progress_thread = threading.Thread(
+                target=self._drain_progress, name="render-progress", daemon=True
+            )
+            self._progress_thread.start()
+        return self
+
+    def _mp_context(self):
+        """工作进程的启动方式
+
+        fork 与工作进程回收不兼容。需要回收时优先使用 forkserver：服务进程预先导入渲染模块，
+        替换的工作进程从中 fork，无需重新支付导入开销。
+        """
+        if self.max_tasks_per_child is None:
+            return multiprocessing.get_context()
+        if 'forkserver' not in multiprocessing.get_all_start_methods():
+            return multiprocessing.get_context('spawn')
+        ctx = multiprocessing.get_context('forkserver')
+        ctx.set_forkserver_preload(['__main__', 'service.worker'])
+        return ctx
+
+    def _prestart_workers(self):
+        """同时提交 max_workers 个就绪任务，让执行器创建全部工作者并等待其完成预热
+
+        进程回收时就绪任务也计入每个工作进程的任务数。
+        """
+        futures = [self._executor.submit(worker_ready) for _ in range(self.max_workers)]
+        self.worker_info = [f.result() for f in futures]
+
+    def stop(self, wait=True):
+        """停止服务：取消所有未结束的任务，等待它们标记为已取消后再停止事件循环
+
+        阻塞在 wait() / iter_progress() 中的线程都会返回。
+        """
+        with self._lock:
+            if self._loop is None:
+                return
+            loop, self._loop = self._loop, None
+
+        asyncio.run_coroutine_threadsafe(self._cancel_all(), loop).result()
+        # 还没有调度到事件循环中的任务
+        for job in list(self._jobs.values()):
+            if not job.done:
+                self._finish(job, JOB_CANCELLED)
+
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        self._progress_queue.put(None)
+        self._progress_thread.join()
+        loop.close()
+
+    def _run_loop(self, started):
+        asyncio.set_event_loop(self._loop)
+        self._worker_sem = asyncio.Semaphore(self.max_workers)
+        self._loop.call_soon(started.set)
+        self._loop.run_forever()
+
+    def _drain_progress(self):
+        """读取工作进程回报的进度"""
+        while True:
+            item = self._progress_queue.get()
+            if item is None:
+                break
+            job_id, fraction, desc = item
+            job = self._jobs.get(job_id)
+            if job is not None and job.status == JOB_RUNNING:
+                job.progress = fraction
+                job.stage = desc
+
+    # ------------------------------------------------------------------
+    # 任务提交与查询
+    # ------------------------------------------------------------------
+    def submit(self, img_path, font_path, config, seed, save_path, debug=False, user_id=None,
+               preview_size=None, full_plan=False) -> str:
+        """提交渲染任务
+
+        Args:
+            preview_size: 预览/代理渲染的目标长边（像素），输入按满足该长边的最小尺寸缩小解码
+            full_plan: 与 preview_size 一起使用：按全尺寸规划布局、按预览尺寸光栅化，布局与完整渲染一致
+
+        Returns:
+            任务ID
+
+        Raises:
+            QueueFullError: 未完成任务数已达上限
+            ValueError: 配置无效
+        """
+        ext = os.path.splitext(save_path)[1].lower() or '.png'
+        cache_key = None
+        if self.cache is not None:
+            try:
+                with open(img_path, 'rb') as f:
+                    cache_key = make_cache_key(f.read(), config, seed, font_path, ext, preview_size, full_plan)
+            except OSError:
+                pass  # 读取失败交给工作进程报告错误
+
+        job = self._new_job(config, user_id, seed, img_path=img_path, save_path=save_path,
+                            cache_key=cache_key, output_ext=ext)
+        if self._serve_from_cache(job):
+            return job.job_id
+
+        args = (img_path, font_path, config, seed, save_path, debug, preview_size, full_plan)
+        asyncio.run_coroutine_threadsafe(self._schedule(job, render_job, args), self._loop).result()
+        return job.job_id
+
+    def submit_bytes(self, image_bytes, font_path, config, seed, ext='.png', debug=False, user_id=None,
+                     preview_size=None) -> str:
+        """提交内存中的图片数据，结果以编码后的 bytes 保存在 job.result
+
+        Args:
+            preview_size: 预览/代理渲染的目标长边（像素），None 表示全尺寸
+
+        Returns:
+            任务ID
+
+        Raises:
+            QueueFullError: 未完成任务数已达上限
+            ValueError: 配置无效
+        """
+        cache_key = None
+        if self.cache is not None:
+            cache_key = make_cache_key(image_bytes, config, seed, font_path, ext, preview_size)
+        job = self._new_job(config, user_id, seed, cache_key=cache_key, output_ext=ext)
+        if self._serve_from_cache(job):
+            return job.job_id
+
+        args = (image_bytes, font_path, config, seed, ext, debug, preview_size)
+        asyncio.run_coroutine_threadsafe(self._schedule(job, render_bytes_job, args), self._loop).result()
+        return job.job_id
+
+    def submit_sequence(self, img_path, font_path, config, seed, save_path, frames=24, fps=12, debug=False,
+                        user_id=None, preview_size=None) -> str:
+        """提交循环动画任务（布局只计算一次，逐帧只重算时间相关特效），结果写入 save_path
+
+        Args:
+            save_path: 输出路径，扩展名决定格式（.gif/.webp/.mp4/.webm），无扩展名时写出图片序列目录
+            frames: 每个循环的帧数
+            fps: 帧率
+
+        Returns:
+            任务ID
+
+        Raises:
+            QueueFullError: 未完成任务数已达上限
+            ValueError: 配置无效
+        """
+        ext = os.path.splitext(save_path)[1].lower()
+        job = self._new_job(config, user_id, seed, img_path=img_path, save_path=save_path, output_ext=ext)
+        args = (img_path, font_path, config, seed, save_path, frames, fps, debug, preview_size)
+        asyncio.run_coroutine_threadsafe(self._schedule(job, render_sequence_job, args), self._loop).result()
+        return job.job_id
+
+    def submit_video(self, video_path, font_path, config, seed, save_path, redetect_every=30, max_frames=None,
+                     debug=False, user_id=None) -> str:
+        """提交视频任务（关键帧检测主体，帧并行渲染并按顺序写出），结果写入 save_path
+
+        Args:
+            redetect_every: 最多每隔多少帧重新检测主体，0 表示只在场景切换时检测
+            max_frames: 最多处理的帧数，None 表示整个视频
+
+        Returns:
+            任务ID
+
+        Raises:
+            QueueFullError: 未完成任务数已达上限
+            ValueError: 配置无效
+        """
+        ext = os.path.splitext(save_path)[1].lower()
+        job = self._new_job(config, user_id, seed, img_path=video_path, save_path=save_path, output_ext=ext)
+        args = (video_path, font_path, config, seed, save_path, redetect_every, max_frames, debug)
+        asyncio.run_coroutine_threadsafe(self._schedule(job, render_video_job, args), self._loop).result()
+        return job.job_id
+
+    def _new_job(self, config, user_id, seed, img_path=None, save_path=None,
+                 cache_key=None, output_ext='.png') -> RenderJob:
+        config.compile()  # 配置无效时在提交时报错，不进入队列
+        self.start()
+
+        with self._lock:
+            self._purge_finished()
+            pending = sum(1 for j in self._jobs.values() if not j.done)
+            if pending >= self.max_queue:
+                raise QueueFullError(f"渲染队列已满 ({pending}/{self.max_queue})，请稍后再试")
+
+            job = RenderJob(
+                job_id=uuid.uuid4().hex,
+                user_id=user_id or 'anonymous',
+                img_path=img_path,
+                save_path=save_path,
+                seed=seed,
+                cache_key=cache_key,
+                output_ext=output_ext
+            )
+            self._jobs[job.job_id] = job
+        return job
+
+    def _serve_from_cache(self, job) -> bool:
+        """缓存命中时直接完成任务"""
+        if job.cache_key is None:
+            return False
+        hit = self.cache.get(job.cache_key)
+        if hit is None:
+            return False
+
+        path, stats = hit
+        try:
+            if job.save_path:
+                # 先复制到临时文件再原子替换，避免留下不完整的输出文件
+                directory, name = os.path.split(job.save_path)
+                tmp = os.path.join(directory, f".{name}.tmp")
+                shutil.copyfile(path, tmp)
+                os.replace(tmp, job.save_path)
+            else:
+                job.result = path.read_bytes()
+        except OSError:
+            return False
+
+        stats['cache_hit'] = True
+        self._finish(job, JOB_DONE, stats=stats)
+        return True
+
+    def get_job(self, job_id) -> Optional[RenderJob]:
+        """获取任务记录"""
+        return self._jobs.get(job_id)
+
+    def status(self, job_id) -> Optional[dict]:
+        """查询任务状态，任务不存在时返回None"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        info = job.to_dict()
+        if job.status == JOB_QUEUED:
+            info['queue_position'] = self._queue_position(job)
+        return info
+
+    def cancel(self, job_id) -> bool:
+        """取消任务
+
+        排队中的任务立即取消；运行中的任务无法中断工作进程，
+        会在完成后被标记为已取消并丢弃结果。
+        """
+        job = self._jobs.get(job_id)
+        if job is None or job.done:
+            return False
+
+        job.cancel_requested = True
+        if job.status == JOB_QUEUED and job.task is not None and self._loop is not None:
+            self._loop.call_soon_threadsafe(job.task.cancel)
+        return True
+
+    def wait(self, job_id, timeout=None) -> RenderJob:
+        """阻塞等待任务结束"""
+        job = self._jobs[job_id]
+        return job.future.result(timeout)
+
+    async def wait_async(self, job_id) -> RenderJob:
+        """在任意事件循环中等待任务结束"""
+        job = self._jobs[job_id]
+        return await asyncio.wrap_future(job.future)
+
+    def iter_progress(self, job_id, interval=0.2):
+        """轮询任务进度，依次产出状态字典，任务结束后停止"""
+        job = self._jobs[job_id]
+        while True:
+            try:
+                job.future.result(timeout=interval)
+            except concurrent.futures.TimeoutError:
+                yield self.status(job_id)
+                continue
+            yield self.status(job_id)
+            return
+
+    def _queue_position(self, job) -> int:
+        queued = sorted(
+            (j for j in self._jobs.values() if j.status == JOB_QUEUED),
+            key=lambda j: j.created_at
+        )
+        for i, j in enumerate(queued):
+            if j is job:
+                return i + 1
+        return 0
+
+    def _purge_finished(self):
+        """清理过期的已完成任务记录"""
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.done and job.finished_at and now - job.finished_at > self.job_ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    # ------------------------------------------------------------------
+    # 事件循环内部
+    # ------------------------------------------------------------------
+    async def _schedule(self, job, fn, args):
+        job.task = asyncio.ensure_future(self._run_job(job, fn, args))
+
+    async def _cancel_all(self):
+        """取消所有未结束的任务并等待其完成清理（任务记录标记为已取消）"""
+        tasks = [job.task for job in self._jobs.values() if not job.done and job.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run_job(self, job, fn, args):
+        user_id = job.user_id
+        user_sem = self._user_sems.get(user_id)
+        if user_sem is None:
+            user_sem = self._user_sems[user_id] = asyncio.Semaphore(self.per_user_limit)
+        self._user_jobs[user_id] = self._user_jobs.get(user_id, 0) + 1
+        try:
+            await self._run_job_limited(job, fn, args, user_sem)
+        finally:
+            # 用户没有未结束的任务时释放其信号量，用户ID不会无限累积
+            self._user_jobs[user_id] -= 1
+            if not self._user_jobs[user_id]:
+                del self._user_jobs[user_id]
+                del self._user_sems[user_id]
+
+    async def _run_job_limited(self, job, fn, args, user_sem):
+        try:
+            async with user_sem:
+                async with self._worker_sem:
+                    if job.cancel_requested:
+                        self._finish(job, JOB_CANCELLED)
+                        return
+                    job.status = JOB_RUNNING
+                    job.started_at = time.time()
+                    stats, data = await asyncio.get_running_loop().run_in_executor(
+                        self._executor, fn, job.job_id, *args
+                    )
+        except asyncio.CancelledError:
+            self._finish(job, JOB_CANCELLED)
+            return
+        except Exception as e:
+            job.error_type = type(e).__name__
+            self._finish(job, JOB_FAILED, error=str(e))
+            return
+
+        if job.cancel_requested:
+            if job.save_path and os.path.exists(job.save_path):
+                os.remove(job.save_path)
+            self._finish(job, JOB_CANCELLED)
+        else:
+            job.result = data
+            if job.cache_key is not None:
+                try:
+                    self.cache.put(job.cache_key, job.output_ext, stats,
+                                   data=data, src_path=job.save_path)
+                except OSError as e:
+                    print(f"⚠️ 写入渲染缓存失败: {e}")
+            self._finish(job, JOB_DONE, stats=stats)
+
+    def _finish(self, job, status, stats=None, error=None):
+        job.status = status
+        job.stats = stats
+        job.error = error
+        job.finished_at = time.time()
+        if status == JOB_DONE:
+            job.progress = 1.0
+        if not job.future.done():
+            job.future.set_result(job)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_render_service(**kwargs) -> RenderService:
+    """获取全局渲染服务（首次调用时启动）
+
+    Args:
+        **kwargs: 首次创建时传给 RenderService 的参数（如 warmup、max_tasks_per_child），之后忽略
+    """
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = RenderService(cache=get_render_cache(), **kwargs).start()
+            atexit.register(_service.stop, False)
+    return _service
@@ -0,0 +1,208 @@
+# service/worker.py
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from config import CyberConfig
+from core.effects import warm_noise_tables
+from core.layout import FONT_SIZES
+from core.renderer import ConfigurableCyberCore
+from core.sequence import SequenceRenderer
+from core.video import VideoRenderer
+from core.utils import load_truetype
+from data.error_messages import get_error_sampler
+
+# 工作进程内的进度队列与阶段线程池（由 init_worker 设置）
+_progress_queue = None
+_stage_executor = None
+_ready_barrier = None
+_init_lock = threading.Lock()
+
+# 预热结果与已处理任务数（线程模式下为整个进程共享）
+_warmup_report = None
+_jobs_served = 0
+
+
+@dataclass(frozen=True)
+class WorkerWarmup:
+    """工作者启动时的预热内容
+
+    Attributes:
+        font_path: 预加载的字体文件，None 表示不预加载字体
+        config: 决定错误消息采样器权重的配置，None 使用默认配置
+        widths: 常见的输入图像宽度，按对应的缩放系数预加载全部字号
+        seeds: 预先生成噪声排列表的渲染种子
+        probe_size: 预热渲染的小图尺寸 (宽, 高)，让各阶段首次调用的开销发生在启动时；None 表示跳过
+    """
+
+    font_path: Optional[str] = None
+    config: Optional[CyberConfig] = None
+    widths: Tuple[int, ...] = (800, 1200, 1920, 2560, 3840)
+    seeds: Tuple[int, ...] = ()
+    probe_size: Optional[Tuple[int, int]] = (160, 120)
+
+
+def warm_worker(warmup: WorkerWarmup):
+    """预热当前进程：加载字体、构建错误消息采样器、生成噪声排列表并做一次小图渲染
+
+    cv2/numpy/PIL 与渲染模块在导入本模块时已加载。
+
+    Returns:
+        预热报告字典（各步骤耗时与数量）
+    """
+    cfg = warmup.config or CyberConfig()
+    report = {'pid': os.getpid()}
+    start = time.perf_counter()
+
+    fonts = 0
+    if warmup.font_path and os.path.exists(warmup.font_path):
+        sizes = {int(size * width / 1200.0) for size in FONT_SIZES for width in warmup.widths}
+        for size in sorted(sizes):
+            load_truetype(warmup.font_path, size)
+        fonts = len(sizes)
+    report['fonts'] = fonts
+
+    get_error_sampler(None)
+    if cfg.use_extended_errors:
+        get_error_sampler(cfg.error_weights)
+
+    report['noise_tables'] = warm_noise_tables(warmup.seeds)
+
+    if warmup.probe_size:
+        w, h = warmup.probe_size
+        probe = np.zeros((h, w, 3), dtype=np.uint8)
+        cv2.circle(probe, (w // 2, h // 2), min(w, h) // 3, (40, 160, 220), -1)
+        ConfigurableCyberCore(probe, warmup.font_path, cfg, seed=0).render()
+
+    report['warmup_time'] = time.perf_counter() - start
+    return report
+
+
+def init_worker(progress_queue=None, stage_threads=0, warmup=None, ready_barrier=None):
+    """工作进程/线程初始化函数
+
+    Args:
+        progress_queue: 进度队列（进程模式为 multiprocessing.Queue，线程模式为 queue.Queue）
+        stage_threads: 渲染内部并行阶段使用的线程数，0 表示不并行
+        warmup: 可选的 WorkerWarmup，进程内只执行一次
+        ready_barrier: 可选的屏障，worker_ready 在此等待，保证每个工作者恰好收到一个就绪任务
+    """
+    global _progress_queue, _stage_executor, _warmup_report, _ready_barrier
+    with _init_lock:
+        _progress_queue = progress_queue
+        _ready_barrier = ready_barrier
+        if stage_threads and _stage_executor is None:
+            _stage_executor = ThreadPoolExecutor(stage_threads, thread_name_prefix="render-stage")
+        if warmup is not None and _warmup_report is None:
+            _warmup_report = warm_worker(warmup)
+
+
+def worker_ready(timeout=60.0):
+    """确认工作者已启动并完成初始化，用于预先创建工作者
+
+    Returns:
+        {'pid', 'jobs', 'warmup'}
+    """
+    if _ready_barrier is not None:
+        try:
+            _ready_barrier.wait(timeout)
+        except threading.BrokenBarrierError:
+            pass  # 部分工作者未能启动，不阻塞服务
+    return {'pid': os.getpid(), 'jobs': _jobs_served, 'warmup': _warmup_report}
+
+
+def _count_job(stats):
+    """记录本工作进程处理的任务数，写入统计信息"""
+    global _jobs_served
+    with _init_lock:
+        _jobs_served += 1
+        stats['worker_pid'] = os.getpid()
+        stats['worker_jobs'] = _jobs_served
+    return stats
+
+
+def _progress_reporter(job_id):
+    def report(fraction, desc):
+        if _progress_queue is not None:
+            _progress_queue.put((job_id, fraction, desc))
+    return report
+
+
+def render_job(job_id, img_path, font_path, config, seed, save_path, debug=False, preview_size=None,
+               full_plan=False):
+    """在工作进程中执行一次完整渲染，结果写入 save_path
+
+    Args:
+        preview_size: 预览/代理渲染的目标长边，None 表示全尺寸
+        full_plan: 预览时按全尺寸规划布局（与完整渲染一致）
+
+    Returns:
+        (统计信息字典, None)
+    """
+    core = ConfigurableCyberCore(img_path, font_path, config, seed, debug, executor=_stage_executor,
+                                 preview_size=preview_size, full_plan=full_plan)
+    core.run(save_path, progress=_progress_reporter(job_id))
+    return _count_job(core.get_stats()), None
+
+
+def render_bytes_job(job_id, image_bytes, font_path, config, seed, ext='.png', debug=False, preview_size=None):
+    """在工作进程中渲染内存中的图片数据，不经过磁盘
+
+    Args:
+        image_bytes: 编码后的输入图片（PNG/JPEG等）
+        ext: 输出编码格式，如 '.png'、'.jpg'
+        preview_size: 预览/代理渲染的目标长边，None 表示全尺寸
+
+    Returns:
+        (统计信息字典, 编码后的输出图片 bytes)
+    """
+    report = _progress_reporter(job_id)
+    core = ConfigurableCyberCore(image_bytes, font_path, config, seed, debug, executor=_stage_executor,
+                                 preview_size=preview_size)
+    canvas = core.render(progress=report)
+
+    report(0.95, "编码图像")
+    ok, encoded = cv2.imencode(ext, canvas)
+    if not ok:
+        raise ValueError(f"无法编码输出格式: {ext}")
+    report(1.0, "完成")
+    return _count_job(core.get_stats()), encoded.tobytes()
+
+
+def render_sequence_job(job_id, img_path, font_path, config, seed, save_path, frames=24, fps=12,
+                        debug=False, preview_size=None):
+    """在工作进程中渲染循环动画，边渲染边编码写入 save_path
+
+    帧在本工作者的阶段线程池中并行渲染（未配置时使用临时线程池）。
+
+    Returns:
+        (统计信息字典, None)
+    """
+    renderer = SequenceRenderer(img_path, font_path, config, seed, frames=frames, fps=fps,
+                                executor=_stage_executor, debug_mode=debug, preview_size=preview_size)
+    stats = renderer.run(save_path, progress=_progress_reporter(job_id))
+    print(f"Saved: {save_path}")
+    return _count_job(dict(stats)), None
+
+
+def render_video_job(job_id, video_path, font_path, config, seed, save_path, redetect_every=30,
+                     max_frames=None, debug=False):
+    """在工作进程中逐帧渲染视频，按顺序流式写入 save_path
+
+    Returns:
+        (统计信息字典, None)
+    """
+    renderer = VideoRenderer(video_path, font_path, config, seed, redetect_every=redetect_every,
+                             executor=_stage_executor, max_frames=max_frames, debug_mode=debug)
+    stats = renderer.run(save_path, progress=_progress_reporter(job_id))
+    print(f"Saved: {save_path}")
+    return _count_job(dict(stats)), None
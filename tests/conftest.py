@@ -0,0 +1,23 @@
+# tests/conftest.py
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import cv2
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope="session")
+def synthetic_image():
+    """平滑噪声背景 + 居中圆形主体的 BGR 测试图（600x400）"""
+    width, height = 600, 400
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 255, (height // 8, width // 8, 3), dtype=np.uint8)
+    img = cv2.resize(img, (width, height), interpolation=cv2.INTER_CUBIC)
+    cv2.circle(img, (width // 2, height // 2), min(width, height) // 4, (40, 160, 220), -1)
+    return img
@@ -0,0 +1,28 @@
+# tests/test_config.py
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""编译后的配置可哈希，等价的配置哈希与相等性一致"""
+
+from config import CyberConfig
+
+
+def test_compiled_config_is_hashable():
+    compiled = CyberConfig().compile()
+    assert hash(compiled) == hash(CyberConfig().compile())
+    assert {compiled: 'cached'}[CyberConfig().compile()] == 'cached'
+
+
+def test_equivalent_configs_hash_the_same():
+    default = CyberConfig().compile()
+    # 十六进制颜色与 RGBA 元组、整数值的浮点数与整数等价
+    equivalent = CyberConfig(mesh_color='#ffffffc8', box_line_max_distance=300.0).compile()
+    assert equivalent == default
+    assert hash(equivalent) == hash(default)
+    assert len({default, equivalent}) == 1
+
+
+def test_different_configs_or_scales_are_not_equal():
+    default = CyberConfig().compile()
+    assert CyberConfig(mesh_complexity=100).compile() != default
+    assert CyberConfig().compile(scale=2.0) != default
@@ -0,0 +1,46 @@
+# tests/test_precision.py
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""float32 特效计算（整幅渲染与单独的景深）与 float64 参考输出的逐像素差异不超过 1 个色阶"""
+
+import numpy as np
+import pytest
+
+from config import CyberConfig, DEPTH_ENGINES
+from core.effects import noise_cache, render_depth_of_field
+from core.renderer import ConfigurableCyberCore
+
+SEEDS = [1, 7, 42]
+
+
+def _render(img, precision, seed, depth_engine):
+    noise_cache.clear()
+    cfg = CyberConfig(precision=precision, depth_engine=depth_engine)
+    return ConfigurableCyberCore(img.copy(), None, cfg, seed=seed).render()
+
+
+@pytest.mark.parametrize("depth_engine", DEPTH_ENGINES)
+@pytest.mark.parametrize("seed", SEEDS)
+def test_float32_within_one_level_of_float64(synthetic_image, seed, depth_engine):
+    ref = _render(synthetic_image, 'float64', seed, depth_engine)
+    out = _render(synthetic_image, 'float32', seed, depth_engine)
+    diff = np.abs(out.astype(np.int16) - ref.astype(np.int16))
+    print(f"种子 {seed} / {depth_engine}: 最大差异 {int(diff.max())}，差异像素 {int((diff > 0).sum())}")
+    assert diff.max() <= 1
+
+
+def _depth_of_field(img, precision, depth_engine):
+    cfg = CyberConfig(precision=precision, depth_engine=depth_engine, enable_depth_of_field=True)
+    core = ConfigurableCyberCore(img.copy(), None, cfg, seed=SEEDS[0])
+    return render_depth_of_field(core, img.copy())
+
+
+@pytest.mark.parametrize("depth_engine", DEPTH_ENGINES)
+def test_depth_of_field_float32_within_one_level_of_float64(synthetic_image, depth_engine):
+    ref = _depth_of_field(synthetic_image, 'float64', depth_engine)
+    out = _depth_of_field(synthetic_image, 'float32', depth_engine)
+    assert not np.array_equal(out, synthetic_image)
+    diff = np.abs(out.astype(np.int16) - ref.astype(np.int16))
+    print(f"景深 / {depth_engine}: 最大差异 {int(diff.max())}，差异像素 {int((diff > 0).sum())}")
+    assert diff.max() <= 1
@@ -6,10 +6,14 @@ from .single import create_single_tab
 from .batch import create_batch_tab
 from .config import create_config_tab
 from .preview import create_preview_tab
+from .animation import create_animation_tab
+from .video import create_video_tab
 
 __all__ = [
     'create_single_tab',
     'create_batch_tab',
     'create_config_tab',
-    'create_preview_tab'
+    'create_preview_tab',
+    'create_animation_tab',
+    'create_video_tab'
 ]
\ No newline at end of file
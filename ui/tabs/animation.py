@@ -0,0 +1,139 @@
+# ui/tabs/animation.py
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import gradio as gr
+import os
+import random
+import uuid
+
+from service import get_render_service, JOB_DONE
+from ui.utils import get_user_id, wait_for_job
+
+# 输出格式 -> 扩展名
+ANIMATION_FORMATS = {
+    "GIF": ".gif",
+    "WebP": ".webp",
+    "MP4": ".mp4",
+}
+
+
+def process_animation(input_img, config, font_path, seed, frames, fps, output_format, debug,
+                      request: gr.Request = None, progress=gr.Progress()):
+    """生成循环故障动画（提交到渲染服务）"""
+
+    if input_img is None:
+        return None, "❌ 错误：请先上传图片", None
+
+    output_dir = "outputs/animation"
+    os.makedirs(output_dir, exist_ok=True)
+
+    # 保存输入图片（每个任务独立的临时文件）
+    temp_input = os.path.join(output_dir, f"temp_input_{uuid.uuid4().hex[:8]}.png")
+    try:
+        input_img.save(temp_input)
+    except Exception as e:
+        return None, f"❌ 保存临时文件失败: {str(e)}", None
+
+    seed_used = random.randint(1, 1000000) if seed == -1 else int(seed)
+    ext = ANIMATION_FORMATS.get(output_format, ".gif")
+    output_path = os.path.join(output_dir, f"animation_seed{seed_used}_{int(frames)}f{ext}")
+
+    try:
+        service = get_render_service()
+        job_id = service.submit_sequence(temp_input, font_path, config, seed_used, output_path,
+                                         frames=int(frames), fps=int(fps), debug=debug,
+                                         user_id=get_user_id(request))
+        job = wait_for_job(service, job_id, progress)
+
+        if job.status != JOB_DONE:
+            return None, f"❌ 处理失败: {job.error or job.status}", None
+
+        stats = job.stats
+        stats_text = f"""
+        ✅ **动画生成完成！**
+
+        **统计信息:**
+        - 种子: {seed_used}
+        - 帧数: {stats['frames']} @ {stats['fps']} fps（时长 {stats['frames'] / stats['fps']:.1f} 秒，首尾循环）
+        - 框数量: {stats['boxes_drawn']}
+        - 底图（分析+布局+绘制）: {stats['analysis_time']:.2f}秒
+        - 每帧渲染: {stats['frame_time'] * 1000:.0f} 毫秒
+        - 编码 ({stats['encoder']}): {stats['encode_time']:.2f}秒
+        - 总耗时: {stats['processing_time']:.2f}秒
+
+        **输出文件:** {os.path.basename(output_path)}
+        """
+
+        # MP4 无法在图片组件中播放，只提供下载
+        preview = output_path if ext in (".gif", ".webp") else None
+        return preview, stats_text, output_path
+
+    except Exception as e:
+        import traceback
+        print(f"动画生成失败: {traceback.format_exc()}")
+        return None, f"❌ 处理失败: {str(e)}", None
+    finally:
+        if os.path.exists(temp_input):
+            os.remove(temp_input)
+
+
+def create_animation_tab(config_state, font_path_state):
+    """创建循环动画标签页"""
+
+    with gr.Row():
+        with gr.Column(scale=1):
+            input_image = gr.Image(
+                type="pil",
+                label="输入图片",
+                show_label=True,
+                interactive=True,
+                height=300
+            )
+
+            with gr.Row():
+                frames_slider = gr.Slider(4, 120, value=24, step=1, label="帧数")
+                fps_slider = gr.Slider(1, 60, value=12, step=1, label="帧率 (fps)")
+
+            with gr.Row():
+                format_dropdown = gr.Dropdown(
+                    choices=list(ANIMATION_FORMATS),
+                    value="GIF",
+                    label="输出格式"
+                )
+                seed_input = gr.Number(
+                    value=-1,
+                    label="随机种子 (-1 表示随机)",
+                    precision=0,
+                    minimum=-1,
+                    maximum=9999999
+                )
+                debug_check = gr.Checkbox(value=False, label="调试模式")
+
+            process_btn = gr.Button("🎞️ 生成循环动画", variant="primary")
+
+        with gr.Column(scale=1):
+            output_image = gr.Image(
+                type="filepath",
+                label="动画预览",
+                show_label=True,
+                interactive=False,
+                height=400
+            )
+            download_file = gr.File(label="下载动画")
+            stats_output = gr.Markdown(label="处理信息")
+
+    process_btn.click(
+        fn=process_animation,
+        inputs=[input_image, config_state, font_path_state, seed_input, frames_slider, fps_slider,
+                format_dropdown, debug_check],
+        outputs=[output_image, stats_output, download_file],
+        concurrency_limit=None  # 并发由渲染服务控制
+    )
+
+    gr.Markdown("""
+    ### 📝 使用说明
+    - 布局（网格、文字、框）只计算一次并在所有帧中保持不变
+    - 逐帧变化的只有 CRT 通道偏移、扫描线滚动与 Perlin 噪声，动画首尾无缝循环
+    - 帧并行渲染并边渲染边编码；安装 ffmpeg 时使用 ffmpeg 编码，否则 GIF/WebP 由 Pillow、MP4 由 OpenCV 编码
+    """)
@@ -3,10 +3,42 @@
 # -*- coding: utf-8 -*-
 
 import gradio as gr
+import itertools
 import os
 import random
+import time
+from collections import deque
 from pathlib import Path
-from typing import List, Tuple
+from typing import Iterator, List, Tuple
+
+from core.cache import hash_bytes, hash_config, hash_font
+from core.utils import write_bytes_atomic
+from service import get_render_service, QueueFullError, JOB_DONE
+from service.batch import BatchManifest, ITEM_DONE, ITEM_FAILED, iter_image_files, parse_patterns
+from service.pipeline import BatchPipeline
+from ui.utils import BatchThroughput, get_user_id, image_megapixels
+
+# 渲染队列已满时的重试间隔（秒）：从最小值开始逐次加倍，不超过最大值
+QUEUE_RETRY_MIN = 0.05
+QUEUE_RETRY_MAX = 2.0
+
+# 界面只显示最近的摘要行与结果图片，完整记录在清单 manifest.jsonl 中
+SUMMARY_TAIL = 200
+GALLERY_TAIL = 100
+
+
+def submit_when_ready(submit, *args, **kwargs) -> str:
+    """提交任务，全局队列已满（其他用户占满）时退避重试直到有空位
+
+    队列已满只是暂时的负载，作为背压处理，不应让批量条目失败。
+    """
+    delay = QUEUE_RETRY_MIN
+    while True:
+        try:
+            return submit(*args, **kwargs)
+        except QueueFullError:
+            time.sleep(delay * random.uniform(0.5, 1.0))
+            delay = min(delay * 2, QUEUE_RETRY_MAX)
 
 
 def process_batch_images(
@@ -15,19 +47,21 @@ def process_batch_images(
         font_path: str,
         seeds_input: str,
         debug: bool,
+        include: str = "",
+        exclude: str = "",
+        recursive: bool = True,
+        request: gr.Request = None,
         progress=gr.Progress()
-) -> Tuple[str, str, List[str]]:
-    """批量处理图片"""
-
-    if not os.path.exists(input_dir):
-        return f"错误：输入目录 '{input_dir}' 不存在", "", []
+) -> Iterator[Tuple[str, str, List[str]]]:
+    """批量处理图片（预读 → 渲染服务 → 写出 三段流水线）
 
-    # 获取所有图片
-    image_files = [f for f in os.listdir(input_dir)
-                   if f.lower().endswith(('.jpg', '.png', '.jpeg'))]
+    输入文件边遍历边提交，每完成一张即产出一次 (摘要, 输出目录, 结果列表)，并行渲染时按完成顺序产出。
+    每个条目记录在输出目录的清单中，重新运行时跳过已完成的条目并沿用记录的种子。
+    """
 
-    if not image_files:
-        return f"错误：目录 '{input_dir}' 中没有图片文件", "", []
+    if not os.path.exists(input_dir):
+        yield f"错误：输入目录 '{input_dir}' 不存在", "", []
+        return
 
     # 解析种子
     if seeds_input.strip():
@@ -42,55 +76,135 @@ def process_batch_images(
     output_dir = "outputs/batch"
     os.makedirs(output_dir, exist_ok=True)
 
-    # 处理图片
-    results = []
-    stats_summary = []
-
-    progress(0, desc="开始批量处理...")
+    # 流式发现输入文件（跳过输出目录本身）
+    image_files = iter_image_files(input_dir, parse_patterns(include), parse_patterns(exclude),
+                                   recursive=recursive, skip_dirs=(output_dir,))
 
-    for i, filename in enumerate(image_files):
-        progress((i + 1) / len(image_files), desc=f"处理 {filename}")
+    # 断点续跑清单
+    manifest = BatchManifest(output_dir)
+    config_hash = hash_config(config)
+    font_hash = hash_font(font_path)
 
-        # 确定种子
-        if i < len(seeds):
-            seed = seeds[i]
+    # 处理图片
+    results = deque(maxlen=GALLERY_TAIL)
+    stats_summary = deque(maxlen=SUMMARY_TAIL)
+    meter = BatchThroughput()
+
+    service = get_render_service()
+    user_id = get_user_id(request)
+
+    def decode(item):
+        """预读：读取文件、计算输入哈希、读取尺寸，确定种子并检查是否已完成"""
+        input_path = item.source
+        data = item.data
+        data['started'] = time.time()
+        data['filename'] = os.path.relpath(input_path, input_dir)
+        with open(input_path, 'rb') as f:
+            data['image_bytes'] = f.read()
+        data['input_hash'] = hash_bytes(data['image_bytes'])
+        data['megapixels'] = image_megapixels(data['image_bytes'])
+
+        # 确定种子：显式指定 > 清单中记录的种子 > 随机
+        if item.index < len(seeds):
+            seed = seeds[item.index]
         else:
-            seed = random.randint(1, 1000000)
-
-        # 处理图片
-        input_path = os.path.join(input_dir, filename)
-        output_filename = f"cyber_{seed}_{filename}"
-        output_path = os.path.join(output_dir, output_filename)
+            seed = manifest.recorded_seed(input_path, config_hash)
+            if seed is None:
+                seed = random.randint(1, 1000000)
+        data['seed'] = seed
+
+        # 已完成的条目直接跳过
+        if manifest.is_done(input_path, data['input_hash'], config_hash, seed, font_hash):
+            data['skipped'] = True
+            data['output_path'] = manifest.lookup(input_path)['output']
+            del data['image_bytes']
+            return
+
+        # 子目录中的文件在输出目录下保留相同的相对目录，不同输入不会写到同一个输出文件
+        subdir, name = os.path.split(data['filename'])
+        data['output_path'] = os.path.join(output_dir, subdir, f"cyber_{seed}_{name}")
+
+    def render(item):
+        """渲染：编码后的输入交给渲染服务（像素解码、渲染与编码在工作者内完成）"""
+        data = item.data
+        if data.get('skipped'):
+            return
+        ext = os.path.splitext(data['output_path'])[1].lower() or '.png'
+        job_id = submit_when_ready(service.submit_bytes, data.pop('image_bytes'), font_path, config, data['seed'],
+                                   ext=ext, debug=debug, user_id=user_id)
+        job = service.wait(job_id)
+        if job.status != JOB_DONE:
+            raise RuntimeError(job.error or job.status)
+        data['stats'] = job.stats
+        data['output_bytes'] = job.result
+
+    def write(item):
+        """写出：原子写入输出文件并记录清单"""
+        data = item.data
+        if data.get('skipped'):
+            return
+        os.makedirs(os.path.dirname(data['output_path']), exist_ok=True)
+        write_bytes_atomic(data['output_path'], data.pop('output_bytes'))
+        manifest.record(item.source, data['input_hash'], config_hash, data['seed'], data['output_path'],
+                        ITEM_DONE, render_time=data['stats'].get('processing_time'),
+                        elapsed=time.time() - data['started'], font_hash=font_hash)
+
+    # 预读与写出为 I/O 密集型，渲染线程数与服务允许的每用户并发匹配
+    pipeline = BatchPipeline(decode, render, write, decode_workers=2,
+                             render_workers=max(1, service.per_user_limit), write_workers=2)
+
+    def counted(files):
+        for path in files:
+            meter.discover()
+            yield path
+        meter.finish_discovery()
+
+    def snapshot(title):
+        lines = [title, meter.describe(), f"阶段利用率: {pipeline.describe_utilization()}", ""]
+        if meter.done > len(stats_summary):
+            lines.append(f"（仅显示最近 {len(stats_summary)} 条，完整记录见 {manifest.path}）")
+        summary = "\n".join(lines + list(stats_summary))
+        return summary, output_dir, list(results)
 
-        try:
-            core = ConfigurableCyberCore(input_path, font_path, config, seed, debug)
-            core.run(output_path)
+    progress(0, desc="开始批量处理...")
+    yield snapshot("开始批量处理...")
+
+    for item in pipeline.run(counted(image_files)):
+        data = item.data
+        filename = data.get('filename') or os.path.relpath(item.source, input_dir)
+        seed = data.get('seed')
+        if item.error is not None:
+            stats_summary.append(f"{filename}: 处理失败 - {item.error}")
+            if 'input_hash' in data:
+                manifest.record(item.source, data['input_hash'], config_hash, seed, data.get('output_path'),
+                                ITEM_FAILED, error=item.error, font_hash=font_hash)
+            meter.add(failed=True)
+        elif data.get('skipped'):
+            stats_summary.append(f"{filename}: 种子={seed}, 已完成（跳过）")
+            results.append(data['output_path'])
+            meter.skip()
+        else:
+            stats_summary.append(f"{filename}: 种子={seed}, 框数={data['stats']['boxes_drawn']}")
+            results.append(data['output_path'])
+            meter.add(data['megapixels'])
+        progress(meter.fraction(), desc=f"完成 {filename} ({meter.progress_text()})")
+        yield snapshot(f"处理中... 已完成 {filename}")
 
-            stats = core.get_stats()
-            stats_summary.append(f"{filename}: 种子={seed}, 框数={stats['boxes_drawn']}")
-            results.append(output_path)
-        except Exception as e:
-            stats_summary.append(f"{filename}: 处理失败 - {str(e)}")
+    if meter.total == 0:
+        yield f"错误：目录 '{input_dir}' 中没有匹配的图片文件", "", []
+        return
 
     # 生成结果
-    summary = "\n".join([
-        f"处理完成！共 {len(results)}/{len(image_files)} 张图片成功",
-        "",
-        *stats_summary
-    ])
+    yield snapshot(f"处理完成！共 {meter.done - meter.failed}/{meter.total} 张图片成功")
 
-    return summary, output_dir, results
 
-
-def get_directory_files(directory):
-    """获取目录中的文件列表"""
+def get_directory_files(directory, include="", exclude="", recursive=True, limit=500):
+    """获取目录中的图片文件列表（相对路径，最多 limit 个）"""
     if not os.path.exists(directory):
         return []
 
-    files = [f for f in os.listdir(directory)
-             if os.path.isfile(os.path.join(directory, f)) and
-             f.lower().endswith(('.jpg', '.png', '.jpeg'))]
-    return files
+    files = iter_image_files(directory, parse_patterns(include), parse_patterns(exclude), recursive=recursive)
+    return [os.path.relpath(path, directory) for path in itertools.islice(files, limit)]
 
 
 def create_batch_tab(config_state, font_path_state):
@@ -111,6 +225,19 @@ def create_batch_tab(config_state, font_path_state):
             )
 
             with gr.Row():
+                include_input = gr.Textbox(
+                    label="包含模式（glob，逗号分隔，可选）",
+                    placeholder="例如: *.png, 2024/*",
+                    value=""
+                )
+                exclude_input = gr.Textbox(
+                    label="排除模式（glob，逗号分隔，可选）",
+                    placeholder="例如: *_mask.*, tmp",
+                    value=""
+                )
+
+            with gr.Row():
+                recursive_check = gr.Checkbox(value=True, label="包含子目录")
                 debug_check = gr.Checkbox(value=False, label="调试模式")
                 refresh_btn = gr.Button("🔄 刷新文件列表")
 
@@ -118,7 +245,7 @@ def create_batch_tab(config_state, font_path_state):
 
             # 使用 Dropdown 替代 FileExplorer
             file_list = gr.Dropdown(
-                label="目录中的文件",
+                label="目录中的文件（最多显示前 500 个）",
                 choices=[],
                 multiselect=True,
                 interactive=False
@@ -163,21 +290,25 @@ def create_batch_tab(config_state, font_path_state):
                 download_btn = gr.Button("📥 下载选中图片", size="sm")
 
     # 刷新文件列表
-    def update_file_list(directory):
-        files = get_directory_files(directory)
+    def update_file_list(directory, include, exclude, recursive):
+        files = get_directory_files(directory, include, exclude, recursive)
         return gr.Dropdown(choices=files)
 
+    file_filter_inputs = [input_dir, include_input, exclude_input, recursive_check]
+
     refresh_btn.click(
         fn=update_file_list,
-        inputs=[input_dir],
+        inputs=file_filter_inputs,
         outputs=[file_list]
     )
 
     # 处理批量图片
     process_btn.click(
         fn=process_batch_images,
-        inputs=[input_dir, config_state, font_path_state, seeds_input, debug_check],
-        outputs=[summary_output, output_dir_display, output_gallery]
+        inputs=[input_dir, config_state, font_path_state, seeds_input, debug_check,
+                include_input, exclude_input, recursive_check],
+        outputs=[summary_output, output_dir_display, output_gallery],
+        concurrency_limit=None  # 并发由渲染服务控制
     )
 
     # 当点击Gallery中的图片时，在selected_image中显示
@@ -208,16 +339,17 @@ def create_batch_tab(config_state, font_path_state):
     # 初始加载时也更新文件列表
     input_dir.change(
         fn=update_file_list,
-        inputs=[input_dir],
+        inputs=file_filter_inputs,
         outputs=[file_list]
     )
 
     gr.Markdown("""
     ### 📝 使用说明
-    1. 将需要处理的图片放入输入目录
+    1. 将需要处理的图片放入输入目录（支持 JPG/PNG/WebP/TIFF/BMP，可包含子目录，可用包含/排除模式过滤）
     2. 可以选择指定种子列表（每张图片一个种子）
-    3. 点击批量生成开始处理
-    4. 处理结果将保存在 outputs/batch 目录
+    3. 点击批量生成开始处理，每完成一张即显示结果、吞吐量（张/秒、MP/秒）与预计剩余时间
+    4. 处理结果将保存在 outputs/batch 目录（保留输入的子目录结构），清单 manifest.jsonl 记录每张图片的种子与耗时
+    5. 中断后重新运行同一目录会跳过已完成的图片，未指定种子的图片沿用上次的种子
 
     ### 🖼️ 图片查看功能
     - **点击缩略图**：可以在下方放大查看
@@ -365,6 +365,10 @@ def create_noise_config() -> Dict[str, gr.Component]:
                     minimum=0, maximum=2.0, value=1.0, step=0.05,
                     label="噪声总强度", info="统一缩放所有噪声效果"
                 )
+                inputs['precision'] = gr.Radio(
+                    choices=['float32', 'float64'], value='float32',
+                    label="计算精度", info="float32 更快且省内存，输出差异不超过1个色阶"
+                )
 
     return inputs
 
@@ -431,6 +435,18 @@ def create_dof_config() -> Dict[str, gr.Component]:
                     minimum=0, maximum=1, value=0.2, step=0.05,
                     label="淡出起始距离"
                 )
+                inputs['depth_blur_levels'] = gr.Slider(
+                    minimum=1, maximum=5, value=3, step=1,
+                    label="模糊层数", info="失焦越深使用越粗的模糊层，层间平滑过渡"
+                )
+                inputs['depth_focus_mode'] = gr.Radio(
+                    choices=['fixed', 'auto'], value='fixed',
+                    label="对焦模式", info="auto 由检测到的主体推算对焦中心与半径，未检测到主体时使用固定值"
+                )
+                inputs['depth_engine'] = gr.Radio(
+                    choices=['pyramid', 'pil'], value='pyramid',
+                    label="景深引擎", info="pyramid 为 OpenCV 模糊金字塔（更快），pil 为单一半径模糊"
+                )
 
     return inputs
 
@@ -548,6 +564,7 @@ def config_to_ui_values(config: CyberConfig) -> list:
     values.append(config.noise_scanline_intensity)
     values.append(config.noise_scanline_frequency)
     values.append(config.noise_strength)
+    values.append(config.precision)
 
     # 文字配置
     values.append(config.title_erosion_rate)
@@ -562,6 +579,9 @@ def config_to_ui_values(config: CyberConfig) -> list:
     values.append(config.depth_darken_amount)
     values.append(config.depth_focus_radius)
     values.append(config.depth_fade_start)
+    values.append(config.depth_blur_levels)
+    values.append(config.depth_focus_mode)
+    values.append(config.depth_engine)
 
     # 错误配置
     values.append(1 if config.use_extended_errors else 0)
@@ -9,8 +9,12 @@ from PIL import Image
 import numpy as np
 import time
 
-from core.renderer import ConfigurableCyberCore
-from ui.utils import get_example_images
+from service import get_render_service, JOB_DONE
+from ui.utils import get_example_images, get_user_id, wait_for_job
+
+# 预览渲染的目标长边：大图按全尺寸检测主体并规划布局，再缩小到满足该长边的最小尺寸光栅化，
+# 框与文字的布局与同一种子的完整渲染一致
+PREVIEW_LONG_EDGE = 1200
 
 
 def preview_with_config(
@@ -18,9 +22,11 @@ def preview_with_config(
         config,
         font_path,
         seed,
-        debug
+        debug,
+        user_id=None,
+        progress=None
 ):
-    """使用当前配置预览效果"""
+    """使用当前配置预览效果（提交到渲染服务）"""
 
     # 如果没有选择示例图片，返回错误
     if example_image is None:
@@ -38,11 +44,17 @@ def preview_with_config(
     try:
         start_time = time.time()
 
-        core = ConfigurableCyberCore(example_image, font_path, config, seed, debug)
-        core.run(output_path)
+        service = get_render_service()
+        job_id = service.submit(example_image, font_path, config, int(seed), output_path,
+                                debug=debug, user_id=user_id, preview_size=PREVIEW_LONG_EDGE,
+                                full_plan=True)
+        job = wait_for_job(service, job_id, progress)
+
+        if job.status != JOB_DONE:
+            return None, f"❌ 处理失败：{job.error or job.status}"
 
         elapsed_time = time.time() - start_time
-        stats = core.get_stats()
+        stats = job.stats
 
         stats_text = f"""
         ✅ **预览效果**
@@ -53,6 +65,7 @@ def preview_with_config(
         - 空间错位框: {stats['warp_boxes']}
         - 框间连线: {stats['box_connections']}
         - 文本块: {stats['text_blocks']}
+        - 解码时间: {stats.get('decode_time', 0):.3f}秒（按全尺寸规划布局，缩小 {stats.get('decode_scale', 1)} 倍渲染）
         - 处理时间: {elapsed_time:.2f}秒
         """
 
@@ -143,7 +156,7 @@ def create_preview_tab(config_state, font_path_state):
     # 更新配置并预览的函数
     def update_and_preview(example, config, font, seed, debug,
                            box_min, box_max, warp_int, line_conn,
-                           dof, errors):
+                           dof, errors, request: gr.Request = None, progress=gr.Progress()):
         """更新配置并预览"""
 
         # 创建配置的副本以避免修改原始配置
@@ -158,7 +171,8 @@ def create_preview_tab(config_state, font_path_state):
         temp_config.use_extended_errors = errors
 
         # 预览
-        return preview_with_config(example, temp_config, font, seed, debug)
+        return preview_with_config(example, temp_config, font, seed, debug,
+                                   user_id=get_user_id(request), progress=progress)
 
     # 预览按钮点击事件
     preview_btn.click(
@@ -170,7 +184,8 @@ def create_preview_tab(config_state, font_path_state):
             warp_intensity, line_connect_chance,
             enable_dof, use_extended_errors
         ],
-        outputs=[preview_image, preview_stats]
+        outputs=[preview_image, preview_stats],
+        concurrency_limit=None  # 并发由渲染服务控制
     )
 
     # 重置参数的函数
@@ -203,5 +218,6 @@ def create_preview_tab(config_state, font_path_state):
     - 选择示例图片后，点击预览按钮查看效果
     - 调整参数后需要再次点击预览按钮
     - 预览结果不会保存，仅用于测试参数效果
+    - 大图按全尺寸规划布局、缩小后渲染，框与文字的位置与同一种子的完整渲染一致
     - 处理时间取决于图片大小和参数复杂度
     """)
\ No newline at end of file
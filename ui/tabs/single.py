@@ -5,13 +5,16 @@
 import gradio as gr
 import os
 import random
+import uuid
 from pathlib import Path
 
-from core.renderer import ConfigurableCyberCore
+from service import get_render_service, JOB_DONE
+from ui.utils import get_user_id, wait_for_job
 
 
-def process_single_image(input_img, config, font_path, seed, debug):
-    """处理单张图片"""
+def process_single_image(input_img, config, font_path, seed, debug,
+                         request: gr.Request = None, progress=gr.Progress()):
+    """处理单张图片（提交到渲染服务）"""
 
     # 检查是否上传了图片
     if input_img is None:
@@ -21,8 +24,8 @@ def process_single_image(input_img, config, font_path, seed, debug):
     output_dir = "outputs/single"
     os.makedirs(output_dir, exist_ok=True)
 
-    # 保存输入图片
-    temp_input = os.path.join(output_dir, "temp_input.png")
+    # 保存输入图片（每个任务独立的临时文件，避免多用户互相覆盖）
+    temp_input = os.path.join(output_dir, f"temp_input_{uuid.uuid4().hex[:8]}.png")
     try:
         input_img.save(temp_input)
     except Exception as e:
@@ -39,10 +42,15 @@ def process_single_image(input_img, config, font_path, seed, debug):
 
     # 处理图片
     try:
-        core = ConfigurableCyberCore(temp_input, font_path, config, seed_used, debug)
-        core.run(output_path)
+        service = get_render_service()
+        job_id = service.submit(temp_input, font_path, config, seed_used, output_path,
+                                debug=debug, user_id=get_user_id(request))
+        job = wait_for_job(service, job_id, progress)
 
-        stats = core.get_stats()
+        if job.status != JOB_DONE:
+            return None, f"❌ 处理失败: {job.error or job.status}", seed_used, None
+
+        stats = job.stats
         stats_text = f"""
         ✅ **处理完成！**
 
@@ -52,7 +60,7 @@ def process_single_image(input_img, config, font_path, seed, debug):
         - 空间错位框: {stats['warp_boxes']}
         - 框间连线: {stats['box_connections']}
         - 文本块: {stats['text_blocks']}
-        - 处理时间: {stats['processing_time']:.2f}秒
+        - 处理时间: {stats['processing_time']:.2f}秒{' (缓存命中)' if stats.get('cache_hit') else ''}
 
         **输出文件:** {output_filename}
         """
@@ -64,6 +72,9 @@ def process_single_image(input_img, config, font_path, seed, debug):
         error_details = traceback.format_exc()
         print(f"处理失败: {error_details}")
         return None, f"❌ 处理失败: {str(e)}", seed_used, None
+    finally:
+        if os.path.exists(temp_input):
+            os.remove(temp_input)
 
 
 def create_single_tab(config_state, font_path_state):
@@ -126,7 +137,8 @@ def create_single_tab(config_state, font_path_state):
     process_result = process_btn.click(
         fn=process_single_image,
         inputs=[input_image, config_state, font_path_state, seed_input, debug_check],
-        outputs=[output_image, stats_output, seed_used, current_image_path]
+        outputs=[output_image, stats_output, seed_used, current_image_path],
+        concurrency_limit=None  # 并发由渲染服务控制
     )
 
     # 显示下载链接功能
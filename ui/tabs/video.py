@@ -0,0 +1,115 @@
+# ui/tabs/video.py
+# !/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import gradio as gr
+import os
+import random
+
+from service import get_render_service, JOB_DONE
+from ui.utils import format_duration, get_user_id, wait_for_job
+
+# 输出格式 -> 扩展名
+VIDEO_FORMATS = {
+    "MP4": ".mp4",
+    "AVI (MJPG)": ".avi",
+}
+
+
+def process_video(video_path, config, font_path, seed, redetect_every, max_frames, output_format, debug,
+                  request: gr.Request = None, progress=gr.Progress()):
+    """逐帧处理视频（提交到渲染服务）"""
+
+    if not video_path:
+        return None, "❌ 错误：请先上传视频", None
+    if not os.path.exists(video_path):
+        return None, f"❌ 错误：视频不存在 - {video_path}", None
+
+    output_dir = "outputs/video"
+    os.makedirs(output_dir, exist_ok=True)
+
+    seed_used = random.randint(1, 1000000) if seed == -1 else int(seed)
+    name = os.path.splitext(os.path.basename(video_path))[0]
+    ext = VIDEO_FORMATS.get(output_format, ".mp4")
+    output_path = os.path.join(output_dir, f"cyber_{seed_used}_{name}{ext}")
+
+    try:
+        service = get_render_service()
+        job_id = service.submit_video(video_path, font_path, config, seed_used, output_path,
+                                      redetect_every=int(redetect_every),
+                                      max_frames=int(max_frames) if max_frames else None,
+                                      debug=debug, user_id=get_user_id(request))
+        job = wait_for_job(service, job_id, progress)
+
+        if job.status != JOB_DONE:
+            return None, f"❌ 处理失败: {job.error or job.status}", None
+
+        stats = job.stats
+        stats_text = f"""
+        ✅ **视频处理完成！**
+
+        **统计信息:**
+        - 种子: {seed_used}
+        - 帧数: {stats['frames']}（源帧率 {stats['source_fps']:.2f} fps）
+        - 吞吐量: {stats['throughput_fps']:.2f} 帧/秒
+        - 关键帧（主体检测）: {stats['keyframes']}，其中场景切换 {stats['scene_cuts']}
+        - 同时在途帧数上限: {stats['max_in_flight']}
+        - 编码: {stats['encoder']}
+        - 总耗时: {format_duration(stats['processing_time'])}
+
+        **输出文件:** {os.path.basename(output_path)}
+        """
+        return output_path, stats_text, output_path
+
+    except Exception as e:
+        import traceback
+        print(f"视频处理失败: {traceback.format_exc()}")
+        return None, f"❌ 处理失败: {str(e)}", None
+
+
+def create_video_tab(config_state, font_path_state):
+    """创建视频处理标签页"""
+
+    with gr.Row():
+        with gr.Column(scale=1):
+            input_video = gr.Video(label="输入视频", sources=["upload"], height=300)
+
+            with gr.Row():
+                redetect_slider = gr.Slider(
+                    0, 300, value=30, step=1,
+                    label="主体重新检测间隔（帧，0 表示只在场景切换时检测）"
+                )
+                max_frames_input = gr.Number(value=0, label="最多处理帧数（0 表示全部）", precision=0, minimum=0)
+
+            with gr.Row():
+                format_dropdown = gr.Dropdown(choices=list(VIDEO_FORMATS), value="MP4", label="输出格式")
+                seed_input = gr.Number(
+                    value=-1,
+                    label="随机种子 (-1 表示随机)",
+                    precision=0,
+                    minimum=-1,
+                    maximum=9999999
+                )
+                debug_check = gr.Checkbox(value=False, label="调试模式")
+
+            process_btn = gr.Button("🎬 处理视频", variant="primary")
+
+        with gr.Column(scale=1):
+            output_video = gr.Video(label="输出视频", interactive=False, height=400)
+            download_file = gr.File(label="下载视频")
+            stats_output = gr.Markdown(label="处理信息")
+
+    process_btn.click(
+        fn=process_video,
+        inputs=[input_video, config_state, font_path_state, seed_input, redetect_slider, max_frames_input,
+                format_dropdown, debug_check],
+        outputs=[output_video, stats_output, download_file],
+        concurrency_limit=None  # 并发由渲染服务控制
+    )
+
+    gr.Markdown("""
+    ### 📝 使用说明
+    - 主体检测与布局只在关键帧执行（场景切换或达到重新检测间隔），片段内的帧共用同一布局
+    - 帧并行渲染、按原顺序写出，同时在途的帧数有上限，长视频不会占用更多内存
+    - 安装 ffmpeg 时使用 ffmpeg 编码，否则由 OpenCV 编码（MP4 使用 mp4v 编码，部分浏览器无法直接播放，可下载查看）
+    """)
@@ -3,13 +3,16 @@
 # -*- coding: utf-8 -*-
 
 import gradio as gr
+import io
 import json
 import os
+import time
 from typing import Tuple
 from PIL import Image
 import numpy as np
 
 from config import CyberConfig
+from service import JOB_QUEUED
 
 
 def rgba_to_hex(color: Tuple[int, int, int, int]) -> str:
@@ -116,4 +119,107 @@ def update_config_from_ui(config: CyberConfig, **kwargs) -> CyberConfig:
     for key, value in kwargs.items():
         if hasattr(config, key) and value is not None:
             setattr(config, key, value)
-    return config
\ No newline at end of file
+    return config
+
+
+def get_user_id(request) -> str:
+    """从 Gradio 请求中获取用户标识（用于渲染服务的每用户并发限制）"""
+    if request is None:
+        return 'anonymous'
+    session_hash = getattr(request, 'session_hash', None)
+    if session_hash:
+        return session_hash
+    client = getattr(request, 'client', None)
+    return getattr(client, 'host', None) or 'anonymous'
+
+
+def wait_for_job(service, job_id, progress=None):
+    """等待渲染任务完成，并把进度同步到 Gradio 进度条"""
+    for info in service.iter_progress(job_id):
+        if progress is None:
+            continue
+        if info['status'] == JOB_QUEUED:
+            progress(0, desc=f"排队中 (第 {info.get('queue_position', 0)} 位)")
+        else:
+            progress(info['progress'], desc=info['stage'] or info['status'])
+    return service.get_job(job_id)
+
+
+def image_megapixels(source) -> float:
+    """读取图片文件头获取像素数（百万像素），不解码像素数据
+
+    Args:
+        source: 文件路径或编码后的图片 bytes
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    try:
+        with Image.open(source) as img:
+            w, h = img.size
+    except OSError:
+        return 0.0
+    return w * h / 1e6
+
+
+def format_duration(seconds) -> str:
+    """格式化时长为 mm:ss 或 h:mm:ss"""
+    seconds = int(round(seconds))
+    h, rest = divmod(seconds, 3600)
+    m, s = divmod(rest, 60)
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m:02d}:{s:02d}"
+
+
+class BatchThroughput:
+    """批量处理的实时吞吐量：张/秒、MP/秒与预计剩余时间
+
+    total 为 None 时表示输入仍在流式发现中，以已发现数量代替，发现结束后才给出预计剩余时间。
+    """
+
+    def __init__(self, total=None):
+        self.total = total
+        self.discovered = 0
+        self.done = 0
+        self.skipped = 0
+        self.failed = 0
+        self.megapixels = 0.0
+        self.start = time.perf_counter()
+
+    def discover(self):
+        """记录发现一张输入图片"""
+        self.discovered += 1
+
+    def finish_discovery(self):
+        """输入发现结束，总数确定"""
+        self.total = self.discovered
+
+    def add(self, megapixels=0.0, failed=False):
+        """记录一张完成（含失败）的图片"""
+        self.done += 1
+        self.failed += failed
+        self.megapixels += megapixels
+
+    def skip(self):
+        """记录一张无需处理的图片（不计入速率）"""
+        self.done += 1
+        self.skipped += 1
+
+    def fraction(self) -> float:
+        total = self.total if self.total is not None else self.discovered
+        return self.done / total if total else 0.0
+
+    def progress_text(self) -> str:
+        if self.total is None:
+            return f"{self.done}/{self.discovered}+"
+        return f"{self.done}/{self.total}"
+
+    def describe(self) -> str:
+        elapsed = max(time.perf_counter() - self.start, 1e-6)
+        rate = (self.done - self.skipped) / elapsed
+        if self.total is not None and rate > 0:
+            eta = format_duration((self.total - self.done) / rate)
+        else:
+            eta = "--:--"
+        skipped = f" (跳过 {self.skipped})" if self.skipped else ""
+        failed = f" (失败 {self.failed})" if self.failed else ""
+        return (f"{self.progress_text()}{skipped}{failed} | {rate:.2f} 张/秒 | {self.megapixels / elapsed:.2f} MP/秒 | "
+                f"已用 {format_duration(elapsed)} | 预计剩余 {eta}")